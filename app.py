@@ -1,19 +1,10 @@
-import os
-import json
-import base64
-import pandas as pd
+import time
 import streamlit as st
-from datetime import datetime
 from dotenv import load_dotenv
-from langgraph.graph import StateGraph, START, END
-from langchain_google_genai import ChatGoogleGenerativeAI
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from oauth2client.service_account import ServiceAccountCredentials
-from typing import TypedDict, List
-from email.mime.text import MIMEText
-import gspread
-from st_aggrid import AgGrid, GridOptionsBuilder
+from summarizer import config
+from summarizer.metrics import load_report
+from summarizer.ratelimit import limiter_for
+from summarizer.clients import GMAIL_READONLY, GMAIL_SEND, gmail_service
 
 # ===============================
 # 🌙 Modern Dark Theme & Layout
@@ -120,149 +111,188 @@ if "latest_backup" not in st.session_state:
     st.session_state["latest_backup"] = None
 
 # ===============================
-# 🧠 Gemini Model
+# 🧠 Gemini Model + 🚀 LangGraph
 # ===============================
-model = ChatGoogleGenerativeAI(model="gemini-2.5-flash")
-SYSTEM_PROMPT = """
-You are an intelligent assistant that summarizes email content clearly.
-1. Read the email carefully.
-2. Write a short 1–2 line summary.
-3. Assign a priority: High, Medium, or Low.
-Format:
-Summary: <summary>
-Priority: <priority>
-"""
-
-# ===============================
-# 🧩 LangGraph State
-# ===============================
-class EmailState(TypedDict):
-    emails: List[str]
-    optimized_emails: List[str]
-
-# ===============================
-# 📥 Fetch Emails
-# ===============================
-def fetch_emails_node(state: EmailState):
-    creds = Credentials.from_authorized_user_file("token.json", ["https://www.googleapis.com/auth/gmail.readonly"])
-    service = build("gmail", "v1", credentials=creds)
-    results = service.users().messages().list(userId="me", maxResults=5).execute()
-    messages = results.get("messages", [])
-    emails = []
-
-    for msg in messages:
-        msg_detail = service.users().messages().get(userId="me", id=msg["id"]).execute()
-        snippet = msg_detail.get("snippet", "")
-        emails.append(snippet)
-    state["emails"] = emails
-    return state
-
-# ===============================
-# 🧠 Summarize Emails
-# ===============================
-def optimize_emails_node(state: EmailState):
-    summaries = []
-    for email in state["emails"]:
-        prompt = f"{SYSTEM_PROMPT}\n\nEmail:\n{email}"
-        response = model.invoke(prompt)
-        text = ""
-        if hasattr(response, "content"):
-            content_attr = response.content
-            if isinstance(content_attr, list) and len(content_attr) > 0:
-                text = getattr(content_attr[0], "text", str(content_attr[0]))
-            else:
-                text = str(content_attr)
-        else:
-            text = str(response)
-        summaries.append(text)
-    state["optimized_emails"] = summaries
-    return state
-
-# ===============================
-# 💾 Save to Sheets + JSON
-# ===============================
-def save_to_sheets_node(state: EmailState):
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_name("gsheet_cred.json", scope)
-    client = gspread.authorize(creds)
-    try:
-        sheet = client.open("Email Summaries").sheet1
-    except Exception:
-        sheet = None
-
-    data_to_save = []
-    for item in state["optimized_emails"]:
-        summary, priority = "", "Unknown"
-        for line in item.splitlines():
-            if line.lower().startswith("summary:"):
-                summary = line.replace("Summary:", "").strip()
-            elif line.lower().startswith("priority:"):
-                priority = line.replace("Priority:", "").strip()
-        data_to_save.append({"Summary": summary, "Priority": priority})
-        if sheet:
-            try:
-                sheet.append_row([summary, priority])
-            except Exception:
-                pass
-
-    os.makedirs("backups", exist_ok=True)
-    filename = f"backups/email_summaries_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data_to_save, f, indent=2, ensure_ascii=False)
-    st.session_state["latest_backup"] = filename
-    return state
+# Streamlit re-runs this script on every widget interaction. LangGraph,
+# LangChain/Gemini and the Google clients are imported, and the model and
+# graph built, only when a run is first triggered, then kept for the life
+# of the server process.
+@st.cache_resource(show_spinner=False)
+def get_search_index():
+    from summarizer.search import search_from_config
+
+    return search_from_config()
+
+@st.cache_resource(show_spinner=False)
+def get_summary_store():
+    from summarizer.pipeline import store_from_config
+
+    return store_from_config()
+
+@st.cache_resource(show_spinner=False)
+def get_pipeline():
+    from summarizer.clients import gemini_model
+    from summarizer.pipeline import build_pipeline, cache_from_config, thread_store_from_config
+    from summarizer.scheduler import digests_from_config
+    from summarizer.sync import SyncStateStore
+
+    model = gemini_model()
+    summary_cache = cache_from_config()
+    summary_store = get_summary_store()
+    sync_store = SyncStateStore(config.SYNC_STATE_PATH)
+    graph = build_pipeline(
+        model, summary_cache=summary_cache, sync_store=sync_store, summary_store=summary_store,
+        thread_store=thread_store_from_config(), digest_store=digests_from_config(),
+        search_index=get_search_index(),
+    )
+    return graph, summary_cache, summary_store
 
 # ===============================
 # ✉️ Email Sender
 # ===============================
 class EmailSender:
     def __init__(self, token_path="token.json"):
-        self.SCOPES = ["https://www.googleapis.com/auth/gmail.send"]
-        self.creds = Credentials.from_authorized_user_file(token_path, self.SCOPES)
-        self.service = build("gmail", "v1", credentials=self.creds)
+        self.SCOPES = GMAIL_SEND
+        # Reuses the cached client across clicks instead of rebuilding it.
+        self.service = gmail_service(token_path=token_path, scopes=self.SCOPES)
+
+    def send_digest(self, recipients: list[str], summaries: list[dict]):
+        """One batched send to every recipient; returns the per-recipient report."""
+        from summarizer.digest import send_digest
+
+        return send_digest(
+            self.service, recipients, summaries, batch_size=config.DIGEST_BATCH_SIZE, limiter=limiter_for("gmail", "me"),
+        )
 
     def send_summary_email(self, to_email: str, summaries: list[dict]):
-        body_lines = ["📬 Here are your summarized emails:\n"]
-        for i, s in enumerate(summaries, start=1):
-            s_lower = {k.lower(): v for k, v in s.items()}
-            summary_text = s_lower.get("summary", "N/A")
-            priority_text = s_lower.get("priority", "Unknown")
-            body_lines.append(f"📨 Email {i}")
-            body_lines.append(f"Summary: {summary_text}")
-            body_lines.append(f"Priority: {priority_text}\n")
-        body = "\n".join(body_lines)
-        message = MIMEText(body, "plain")
-        message["to"] = to_email
-        message["subject"] = "📧 Your Summarized Emails"
-        raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
-        self.service.users().messages().send(userId="me", body={"raw": raw_message}).execute()
+        report = self.send_digest([to_email], summaries)
+        if report["failed"]:
+            raise RuntimeError(report["results"][0]["error"])
         return {"status": "success", "recipient": to_email, "count": len(summaries)}
 
 # ===============================
 # 📂 Load Latest Backup
 # ===============================
-def load_latest_summary_json(folder="backups"):
-    if not os.path.exists(folder):
-        return None, None
-    json_files = [os.path.join(folder, f) for f in os.listdir(folder) if f.endswith(".json")]
-    if not json_files:
+def load_latest_summaries():
+    """Returns (summaries, run id) of the newest saved run, or (None, None)."""
+    run, records = get_summary_store().latest_run()
+    if run is None:
         return None, None
-    latest_file = max(json_files, key=os.path.getmtime)
-    with open(latest_file, "r", encoding="utf-8") as f:
-        return json.load(f), latest_file
+    return [{"Summary": r["summary"], "Priority": r["priority"]} for r in records], run["id"]
+
+# ===============================
+# 📈 Run Metrics
+# ===============================
+def show_run_report(report):
+    """Sidebar breakdown of a run: time per node, API calls, tokens and cache hits."""
+    import pandas as pd
+
+    st.markdown("### 📈 Last Run")
+    st.caption(f"⏱️ {report['seconds']:.2f}s across {len(report['nodes'])} steps")
+    st.bar_chart(pd.Series(report["nodes"], name="seconds"))
+    if report["apis"]:
+        apis = pd.DataFrame.from_dict(report["apis"], orient="index")
+        apis["KB"] = (apis["bytes_sent"] + apis["bytes_received"]) / 1024
+        st.dataframe(apis[["calls", "errors", "retries", "waited", "p50", "p95", "KB"]].round(3))
+    tokens, cache = report["tokens"], report["cache"]
+    st.caption(
+        f"🪙 Gemini tokens: {tokens['prompt']:,} prompt ({tokens.get('cached', 0):,} cached) / {tokens['completion']:,} completion · "
+        f"🗃️ cache: {cache['hits']} hits / {cache['misses']} misses"
+    )
 
 # ===============================
-# 🚀 LangGraph
+# 📄 Paged Results
 # ===============================
-graph = StateGraph(EmailState)
-graph.add_node("FetchEmails", fetch_emails_node)
-graph.add_node("OptimizeEmails", optimize_emails_node)
-graph.add_node("SaveToSheets", save_to_sheets_node)
-graph.add_edge(START, "FetchEmails")
-graph.add_edge("FetchEmails", "OptimizeEmails")
-graph.add_edge("OptimizeEmails", "SaveToSheets")
-graph.add_edge("SaveToSheets", END)
-app_graph = graph.compile()
+# Runs can hold thousands of summaries, so the results view reads one page
+# at a time from the summary store. Filtering, sorting and paging happen in
+# SQLite and never re-run the pipeline; the page and filters live in
+# st.session_state across reruns.
+PAGE_SORTS = {"Email order": "position", "Priority": "priority", "Date": "ts", "Sender": "sender", "Subject": "subject"}
+ALL_SENDERS = "All senders"
+
+
+def _first_results_page():
+    st.session_state["results_page"] = 1
+
+
+def _move_results_page(step):
+    st.session_state["results_page"] = st.session_state.get("results_page", 1) + step
+
+
+def show_results_page(summary_store, run_id):
+    """Filter/sort controls and one page of a saved run's summaries."""
+    from datetime import datetime
+
+    if st.session_state.get("results_run") != run_id:
+        st.session_state["results_run"] = run_id
+        _first_results_page()
+    st.subheader(f"🧠 Summarized Results (run #{run_id})")
+    controls = st.columns([2, 3, 2, 1])
+    priorities = controls[0].multiselect(
+        "Priority", ["High", "Medium", "Low", "Unknown"], key="results_priorities", on_change=_first_results_page,
+    )
+    senders = summary_store.senders(run_id)[:config.RESULTS_MAX_SENDERS]
+    sender = controls[1].selectbox(
+        "Sender", [ALL_SENDERS, *(s for s, _ in senders)], key="results_sender", on_change=_first_results_page,
+    )
+    sort = controls[2].selectbox("Sort by", list(PAGE_SORTS), key="results_sort", on_change=_first_results_page)
+    descending = controls[3].checkbox("Desc", key="results_desc", on_change=_first_results_page)
+
+    page_size = config.RESULTS_PAGE_SIZE
+    page = max(1, st.session_state.get("results_page", 1))
+    query = dict(
+        priorities=priorities or None, sender=None if sender == ALL_SENDERS else sender,
+        sort=PAGE_SORTS[sort], descending=descending, limit=page_size,
+    )
+    records, total = summary_store.page(run_id, offset=(page - 1) * page_size, **query)
+    pages = max(1, -(-total // page_size))
+    if page > pages:
+        page = st.session_state["results_page"] = pages
+        records, total = summary_store.page(run_id, offset=(page - 1) * page_size, **query)
+
+    st.dataframe([{
+        "No.": r["position"],
+        "Date": datetime.fromtimestamp(r["ts"]).strftime("%Y-%m-%d %H:%M"),
+        "From": r["sender"],
+        "Subject": r["subject"],
+        "Priority": r["priority"],
+        "Summary": r["summary"],
+    } for r in records], hide_index=True, use_container_width=True)
+    nav = st.columns([1, 3, 1])
+    nav[0].button("⬅️ Previous", on_click=_move_results_page, args=(-1,), disabled=page <= 1, use_container_width=True)
+    nav[1].caption(f"Page {page} of {pages} · {total} matching summaries")
+    nav[2].button("Next ➡️", on_click=_move_results_page, args=(1,), disabled=page >= pages, use_container_width=True)
+
+# ===============================
+# 🔎 Search Past Summaries
+# ===============================
+def show_search():
+    """Search box over every saved summary, best matches first."""
+    index = get_search_index()
+    if index is None:
+        return
+    st.markdown("---")
+    st.subheader("🔎 Search Past Summaries")
+    query = st.text_input("Search your saved summaries:", placeholder="e.g. failed build on main, overdue invoice")
+    if not query.strip():
+        return
+    from datetime import datetime
+
+    started = time.perf_counter()
+    results = index.search(query, k=config.SEARCH_RESULTS)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if not results:
+        st.info("No saved summaries match yet.")
+        return
+    st.dataframe([{
+        "Score": r["score"],
+        "Date": datetime.fromtimestamp(r["ts"]).strftime("%Y-%m-%d %H:%M"),
+        "From": r["sender"],
+        "Subject": r["subject"],
+        "Priority": r["priority"],
+        "Summary": r["summary"],
+    } for r in results], hide_index=True)
+    st.caption(f"⚡ {len(results)} results in {elapsed_ms:.1f} ms")
 
 # ===============================
 # 🧭 Main UI Layout
@@ -273,50 +303,112 @@ with st.sidebar:
     fetch_clicked = st.button("🚀 Fetch & Summarize My Gmail", use_container_width=True)
 
 if fetch_clicked:
-    with st.spinner("Processing your last 5 emails... 🧠"):
-        state = app_graph.invoke({})
-    st.session_state["summary_data"] = []
+    from collections import deque
 
-    st.subheader("📥 Last 5 Gmail Messages (Fetched)")
-    email_table = pd.DataFrame({"No.": range(1, len(state["emails"]) + 1), "Email Snippet": state["emails"]})
-    gb = GridOptionsBuilder.from_dataframe(email_table)
-    gb.configure_default_column(wrapText=True, autoHeight=True, resizable=True)
-    AgGrid(email_table, gridOptions=gb.build(), theme="material", height=250)
-
-    summaries = []
-    for text in state["optimized_emails"]:
-        summary, priority = "", "Unknown"
-        for line in text.splitlines():
-            if line.lower().startswith("summary:"):
-                summary = line.replace("Summary:", "").strip()
-            elif line.lower().startswith("priority:"):
-                priority = line.replace("Priority:", "").strip()
-        summaries.append({"No.": len(summaries) + 1, "Summary": summary, "Priority": priority})
-    st.session_state["summary_data"] = summaries
+    import pandas as pd
+    from summarizer.pipeline import open_sheet, run_config
 
-    st.subheader("🧠 Summarized Results")
-    summary_df = pd.DataFrame(summaries)
-    gb2 = GridOptionsBuilder.from_dataframe(summary_df)
-    gb2.configure_default_column(wrapText=True, autoHeight=True)
-    AgGrid(summary_df, gridOptions=gb2.build(), theme="balham", height=250)
+    app_graph, summary_cache, _ = get_pipeline()
+    cache_before = summary_cache.stats() if summary_cache is not None else None
+    st.session_state["summary_data"] = []
 
-    if st.session_state.get("latest_backup"):
-        st.success(f"💾 Saved to: {st.session_state['latest_backup']}")
+    st.subheader(f"📥 Last {config.GMAIL_MAX_RESULTS} Gmail Messages (Fetched)")
+    email_slot = st.empty()
+    live_header = st.subheader("🧠 Summarized Results")
+    progress = st.progress(0.0, text="Fetching emails... 📥")
+    summary_slot = st.empty()
+
+    # Stream the graph: rows appear as soon as each email is summarized. Only
+    # the newest rows are redrawn; the full run is paged from the store after.
+    emails, rows, first_summary_s = [], {}, None
+    recent = deque(maxlen=config.RESULTS_LIVE_ROWS)
+    started = time.perf_counter()
+    run_settings = run_config(
+        gmail=lambda: gmail_service(token_path="token.json", scopes=GMAIL_READONLY),
+        sheet=lambda: open_sheet("gsheet_cred.json"),
+    )
+    state = {}
+    for mode, chunk in app_graph.stream({}, run_settings, stream_mode=["custom", "values"]):
+        if mode == "values":
+            state = chunk
+            continue
+        if "emails" in chunk:
+            emails = chunk["emails"]
+            preview = emails[:config.RESULTS_PAGE_SIZE]
+            email_slot.dataframe(pd.DataFrame({"No.": range(1, len(preview) + 1), "Email Snippet": preview}), hide_index=True)
+            if len(emails) > len(preview):
+                st.caption(f"Showing the first {len(preview)} of {len(emails)} fetched emails")
+            progress.progress(0.0, text=f"Summarizing {len(emails)} emails... 🧠")
+            continue
+        if first_summary_s is None:
+            first_summary_s = time.perf_counter() - started
+        record = chunk["record"]
+        rows[chunk["index"]] = {"No.": chunk["index"] + 1, "Summary": record["summary"], "Priority": record["priority"]}
+        recent.appendleft(rows[chunk["index"]])
+        summary_slot.dataframe(pd.DataFrame(list(recent)), hide_index=True)
+        progress.progress(len(rows) / max(len(emails), 1), text=f"Summarized {len(rows)}/{len(emails)} emails... 🧠")
+    total_s = time.perf_counter() - started
+    progress.empty()
+
+    summaries = [rows[i] for i in sorted(rows)]
+    st.session_state["summary_data"] = summaries
+    if state.get("run_id"):
+        # The paged view below takes over from the live table.
+        live_header.empty()
+        summary_slot.empty()
+    st.caption(
+        f"⏱️ First summary after {first_summary_s or 0:.1f}s · "
+        f"all {len(summaries)} done in {total_s:.1f}s"
+    )
+
+    st.session_state["run_report"] = state.get("report")
+    if state.get("run_id"):
+        st.session_state["latest_backup"] = state["run_id"]
+        st.success(f"💾 Saved run #{state['run_id']} to: {config.SUMMARY_STORE_PATH}")
+    report = state.get("sheets_report")
+    if report:
+        st.caption(f"📊 Google Sheets: {report['written']} rows written in {report['requests']} requests ({report['retries']} retries)")
+        if report["failed"]:
+            st.warning(f"⚠️ {report['failed']} rows could not be written to Google Sheets: {report['errors'][-1]}")
+    if summary_cache is not None:
+        stats = summary_cache.stats()
+        hits, misses = stats["hits"] - cache_before["hits"], stats["misses"] - cache_before["misses"]
+        st.caption(
+            f"🗃️ Summary cache: {hits} hits / {misses} misses this run "
+            f"({stats['total_hits']} Gemini calls saved overall)"
+        )
+
+if st.session_state.get("latest_backup"):
+    show_results_page(get_summary_store(), st.session_state["latest_backup"])
 
 if st.session_state.get("summary_data"):
     st.markdown("---")
     st.subheader("📤 Send Summarized Report")
-    user_email = st.text_input("Enter your email address:", placeholder="e.g. yourname@gmail.com")
+    user_email = st.text_input("Enter one or more email addresses:", placeholder="e.g. yourname@gmail.com, team@company.com")
+    recipients = [r.strip() for r in user_email.replace(";", ",").split(",") if r.strip()]
     if st.button("📨 Send to My Inbox", use_container_width=True):
-        if not user_email or "@" not in user_email:
-            st.warning("⚠️ Please enter a valid email address.")
+        if not recipients or any("@" not in r for r in recipients):
+            st.warning("⚠️ Please enter valid email addresses, separated by commas.")
         else:
             try:
                 sender = EmailSender()
-                result = sender.send_summary_email(user_email, st.session_state["summary_data"])
-                st.success(f"✅ Sent to {result['recipient']} ({result['count']} summaries)")
+                report = sender.send_digest(recipients, st.session_state["summary_data"])
+                if report["sent"]:
+                    st.success(f"✅ Sent {len(st.session_state['summary_data'])} summaries to {report['sent']} recipient(s) in {report['batches']} batch request(s)")
+                if report["failed"]:
+                    failed = [r for r in report["results"] if r["status"] == "failed"]
+                    st.warning(f"⚠️ {report['failed']} recipient(s) failed")
+                    st.dataframe([{"Recipient": r["recipient"], "Error": r["error"]} for r in failed], hide_index=True)
             except Exception as e:
                 st.error(f"❌ Failed to send: {e}")
 
-st.caption("✨ Developed by Faraz Uddin Zafar | Powered by Gemini + Gmail API + LangGraph + Streamlit + AgGrid")
+show_search()
+
+# The report file keeps the breakdown across server restarts.
+run_report = st.session_state.get("run_report") or load_report(config.METRICS_REPORT_PATH)
+if run_report:
+    with st.sidebar:
+        show_run_report(run_report)
+
+st.caption("✨ Developed by Faraz Uddin Zafar | Powered by Gemini + Gmail API + LangGraph + Streamlit")
 
@@ -1,19 +1,10 @@
-import os
 import json
-import base64
-import pandas as pd
+import time
 import streamlit as st
-from datetime import datetime
 from dotenv import load_dotenv
-from langgraph.graph import StateGraph, START, END
-from langchain_google_genai import ChatGoogleGenerativeAI
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from oauth2client.service_account import ServiceAccountCredentials
-from email.mime.text import MIMEText
-from typing import TypedDict, List
-import gspread
+from summarizer import config
+from summarizer.ratelimit import limiter_for
+from summarizer.clients import GMAIL_READONLY, GMAIL_SEND, gmail_service, oauth2_service, user_credentials
 
 # ===============================
 # 🌙 Modern Dark Theme
@@ -73,18 +64,38 @@ if "latest_backup" not in st.session_state:
     st.session_state["latest_backup"] = None
 
 # ===============================
-# 🧠 Gemini Model
+# 🧠 Gemini Model + 🚀 LangGraph
 # ===============================
-model = ChatGoogleGenerativeAI(model="gemini-2.5-flash")
-SYSTEM_PROMPT = """
-You are an intelligent assistant that summarizes email content clearly.
-1. Read the email carefully.
-2. Write a short 1–2 line summary.
-3. Assign a priority: High, Medium, or Low.
-Format:
-Summary: <summary>
-Priority: <priority>
-"""
+# Built on the first run, not on every script rerun (see app.py).
+@st.cache_resource(show_spinner=False)
+def get_search_index():
+    from summarizer.search import search_from_config
+
+    return search_from_config()
+
+@st.cache_resource(show_spinner=False)
+def get_summary_store():
+    from summarizer.pipeline import store_from_config
+
+    return store_from_config()
+
+@st.cache_resource(show_spinner=False)
+def get_pipeline():
+    from summarizer.clients import gemini_model
+    from summarizer.pipeline import build_pipeline, cache_from_config, thread_store_from_config
+    from summarizer.scheduler import digests_from_config
+    from summarizer.sync import SyncStateStore
+
+    model = gemini_model()
+    summary_cache = cache_from_config()
+    summary_store = get_summary_store()
+    sync_store = SyncStateStore(config.SYNC_STATE_PATH)
+    graph = build_pipeline(
+        model, summary_cache=summary_cache, sync_store=sync_store, summary_store=summary_store,
+        thread_store=thread_store_from_config(), digest_store=digests_from_config(),
+        search_index=get_search_index(),
+    )
+    return graph, summary_cache, summary_store
 
 # ===============================
 # 🔐 Gmail Login
@@ -105,9 +116,9 @@ def gmail_login():
 
     # Check if token already exists in session_state
     if "gmail_token" in st.session_state:
-        creds = Credentials.from_authorized_user_info(st.session_state["gmail_token"], SCOPES)
+        creds = user_credentials(token_info=st.session_state["gmail_token"], scopes=SCOPES)
         # Verify token by fetching user info
-        user_info_service = build("oauth2", "v2", credentials=creds)
+        user_info_service = oauth2_service(creds)
         user_info = user_info_service.userinfo().get().execute()
         email = user_info.get("email")
         return email, creds
@@ -122,14 +133,16 @@ def gmail_login():
         client_secrets_path = "Em.json"
 
     # Use console-based login for headless / Streamlit servers
+    from google_auth_oauthlib.flow import InstalledAppFlow
     flow = InstalledAppFlow.from_client_secrets_file(client_secrets_path, SCOPES)
     creds = flow.run_console()  # <-- prints URL for user to visit
 
     # Save creds to session_state for reuse
     st.session_state["gmail_token"] = json.loads(creds.to_json())
+    creds = user_credentials(token_info=st.session_state["gmail_token"], scopes=SCOPES)
 
     # Get user email
-    user_info_service = build("oauth2", "v2", credentials=creds)
+    user_info_service = oauth2_service(creds)
     user_info = user_info_service.userinfo().get().execute()
     email = user_info.get("email")
 
@@ -155,140 +168,145 @@ if "user_email" not in st.session_state:
 
 st.sidebar.markdown(f"👤 **Logged in as:** {st.session_state['user_email']}")
 
-# ===============================
-# 🧩 LangGraph State
-# ===============================
-class EmailState(TypedDict):
-    emails: List[str]
-    optimized_emails: List[str]
-
-# ===============================
-# 📥 Fetch Emails
-# ===============================
-def fetch_emails_node(state: EmailState):
-    token_path = st.session_state.get("token_path")
-    creds = Credentials.from_authorized_user_file(token_path, ["https://www.googleapis.com/auth/gmail.readonly"])
-    service = build("gmail", "v1", credentials=creds)
-    results = service.users().messages().list(userId="me", maxResults=5).execute()
-    messages = results.get("messages", [])
-    emails = []
-
-    for msg in messages:
-        msg_detail = service.users().messages().get(userId="me", id=msg["id"]).execute()
-        snippet = msg_detail.get("snippet", "")
-        emails.append(snippet)
-
-    state["emails"] = emails
-    return state
-
-# ===============================
-# 🧠 Summarize Emails
-# ===============================
-def optimize_emails_node(state: EmailState):
-    summaries = []
-    for email in state["emails"]:
-        prompt = f"{SYSTEM_PROMPT}\n\nEmail:\n{email}"
-        response = model.invoke(prompt)
-        text = ""
-
-        if hasattr(response, "content"):
-            content_attr = response.content
-            if isinstance(content_attr, list) and len(content_attr) > 0:
-                text = getattr(content_attr[0], "text", str(content_attr[0]))
-            else:
-                text = str(content_attr)
-        else:
-            text = str(response)
-
-        summaries.append(text)
-
-    state["optimized_emails"] = summaries
-    return state
-
-# ===============================
-# 💾 Save to Sheets + JSON
-# ===============================
-def save_to_sheets_node(state: EmailState):
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_name("gsheet_credentials.json", scope)
-    client = gspread.authorize(creds)
-
-    try:
-        sheet = client.open("Email Summaries").sheet1
-    except Exception:
-        sheet = None
-
-    data_to_save = []
-    for item in state["optimized_emails"]:
-        summary, priority = "", "Unknown"
-        for line in item.splitlines():
-            if line.lower().startswith("summary:"):
-                summary = line.replace("Summary:", "").strip()
-            elif line.lower().startswith("priority:"):
-                priority = line.replace("Priority:", "").strip()
-
-        data_to_save.append({"Summary": summary, "Priority": priority})
-
-        if sheet:
-            try:
-                sheet.append_row([summary, priority])
-            except:
-                pass
-
-    os.makedirs("backups", exist_ok=True)
-    filename = f"backups/email_summaries_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data_to_save, f, indent=2, ensure_ascii=False)
-
-    st.session_state["latest_backup"] = filename
-    return state
-
 # ===============================
 # ✉️ Email Sender
 # ===============================
 class EmailSender:
     def __init__(self, token_path=None):
+        self.SCOPES = GMAIL_SEND
         if token_path is None:
-            token_path = st.session_state.get("token_path")
-
-        self.SCOPES = ["https://www.googleapis.com/auth/gmail.send"]
-        self.creds = Credentials.from_authorized_user_file(token_path, self.SCOPES)
-        self.service = build("gmail", "v1", credentials=self.creds)
-
-    def send_summary_email(self, to_email: str, summaries: list[dict]):
-        body_lines = ["📬 Here are your summarized emails:\n"]
+            # Reuses the logged-in user's cached client across clicks.
+            self.service = gmail_service(token_info=st.session_state["gmail_token"], scopes=self.SCOPES)
+        else:
+            self.service = gmail_service(token_path=token_path, scopes=self.SCOPES)
 
-        for i, s in enumerate(summaries, start=1):
-            summary_text = s.get("Summary", "N/A")
-            priority_text = s.get("Priority", "Unknown")
+    def send_digest(self, recipients: list[str], summaries: list[dict]):
+        """One batched send to every recipient; returns the per-recipient report."""
+        from summarizer.digest import send_digest
 
-            body_lines.append(f"📨 Email {i}")
-            body_lines.append(f"Summary: {summary_text}")
-            body_lines.append(f"Priority: {priority_text}\n")
+        # Sends count against the sending user's Gmail quota.
+        limiter = limiter_for("gmail", st.session_state.get("user_email", "me"))
+        return send_digest(self.service, recipients, summaries, batch_size=config.DIGEST_BATCH_SIZE, limiter=limiter)
 
-        body = "\n".join(body_lines)
+    def send_summary_email(self, to_email: str, summaries: list[dict]):
+        report = self.send_digest([to_email], summaries)
+        if report["failed"]:
+            raise RuntimeError(report["results"][0]["error"])
+        return {"status": "success", "recipient": to_email, "count": len(summaries)}
 
-        message = MIMEText(body, "plain")
-        message["to"] = to_email
-        message["subject"] = "📧 Your Summarized Emails"
-        raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
+# ===============================
+# 📈 Run Metrics
+# ===============================
+def show_run_report(report):
+    """Sidebar breakdown of a run: time per node, API calls, tokens and cache hits."""
+    import pandas as pd
+
+    st.markdown("### 📈 Last Run")
+    st.caption(f"⏱️ {report['seconds']:.2f}s across {len(report['nodes'])} steps")
+    st.bar_chart(pd.Series(report["nodes"], name="seconds"))
+    if report["apis"]:
+        apis = pd.DataFrame.from_dict(report["apis"], orient="index")
+        apis["KB"] = (apis["bytes_sent"] + apis["bytes_received"]) / 1024
+        st.dataframe(apis[["calls", "errors", "retries", "waited", "p50", "p95", "KB"]].round(3))
+    tokens, cache = report["tokens"], report["cache"]
+    st.caption(
+        f"🪙 Gemini tokens: {tokens['prompt']:,} prompt ({tokens.get('cached', 0):,} cached) / {tokens['completion']:,} completion · "
+        f"🗃️ cache: {cache['hits']} hits / {cache['misses']} misses"
+    )
 
-        self.service.users().messages().send(userId="me", body={"raw": raw_message}).execute()
-        return {"status": "success", "recipient": to_email, "count": len(summaries)}
+# ===============================
+# 📄 Paged Results
+# ===============================
+# Runs can hold thousands of summaries, so the results view reads one page
+# at a time from the summary store. Filtering, sorting and paging happen in
+# SQLite and never re-run the pipeline; the page and filters live in
+# st.session_state across reruns.
+PAGE_SORTS = {"Email order": "position", "Priority": "priority", "Date": "ts", "Sender": "sender", "Subject": "subject"}
+ALL_SENDERS = "All senders"
+
+
+def _first_results_page():
+    st.session_state["results_page"] = 1
+
+
+def _move_results_page(step):
+    st.session_state["results_page"] = st.session_state.get("results_page", 1) + step
+
+
+def show_results_page(summary_store, run_id):
+    """Filter/sort controls and one page of a saved run's summaries."""
+    from datetime import datetime
+
+    if st.session_state.get("results_run") != run_id:
+        st.session_state["results_run"] = run_id
+        _first_results_page()
+    st.subheader(f"🧠 Summarized Results (run #{run_id})")
+    controls = st.columns([2, 3, 2, 1])
+    priorities = controls[0].multiselect(
+        "Priority", ["High", "Medium", "Low", "Unknown"], key="results_priorities", on_change=_first_results_page,
+    )
+    senders = summary_store.senders(run_id)[:config.RESULTS_MAX_SENDERS]
+    sender = controls[1].selectbox(
+        "Sender", [ALL_SENDERS, *(s for s, _ in senders)], key="results_sender", on_change=_first_results_page,
+    )
+    sort = controls[2].selectbox("Sort by", list(PAGE_SORTS), key="results_sort", on_change=_first_results_page)
+    descending = controls[3].checkbox("Desc", key="results_desc", on_change=_first_results_page)
+
+    page_size = config.RESULTS_PAGE_SIZE
+    page = max(1, st.session_state.get("results_page", 1))
+    query = dict(
+        priorities=priorities or None, sender=None if sender == ALL_SENDERS else sender,
+        sort=PAGE_SORTS[sort], descending=descending, limit=page_size,
+    )
+    records, total = summary_store.page(run_id, offset=(page - 1) * page_size, **query)
+    pages = max(1, -(-total // page_size))
+    if page > pages:
+        page = st.session_state["results_page"] = pages
+        records, total = summary_store.page(run_id, offset=(page - 1) * page_size, **query)
+
+    st.dataframe([{
+        "No.": r["position"],
+        "Date": datetime.fromtimestamp(r["ts"]).strftime("%Y-%m-%d %H:%M"),
+        "From": r["sender"],
+        "Subject": r["subject"],
+        "Priority": r["priority"],
+        "Summary": r["summary"],
+    } for r in records], hide_index=True, use_container_width=True)
+    nav = st.columns([1, 3, 1])
+    nav[0].button("⬅️ Previous", on_click=_move_results_page, args=(-1,), disabled=page <= 1, use_container_width=True)
+    nav[1].caption(f"Page {page} of {pages} · {total} matching summaries")
+    nav[2].button("Next ➡️", on_click=_move_results_page, args=(1,), disabled=page >= pages, use_container_width=True)
 
 # ===============================
-# 🚀 LangGraph
+# 🔎 Search Past Summaries
 # ===============================
-graph = StateGraph(EmailState)
-graph.add_node("FetchEmails", fetch_emails_node)
-graph.add_node("OptimizeEmails", optimize_emails_node)
-graph.add_node("SaveToSheets", save_to_sheets_node)
-graph.add_edge(START, "FetchEmails")
-graph.add_edge("FetchEmails", "OptimizeEmails")
-graph.add_edge("OptimizeEmails", "SaveToSheets")
-graph.add_edge("SaveToSheets", END)
-app_graph = graph.compile()
+def show_search():
+    """Search box over every saved summary, best matches first."""
+    index = get_search_index()
+    if index is None:
+        return
+    st.markdown("---")
+    st.subheader("🔎 Search Past Summaries")
+    query = st.text_input("Search your saved summaries:", placeholder="e.g. failed build on main, overdue invoice")
+    if not query.strip():
+        return
+    from datetime import datetime
+
+    started = time.perf_counter()
+    results = index.search(query, k=config.SEARCH_RESULTS, user=st.session_state["user_email"])
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if not results:
+        st.info("No saved summaries match yet.")
+        return
+    st.dataframe([{
+        "Score": r["score"],
+        "Date": datetime.fromtimestamp(r["ts"]).strftime("%Y-%m-%d %H:%M"),
+        "From": r["sender"],
+        "Subject": r["subject"],
+        "Priority": r["priority"],
+        "Summary": r["summary"],
+    } for r in results], hide_index=True)
+    st.caption(f"⚡ {len(results)} results in {elapsed_ms:.1f} ms")
 
 # ===============================
 # 🧭 Main UI Layout
@@ -299,50 +317,116 @@ with st.sidebar:
 
 # RUN PIPELINE
 if fetch_clicked:
-    with st.spinner("Processing your last 5 emails... 🧠"):
-        state = app_graph.invoke({})
+    from collections import deque
 
+    import pandas as pd
+    from summarizer.pipeline import open_sheet, run_config
+
+    app_graph, summary_cache, _ = get_pipeline()
+    cache_before = summary_cache.stats() if summary_cache is not None else None
     st.session_state["summary_data"] = []
 
     # Show original emails
-    st.subheader("📥 Last 5 Gmail Messages (Fetched)")
-    email_table = pd.DataFrame({"Email Snippet": state["emails"]})
-    st.table(email_table)
+    st.subheader(f"📥 Last {config.GMAIL_MAX_RESULTS} Gmail Messages (Fetched)")
+    email_slot = st.empty()
+    live_header = st.subheader("🧠 Summarized Results")
+    progress = st.progress(0.0, text="Fetching emails... 📥")
+    summary_slot = st.empty()
+
+    # Stream the graph: rows appear as soon as each email is summarized. Only
+    # the newest rows are redrawn; the full run is paged from the store after.
+    rows, total, first_summary_s = {}, 0, None
+    recent = deque(maxlen=config.RESULTS_LIVE_ROWS)
+    started = time.perf_counter()
+    gmail_token = st.session_state["gmail_token"]
+    run_settings = run_config(
+        gmail=lambda: gmail_service(token_info=gmail_token, scopes=GMAIL_READONLY),
+        sheet=lambda: open_sheet("gsheet_credentials.json"),
+        user=st.session_state["user_email"],
+    )
+    state = {}
+    for mode, chunk in app_graph.stream({}, run_settings, stream_mode=["custom", "values"]):
+        if mode == "values":
+            state = chunk
+            continue
+        if "emails" in chunk:
+            total = len(chunk["emails"])
+            email_slot.dataframe(pd.DataFrame({"Email Snippet": chunk["emails"][:config.RESULTS_PAGE_SIZE]}), hide_index=True)
+            if total > config.RESULTS_PAGE_SIZE:
+                st.caption(f"Showing the first {config.RESULTS_PAGE_SIZE} of {total} fetched emails")
+            progress.progress(0.0, text=f"Summarizing {total} emails... 🧠")
+            continue
+        if first_summary_s is None:
+            first_summary_s = time.perf_counter() - started
+        record = chunk["record"]
+        rows[chunk["index"]] = {"Summary": record["summary"], "Priority": record["priority"]}
+        recent.appendleft(rows[chunk["index"]])
+        summary_slot.dataframe(pd.DataFrame(list(recent)), hide_index=True)
+        progress.progress(len(rows) / max(total, 1), text=f"Summarized {len(rows)}/{total} emails... 🧠")
+    total_s = time.perf_counter() - started
+    progress.empty()
 
     # Extract summaries
-    summaries = []
-    for text in state["optimized_emails"]:
-        summary, priority = "", "Unknown"
-        for line in text.splitlines():
-            if line.lower().startswith("summary:"):
-                summary = line.replace("Summary:", "").strip()
-            elif line.lower().startswith("priority:"):
-                priority = line.replace("Priority:", "").strip()
-
-        summaries.append({"Summary": summary, "Priority": priority})
-
+    summaries = [rows[i] for i in sorted(rows)]
     st.session_state["summary_data"] = summaries
-
-    st.subheader("🧠 Summarized Results")
-    summary_df = pd.DataFrame(summaries)
-    st.table(summary_df)
-
-    if st.session_state.get("latest_backup"):
-        st.success(f"💾 Saved to: {st.session_state['latest_backup']}")
+    if state.get("run_id"):
+        # The paged view below takes over from the live table.
+        live_header.empty()
+        summary_slot.empty()
+    st.caption(
+        f"⏱️ First summary after {first_summary_s or 0:.1f}s · "
+        f"all {len(summaries)} done in {total_s:.1f}s"
+    )
+
+    st.session_state["run_report"] = state.get("report")
+    if state.get("run_id"):
+        st.session_state["latest_backup"] = state["run_id"]
+        st.success(f"💾 Saved run #{state['run_id']} to: {config.SUMMARY_STORE_PATH}")
+    report = state.get("sheets_report")
+    if report:
+        st.caption(f"📊 Google Sheets: {report['written']} rows written in {report['requests']} requests ({report['retries']} retries)")
+        if report["failed"]:
+            st.warning(f"⚠️ {report['failed']} rows could not be written to Google Sheets: {report['errors'][-1]}")
+    if summary_cache is not None:
+        stats = summary_cache.stats()
+        hits, misses = stats["hits"] - cache_before["hits"], stats["misses"] - cache_before["misses"]
+        st.caption(
+            f"🗃️ Summary cache: {hits} hits / {misses} misses this run "
+            f"({stats['total_hits']} Gemini calls saved overall)"
+        )
 
 # SEND EMAIL
+if st.session_state.get("latest_backup"):
+    show_results_page(get_summary_store(), st.session_state["latest_backup"])
+
 if st.session_state.get("summary_data"):
     st.markdown("---")
     st.subheader("📤 Send Summarized Report")
 
-    user_email = st.text_input("Enter email:", value=st.session_state["user_email"])
+    user_email = st.text_input("Enter email (comma-separated for several):", value=st.session_state["user_email"])
+    recipients = [r.strip() for r in user_email.replace(";", ",").split(",") if r.strip()]
 
     if st.button("📨 Send to My Inbox", use_container_width=True):
-        try:
-            sender = EmailSender()
-            result = sender.send_summary_email(user_email, st.session_state["summary_data"])
-            st.success(f"✅ Sent to {result['recipient']} ({result['count']} summaries)")
-        except Exception as e:
-            st.error(f"❌ Failed to send: {e}")
+        if not recipients:
+            st.warning("⚠️ Please enter at least one email address.")
+        else:
+            try:
+                sender = EmailSender()
+                report = sender.send_digest(recipients, st.session_state["summary_data"])
+                if report["sent"]:
+                    st.success(f"✅ Sent {len(st.session_state['summary_data'])} summaries to {report['sent']} recipient(s) in {report['batches']} batch request(s)")
+                if report["failed"]:
+                    failed = [r for r in report["results"] if r["status"] == "failed"]
+                    st.warning(f"⚠️ {report['failed']} recipient(s) failed")
+                    st.dataframe([{"Recipient": r["recipient"], "Error": r["error"]} for r in failed], hide_index=True)
+            except Exception as e:
+                st.error(f"❌ Failed to send: {e}")
+
+show_search()
+
+# Only this session's runs: the report file is shared by every user of the server.
+if st.session_state.get("run_report"):
+    with st.sidebar:
+        show_run_report(st.session_state["run_report"])
 
 st.caption("✨ Developed by Faraz Uddin Zafar | Powered by Gemini + Gmail API + LangGraph + Streamlit")
@@ -0,0 +1,5 @@
+"""
+Offline benchmarks and local fake Google APIs.
+
+Run from the repository root, e.g. ``python -m benchmarks.bench_fetch``.
+"""
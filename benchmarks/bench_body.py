@@ -0,0 +1,149 @@
+"""
+Bytes fetched, peak RSS and prompt size for body extraction on a corpus
+of large messages (multi-MB attachments, quoted reply chains, heavy HTML
+newsletters) served by the fake Gmail API:
+
+  raw      format=raw, whole RFC 822 message parsed with the email module
+  full     format=full, every text part decoded in one go, no cleanup
+  after    format=full + summarizer.body (streamed decode, quotes and
+           signatures dropped, capped at --max-tokens) once every
+           message has been fetched
+  extract  the same, run on each batch as it arrives (the pipeline's
+           path), so only stripped headers and text are kept
+
+Each mode runs in its own process so peak RSS is comparable.
+
+    python -m benchmarks.bench_body [--messages 50] [--max-tokens 1000] [--batch-size 10] [--modes raw full after extract]
+"""
+import argparse
+import base64
+import email
+import json
+import resource
+import subprocess
+import sys
+import time
+from email import policy
+from html.parser import HTMLParser
+
+from googleapiclient.http import BatchHttpRequest
+
+from benchmarks.fake_gmail import FakeGmail, make_large_message, service_for
+from summarizer.body import extract_body, strip_body, walk_parts
+from summarizer.fetch import fetch_messages, list_message_ids
+from summarizer.summarize import estimate_tokens
+
+MODES = ("raw", "full", "after", "extract")
+
+
+class _AllText(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def handle_data(self, data):
+        self.chunks.append(data)
+
+
+def html_to_text(html):
+    parser = _AllText()
+    parser.feed(html)
+    return " ".join(parser.chunks)
+
+
+def naive_text(mime, data):
+    return html_to_text(data) if mime == "text/html" else data
+
+
+def fetch_raw(service, ids, batch_uri, batch_size):
+    found = {}
+    for start in range(0, len(ids), batch_size):
+        batch = BatchHttpRequest(callback=lambda rid, resp, exc: found.__setitem__(rid, resp), batch_uri=batch_uri)
+        for i in ids[start:start + batch_size]:
+            batch.add(service.users().messages().get(userId="me", id=i, format="raw"), request_id=i)
+        batch.execute()
+    return [found[i] for i in ids if found.get(i)]
+
+
+def peak_rss_mb():
+    """
+    Peak RSS of this process. ru_maxrss also counts the parent's RSS at
+    the time of the fork (it survives the exec), so VmHWM is read where
+    Linux provides it.
+    """
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(mode, base_url, max_tokens, batch_size):
+    service = service_for(base_url)
+    batch_uri = base_url + "batch/gmail/v1"
+    ids = list_message_ids(service, max_results=10_000)
+    t0 = time.perf_counter()
+    bodies = []
+    if mode == "raw":
+        for msg in fetch_raw(service, ids, batch_uri, batch_size):
+            parsed = email.message_from_bytes(base64.urlsafe_b64decode(msg["raw"] + "=" * (-len(msg["raw"]) % 4)), policy=policy.default)
+            part = parsed.get_body(preferencelist=("plain", "html"))
+            bodies.append(naive_text(part.get_content_type(), part.get_content()))
+    else:
+        def extract(msg):
+            body = extract_body(msg, max_tokens=max_tokens)
+            strip_body(msg)
+            return body
+
+        if mode == "extract":
+            bodies = fetch_messages(service, ids, batch_uri=batch_uri, fmt="full", batch_size=batch_size, transform=extract)
+        messages = [] if mode == "extract" else fetch_messages(service, ids, batch_uri=batch_uri, fmt="full", batch_size=batch_size)
+        for msg in messages:
+            if mode == "after":
+                bodies.append(extract(msg))
+                continue
+            texts = [
+                naive_text(p["mimeType"], base64.urlsafe_b64decode(p["body"]["data"] + "=" * (-len(p["body"]["data"]) % 4)).decode())
+                for p in walk_parts(msg["payload"]) if p.get("body", {}).get("data")
+            ]
+            bodies.append(texts[0] if texts else msg.get("snippet", ""))
+    print(json.dumps({
+        "seconds": time.perf_counter() - t0,
+        "tokens": sum(estimate_tokens(b) for b in bodies) / max(1, len(bodies)),
+        "rss_mb": peak_rss_mb(),
+    }))
+
+
+def run(n_messages, max_tokens, batch_size, modes=MODES):
+    print(f"{'mode':>8} | {'MB fetched':>10} | {'peak RSS MB':>11} | {'tokens/email':>12} | {'seconds':>7}")
+    with FakeGmail(n_messages=n_messages, factory=make_large_message) as fake:
+        for mode in modes:
+            fake.bytes_sent = 0
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_body", "--child", mode, "--base-url", fake.base_url, "--max-tokens", str(max_tokens),
+                 "--batch-size", str(batch_size)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            print(
+                f"{mode:>8} | {fake.bytes_sent / 2**20:>10.1f} | {result['rss_mb']:>11.1f} | "
+                f"{result['tokens']:>12.0f} | {result['seconds']:>7.2f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--max-tokens", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.base_url, args.max_tokens, args.batch_size)
+    else:
+        run(args.messages, args.max_tokens, args.batch_size, args.modes)
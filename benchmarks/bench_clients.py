@@ -0,0 +1,58 @@
+"""
+Per-click client setup: rebuilding the Gmail service on every click (the
+old node code) vs the process-wide client registry, on the fake Gmail
+server. Each "click" builds/gets the client and lists the inbox once.
+"threads" runs every click on a new thread, as Streamlit runs each rerun,
+through the per-thread Gmail pool.
+
+    python -m benchmarks.bench_clients [--clicks 20] [--latency 0.0]
+"""
+import argparse
+import threading
+import time
+
+from benchmarks.fake_gmail import FakeGmail
+from summarizer.clients import ClientRegistry, ThreadClients
+from summarizer.fetch import list_message_ids
+
+
+def clicks(get_service, n):
+    timings = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        list_message_ids(get_service(), max_results=5)
+        timings.append(time.perf_counter() - t0)
+    return timings
+
+
+def thread_clicks(get_service, n):
+    """clicks(), each on a thread of its own that has finished before the next starts."""
+    timings = []
+    for _ in range(n):
+        thread = threading.Thread(target=lambda: timings.extend(clicks(get_service, 1)))
+        thread.start()
+        thread.join()
+    return timings
+
+
+def run(n_clicks, latency):
+    with FakeGmail(n_messages=50, latency=latency) as fake:
+        rebuilt = clicks(fake.service, n_clicks)
+        registry = ClientRegistry()
+        cached = clicks(lambda: registry.get(("gmail", "me"), fake.service), n_clicks)
+        pool = registry.get(("gmail-threads", "me"), lambda: ThreadClients(fake.service))
+        threaded = thread_clicks(pool.get, n_clicks)
+    assert registry.builds == 2 and pool.builds == 1
+
+    print(f"{'clients':>9} | {'first click ms':>14} | {'later clicks ms':>15}")
+    for name, timings in (("rebuilt", rebuilt), ("registry", cached), ("threads", threaded)):
+        later = sum(timings[1:]) / max(1, len(timings) - 1)
+        print(f"{name:>9} | {timings[0] * 1000:>14.1f} | {later * 1000:>15.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clicks", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated seconds per HTTP round trip")
+    args = parser.parse_args()
+    run(args.clicks, args.latency)
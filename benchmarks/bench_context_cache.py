@@ -0,0 +1,108 @@
+"""
+Context caching of the shared instructions: billed prompt tokens and
+latency per email without caching, with implicit caching (instruction
+sent as a system message) and with an explicit Gemini cached content.
+Runs the stub model, which prices the cached prefix like Gemini 2.5 Flash
+(benchmarks/stub_model.py). Storage of explicit caches counts in the
+billed tokens.
+
+Two instructions are compared: the real SYSTEM_PROMPT, and the same
+prompt with few-shot examples appended up to --long-tokens. Gemini does
+not cache prefixes under 1024 tokens, so the real prompt falls back to
+implicit. Implicit rows are Gemini's best case: every repeat of a long
+enough prefix hits. The last lines show an explicit cache reused by a
+second run and extended across the TTL boundary of a long run.
+
+    python -m benchmarks.bench_context_cache [--emails 400] [--long-tokens 2000] [--concurrency 8]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.fixtures import fixture_inbox
+from benchmarks.stub_model import StubCacheBackend, StubChatModel, fake_summary
+from summarizer.context_cache import ContextCache
+from summarizer.summarize import SYSTEM_PROMPT, asummarize_emails, estimate_tokens
+
+
+def long_instruction(tokens):
+    """SYSTEM_PROMPT plus worked examples until it is about `tokens` long."""
+    examples = []
+    for email in fixture_inbox(1000, seed=5):
+        if estimate_tokens(SYSTEM_PROMPT + "".join(examples)) >= tokens:
+            break
+        summary, priority = fake_summary(email["snippet"])
+        examples.append(f"\nExample email:\n{email['snippet']}\nSummary: {summary}\nPriority: {priority}\n")
+    return SYSTEM_PROMPT + "\nExamples:\n" + "".join(examples)
+
+
+def run(model, emails, instruction, context_cache, concurrency):
+    started = time.perf_counter()
+    texts = asyncio.run(asummarize_emails(
+        model, emails, concurrency, build=lambda email: f"{instruction}\n\nEmail:\n{email}", context_cache=context_cache,
+    ))
+    return texts, time.perf_counter() - started
+
+
+def compare(emails, instructions, concurrency, latency, token_latency):
+    print(
+        f"{'instruction':<16} | {'mode':<17} | {'prompt tok/email':>16} | {'cached':>6} | {'billed tok/email':>16} | "
+        f"{'ms/email':>8} | {'wall s':>6} | same"
+    )
+    for label, instruction in instructions:
+        baseline = None
+        for mode in ("off", "implicit", "explicit"):
+            caches = StubCacheBackend()
+            model = StubChatModel(latency=latency, caches=caches, token_latency=token_latency)
+            context_cache = ContextCache("stub", backend=caches, mode=mode, instructions=(instruction,)) if mode != "off" else None
+            texts, wall = run(model, emails, instruction, context_cache, concurrency)
+            baseline = baseline or texts
+            n = len(emails)
+            effective = mode
+            if mode == "explicit" and not caches.created:
+                effective = "explicit→implicit"
+            print(
+                f"{label:<16} | {effective:<17} | {model.prompt_tokens / n:>16,.0f} | "
+                f"{model.cached_tokens / max(1, model.prompt_tokens):>6.0%} | {model.billed_tokens() / n:>16,.0f} | "
+                f"{sum(model.latencies) / n * 1000:>8.1f} | {wall:>6.2f} | {'yes' if texts == baseline else 'NO'}"
+            )
+
+
+def lifetime(emails, instruction, concurrency):
+    """An explicit cache across two runs, then across its TTL within one run."""
+    now = [time.time()]
+    clock = lambda: now[0]
+    caches = StubCacheBackend(clock=clock)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "context_caches.sqlite3")
+        for n in (1, 2):
+            # A new ContextCache per run, as a new process would have.
+            context_cache = ContextCache("stub", backend=caches, path=path, ttl_seconds=3600, instructions=(instruction,), clock=clock)
+            run(StubChatModel(latency=0, caches=caches), emails, instruction, context_cache, concurrency)
+            print(f"run {n}: {context_cache.stats()}")
+        context_cache = ContextCache(
+            "stub", backend=caches, path=path, ttl_seconds=3600, refresh_seconds=300, instructions=(instruction,), clock=clock,
+        )
+        half = len(emails) // 2
+        run(StubChatModel(latency=0, caches=caches), emails[:half], instruction, context_cache, concurrency)
+        now[0] += 3400  # the run is still going when the cache nears its expiry
+        run(StubChatModel(latency=0, caches=caches), emails[half:], instruction, context_cache, concurrency)
+        print(f"run 3, 57 minutes long: {context_cache.stats()}, Gemini caches created in total: {caches.created}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--emails", type=int, default=400)
+    parser.add_argument("--long-tokens", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.02, help="stub seconds per call")
+    parser.add_argument("--token-latency", type=float, default=2e-5, help="stub seconds per uncached prompt token")
+    args = parser.parse_args()
+    emails = [e["snippet"] for e in fixture_inbox(args.emails)]
+    long = long_instruction(args.long_tokens)
+    print(f"SYSTEM_PROMPT ≈ {estimate_tokens(SYSTEM_PROMPT)} tokens, long instruction ≈ {estimate_tokens(long)} tokens\n")
+    compare(emails, [("SYSTEM_PROMPT", SYSTEM_PROMPT), ("+ examples", long)], args.concurrency, args.latency, args.token_latency)
+    print()
+    lifetime(emails, long, args.concurrency)
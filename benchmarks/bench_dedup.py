@@ -0,0 +1,76 @@
+"""
+Near-duplicate detection before summarization: MinHash signature and LSH
+clustering throughput on a large fixture inbox, and the Gemini calls
+avoided per similarity threshold, compared with skipping exact duplicates
+only. "mixed" counts clustered emails whose representative came from a
+different sender, i.e. a summary reused across unrelated mail. "numbers"
+counts clustered emails whose amounts or ids (any word with a digit
+shorter than the opaque-id length) differ from their representative's,
+i.e. a summary with the wrong figures. "--keys off" clusters on the text
+alone to show what the number keys prevent.
+
+    python -m benchmarks.bench_dedup [--emails 100000] [--thresholds 0.7 0.8 0.9]
+"""
+import argparse
+import re
+import time
+
+import numpy as np
+
+from benchmarks.fixtures import labelled_inbox
+from summarizer.dedup import _ID_LENGTH, clusters, minhash, number_keys
+from summarizer.triage import header_value
+
+
+def numbers(text):
+    """Sorted amounts and ids of text, found independently of summarizer.dedup."""
+    words = re.findall(r"[^\W_]+", text.lower())
+    return tuple(sorted(w for w in words if any(c.isdigit() for c in w) and len(w) < _ID_LENGTH))
+
+
+def run(n_emails, thresholds, num_perm, bands, use_keys=True):
+    messages, _ = labelled_inbox(n_emails)
+    texts = [f"{header_value(m, 'Subject')} {m['snippet']}" for m in messages]
+    senders = np.array([header_value(m, "From") for m in messages])
+    found = [numbers(text) for text in texts]
+
+    t0 = time.perf_counter()
+    signatures = minhash(texts, num_perm)
+    signing = time.perf_counter() - t0
+    print(f"{n_emails} emails, {num_perm} permutations, {bands} bands")
+    print(f"signatures: {signing:.2f}s ({n_emails / signing:,.0f} emails/s)")
+    keys = None
+    if use_keys:
+        t0 = time.perf_counter()
+        keys = number_keys(texts)
+        keying = time.perf_counter() - t0
+        print(f"number keys: {keying:.2f}s ({n_emails / keying:,.0f} emails/s)")
+    print()
+
+    exact = len(set(texts))
+    print(
+        f"{'dedup':<14} | {'cluster s':>9} | {'emails/s':>9} | {'Gemini calls':>12} | {'avoided':>7} | {'mixed':>5} | {'numbers':>7}"
+    )
+    print(f"{'exact text':<14} | {'':>9} | {'':>9} | {exact:>12} | {1 - exact / n_emails:>7.1%} | {0:>5} | {0:>7}")
+    for threshold in thresholds:
+        t0 = time.perf_counter()
+        representative = clusters(signatures, bands, threshold, keys)
+        elapsed = time.perf_counter() - t0
+        calls = int((representative == np.arange(n_emails)).sum())
+        mixed = int((senders[representative] != senders).sum())
+        wrong = sum(found[r] != found[i] for i, r in enumerate(representative))
+        print(
+            f"{f'minhash {threshold:.2f}':<14} | {elapsed:>9.2f} | {n_emails / elapsed:>9,.0f} | "
+            f"{calls:>12} | {1 - calls / n_emails:>7.1%} | {mixed:>5} | {wrong:>7}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--emails", type=int, default=100000)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.7, 0.8, 0.9])
+    parser.add_argument("--num-perm", type=int, default=64)
+    parser.add_argument("--bands", type=int, default=16)
+    parser.add_argument("--keys", choices=["on", "off"], default="on")
+    args = parser.parse_args()
+    run(args.emails, args.thresholds, args.num_perm, args.bands, args.keys == "on")
@@ -0,0 +1,113 @@
+"""
+Daily digest generation as the day's email volume grows. The rollups in
+summarizer.scheduler are updated as each run is saved, so building the
+digest at send time reads a few rows. The baseline aggregates the day's
+rows in SummaryStore when the digest is sent. Also shows a scheduler that
+was down for a few days catching up on the missed digests.
+
+    python -m benchmarks.bench_digest [--volumes 100 1000 10000 50000] [--run-size 50]
+"""
+import argparse
+import time
+from datetime import datetime, timezone
+
+from summarizer.scheduler import DigestStore, render_rollup, run_due
+from summarizer.store import SummaryStore
+
+DAY = datetime(2026, 3, 2, tzinfo=timezone.utc).timestamp()
+PRIORITIES = ["Low"] * 5 + ["Medium"] * 3 + ["High"] * 2
+
+
+def records(n, day=DAY):
+    return [
+        {
+            "message_id": f"{day:.0f}-{i}",
+            "ts": day + i * 86400 / n,
+            "sender": f"sender{i % 97}@example.com",
+            "subject": f"Subject {i}",
+            "priority": PRIORITIES[i % len(PRIORITIES)],
+            "summary": f"Summary of email {i}.",
+        }
+        for i in range(n)
+    ]
+
+
+def aggregate_at_send_time(store, day, top_senders=5, max_high=20):
+    """The day's digest from the saved summaries, built when it is sent."""
+    rows = store.query(since=day, until=day + 86400, limit=-1)
+    priorities, senders = {}, {}
+    for row in rows:
+        priorities[row["priority"]] = priorities.get(row["priority"], 0) + 1
+        if row["sender"]:
+            senders[row["sender"]] = senders.get(row["sender"], 0) + 1
+    high = [
+        {"ts": r["ts"], "sender": r["sender"], "subject": r["subject"], "summary": r["summary"]}
+        for r in rows if r["priority"] == "High"
+    ][:max_high]
+    return {
+        "day": datetime.fromtimestamp(day, timezone.utc).date().isoformat(),
+        "total": len(rows),
+        "priorities": priorities,
+        "top_senders": sorted(senders.items(), key=lambda kv: -kv[1])[:top_senders],
+        "high": high,
+    }
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def volumes(sizes, run_size):
+    print(f"{'emails/day':>10} | {'ingest µs/email':>15} | {'rollup digest ms':>16} | {'aggregate at send ms':>20} | {'same':>4}")
+    for n in sizes:
+        digests, summaries = DigestStore(":memory:"), SummaryStore(":memory:")
+        batch = records(n)
+        t0 = time.perf_counter()
+        for start in range(0, n, run_size):
+            digests.add("me", batch[start:start + run_size])
+        ingest = (time.perf_counter() - t0) / n
+        for start in range(0, n, run_size):
+            summaries.add_run(batch[start:start + run_size])
+
+        day = datetime.fromtimestamp(DAY, timezone.utc).date()
+        rolled = digests.rollup("me", day)
+        naive = aggregate_at_send_time(summaries, DAY)
+        same = rolled["total"] == naive["total"] and rolled["priorities"] == naive["priorities"]
+        fast = best_of(lambda: render_rollup(digests.rollup("me", day)))
+        slow = best_of(lambda: render_rollup(aggregate_at_send_time(summaries, DAY)))
+        print(f"{n:>10} | {ingest * 1e6:>15.1f} | {fast * 1000:>16.3f} | {slow * 1000:>20.3f} | {'yes' if same else 'NO':>4}")
+
+
+def catch_up(days_down):
+    store = DigestStore(":memory:")
+    store.set_schedule("me", ["me@example.com"], send_at="07:00", tz="UTC")
+    store.mark_sent("me", datetime.fromtimestamp(DAY - 86400, timezone.utc).date())
+    for d in range(days_down):
+        store.add("me", records(200, DAY + d * 86400))
+    sent = []
+
+    def send(schedule, rollup, text):
+        sent.append(rollup["day"])
+        return {"sent": len(schedule["recipients"]), "failed": 0}
+
+    # Back up at 09:00 after the last of those days.
+    now = DAY + days_down * 86400 + 9 * 3600
+    results = run_due(store, now=now, send=send)
+    print(f"\nscheduler down {days_down} days: sent {len(sent)} digests ({', '.join(sent)})")
+    print(f"next tick: {len(run_due(store, now=now + 60, send=send))} due")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--volumes", type=int, nargs="+", default=[100, 1000, 10000, 50000])
+    parser.add_argument("--run-size", type=int, default=50, help="summaries saved per pipeline run")
+    parser.add_argument("--days-down", type=int, default=3)
+    args = parser.parse_args()
+    volumes(args.volumes, args.run_size)
+    catch_up(args.days_down)
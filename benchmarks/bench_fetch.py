@@ -0,0 +1,50 @@
+"""
+Serial vs batched Gmail fetch against the local fake Gmail server.
+
+    python -m benchmarks.bench_fetch [--latency 0.01] [--batch-size 50]
+"""
+import argparse
+import time
+
+from benchmarks.fake_gmail import FakeGmail
+from summarizer.fetch import fetch_messages, list_message_ids
+
+
+def serial_fetch(service, ids):
+    # The original fetch_emails_node loop: one full messages.get per id.
+    return [service.users().messages().get(userId="me", id=i).execute() for i in ids]
+
+
+def run(sizes, latency, batch_size):
+    print(f"{'messages':>8} | {'serial s':>9} {'reqs':>5} {'KB':>8} | {'batched s':>9} {'reqs':>5} {'KB':>8} | speedup")
+    for n in sizes:
+        with FakeGmail(n_messages=n, latency=latency) as fake:
+            service = fake.service()
+            ids = list_message_ids(service, max_results=n)
+
+            fake.http_requests, fake.bytes_sent = 0, 0
+            t0 = time.perf_counter()
+            serial = serial_fetch(service, ids)
+            serial_s = time.perf_counter() - t0
+            serial_reqs, serial_kb = fake.http_requests, fake.bytes_sent / 1024
+
+            fake.http_requests, fake.bytes_sent = 0, 0
+            t0 = time.perf_counter()
+            batched = fetch_messages(service, ids, batch_size=batch_size, batch_uri=fake.batch_uri)
+            batched_s = time.perf_counter() - t0
+            batched_reqs, batched_kb = fake.http_requests, fake.bytes_sent / 1024
+
+        assert [m["id"] for m in batched] == [m["id"] for m in serial] == ids
+        print(
+            f"{n:>8} | {serial_s:>9.3f} {serial_reqs:>5} {serial_kb:>8.1f} | "
+            f"{batched_s:>9.3f} {batched_reqs:>5} {batched_kb:>8.1f} | {serial_s / batched_s:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 100, 1000])
+    parser.add_argument("--latency", type=float, default=0.01, help="simulated seconds per HTTP round trip")
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+    run(args.sizes, args.latency, args.batch_size)
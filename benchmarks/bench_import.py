@@ -0,0 +1,88 @@
+"""
+Cold start of the Streamlit app (eager vs lazy imports) and the headless
+CLI, each measured in a fresh interpreter (median of --repeat runs).
+With --profile, also prints an `-X importtime` summary: the top-level
+packages with the largest cumulative import time for each path.
+
+    python -m benchmarks.bench_import [--repeat 5] [--profile]
+"""
+import argparse
+import ast
+import importlib.util
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+PIPELINE = "import summarizer.cli, summarizer.pipeline, langchain_google_genai"
+# What app.py imported at the top of every script run before lazy loading.
+# st_aggrid is not in requirements.txt; it is only timed where installed.
+EAGER = ["streamlit", "pandas", "st_aggrid", "gspread", "googleapiclient.discovery"]
+
+
+def installed(modules):
+    return [m for m in modules if importlib.util.find_spec(m.split(".")[0]) is not None]
+
+
+def top_level_imports(path=APP):
+    """The import statements at module level of path, as runnable code."""
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    nodes = [node for node in ast.parse(source).body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.get_source_segment(source, node) for node in nodes)
+
+
+def targets():
+    return {
+        "app eager": f"import {', '.join(installed(EAGER))}; " + PIPELINE,
+        # What app.py imports now until the first Fetch & Summarize click.
+        "app lazy": top_level_imports(),
+        # Everything `python -m summarizer run` imports before the first API call.
+        "cli": PIPELINE,
+    }
+
+
+def cold_import(code):
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True)
+    return time.perf_counter() - t0
+
+
+def importtime_top(code, top=8):
+    """Top-level packages by cumulative import time (ms) from -X importtime."""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", code], check=True, capture_output=True, text=True).stderr
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        # Top-level entries are the ones imported with no indentation.
+        if cumulative.isdigit() and not line.split("|")[2].startswith("  "):
+            package = name.split(".")[0]
+            totals[package] = totals.get(package, 0) + int(cumulative) / 1000
+    return sorted(totals.items(), key=lambda item: -item[1])[:top]
+
+
+def run(repeat, profile):
+    missing = sorted(set(EAGER) - set(installed(EAGER)))
+    if missing:
+        print(f"not installed, left out of app eager: {', '.join(missing)}\n")
+    print(f"{'path':>10} | {'median s':>8} | {'min s':>6}")
+    for name, code in targets().items():
+        timings = [cold_import(code) for _ in range(repeat)]
+        print(f"{name:>10} | {statistics.median(timings):>8.2f} | {min(timings):>6.2f}")
+    if profile:
+        for name, code in targets().items():
+            print(f"\n-X importtime, {name}:")
+            for package, ms in importtime_top(code):
+                print(f"  {package:<28} {ms:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--profile", action="store_true")
+    args = parser.parse_args()
+    run(args.repeat, args.profile)
@@ -0,0 +1,96 @@
+"""
+What instrumentation reports and what it costs: two pipeline runs against
+the fake Gmail server and the stub model (the second one served from the
+summary cache), printed from their run reports, plus the per-event
+overhead of summarizer.metrics.
+
+    python -m benchmarks.bench_metrics [--emails 200] [--server-concurrency 4]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.fake_gmail import FakeGmail
+from benchmarks.fake_sheets import FakeWorksheet
+from benchmarks.stub_model import StubChatModel
+from summarizer import config, metrics
+
+
+def overhead(n=100000):
+    """Microseconds per recorded API call and per node, with a report current."""
+    report = metrics.RunReport()
+    with metrics.node("bench", report):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            with metrics.call("bench", "noop") as call:
+                call.received = 100
+        per_call = (time.perf_counter() - t0) / n
+    t0 = time.perf_counter()
+    for _ in range(n):
+        with metrics.node("bench", report):
+            pass
+    per_node = (time.perf_counter() - t0) / n
+    return per_call * 1e6, per_node * 1e6
+
+
+def show(name, report):
+    events = sum(api["calls"] + api["retries"] for api in report["apis"].values()) + len(report["nodes"])
+    print(f"\n{name}: {report['seconds']:.2f}s, {events} recorded events")
+    print(f"  {'node':<15} | {'seconds':>7}")
+    for node, seconds in report["nodes"].items():
+        print(f"  {node:<15} | {seconds:>7.3f}")
+    print(f"  {'api':<8} | {'calls':>5} | {'errors':>6} | {'retries':>7} | {'waited s':>8} | {'p50 ms':>6} | {'p95 ms':>6} | {'KB':>7}")
+    for api, s in report["apis"].items():
+        kb = (s["bytes_sent"] + s["bytes_received"]) / 1024
+        print(
+            f"  {api:<8} | {s['calls']:>5} | {s['errors']:>6} | {s['retries']:>7} | {s['waited']:>8.2f} | "
+            f"{s['p50'] * 1000:>6.1f} | {s['p95'] * 1000:>6.1f} | {kb:>7.1f}"
+        )
+    print(
+        f"  tokens {report['tokens']['prompt']} prompt / {report['tokens']['completion']} completion · "
+        f"cache {report['cache']['hits']} hits / {report['cache']['misses']} misses"
+    )
+    return events
+
+
+def run(n_emails, server_concurrency, latency):
+    from summarizer.pipeline import build_pipeline, cache_from_config, run_config
+    from summarizer.store import SummaryStore
+
+    with tempfile.TemporaryDirectory() as tmp, FakeGmail(n_emails) as fake:
+        config.SUMMARY_CACHE_PATH = os.path.join(tmp, "cache.sqlite3")
+        config.METRICS_REPORT_PATH = os.path.join(tmp, "last_run.json")
+        config.METRICS_PROMETHEUS_PATH = os.path.join(tmp, "metrics.prom")
+        config.RATE_LIMIT_BASE_DELAY = latency
+        service = fake.service()
+        sheet = FakeWorksheet(quota=None)
+        # The stub 429s above server_concurrency calls in flight, so Gemini retries show up.
+        model = StubChatModel(latency=latency, max_concurrent=server_concurrency)
+        graph = build_pipeline(model, summary_cache=cache_from_config(), summary_store=SummaryStore(":memory:"))
+
+        runs = []
+        for name in ("cold run", "cached run"):
+            settings = run_config(gmail=lambda: service, sheet=lambda: sheet, max_results=n_emails)
+            state = graph.invoke({}, settings)
+            runs.append((show(name, state["report"]), state["report"]["seconds"]))
+
+        with open(config.METRICS_PROMETHEUS_PATH, encoding="utf-8") as f:
+            samples = [line for line in f if not line.startswith("#")]
+        print(f"\nPrometheus textfile: {len(samples)} samples")
+
+    per_call, per_node = overhead()
+    events, seconds = runs[0]
+    print(
+        f"overhead: {per_call:.2f} µs per API call, {per_node:.2f} µs per node "
+        f"(≈{events * per_call / 1e6 / seconds:.4%} of the cold run)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--emails", type=int, default=200)
+    parser.add_argument("--server-concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated seconds per Gemini call")
+    args = parser.parse_args()
+    run(args.emails, args.server_concurrency, args.latency)
@@ -0,0 +1,46 @@
+"""
+Per-email vs packed summarization: Gemini calls and prompt tokens on the
+fixture inbox.
+
+    python -m benchmarks.bench_packing [--emails 200] [--max-tokens 8000] [--drop-rate 0.02]
+"""
+import argparse
+import time
+
+from benchmarks.fixtures import fixture_inbox
+from benchmarks.stub_model import StubChatModel
+from summarizer.summarize import summarize_emails, summarize_emails_packed
+
+
+def run(n_emails, max_tokens, drop_rate, latency):
+    emails = [e["snippet"] for e in fixture_inbox(n_emails)]
+
+    single = StubChatModel(latency=latency)
+    t0 = time.perf_counter()
+    expected = summarize_emails(single, emails, max_concurrency=8)
+    single_s = time.perf_counter() - t0
+
+    packed = StubChatModel(latency=latency, drop_rate=drop_rate)
+    t0 = time.perf_counter()
+    results = summarize_emails_packed(packed, emails, max_prompt_tokens=max_tokens, max_concurrency=8)
+    packed_s = time.perf_counter() - t0
+    assert results == expected, "packed mode must produce the same per-email answers"
+
+    print(f"{'mode':>8} | {'calls':>6} | {'prompt tokens':>13} | {'seconds':>7}")
+    print(f"{'single':>8} | {single.calls:>6} | {single.prompt_tokens:>13} | {single_s:>7.2f}")
+    print(f"{'packed':>8} | {packed.calls:>6} | {packed.prompt_tokens:>13} | {packed_s:>7.2f}")
+    print(
+        f"calls -{100 * (1 - packed.calls / single.calls):.1f}%, "
+        f"prompt tokens -{100 * (1 - packed.prompt_tokens / single.prompt_tokens):.1f}% "
+        f"(drop rate {drop_rate:.0%} -> per-email fallbacks included)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--emails", type=int, default=200)
+    parser.add_argument("--max-tokens", type=int, default=8000)
+    parser.add_argument("--drop-rate", type=float, default=0.02, help="fraction of packed entries the stub omits")
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+    run(args.emails, args.max_tokens, args.drop_rate, args.latency)
@@ -0,0 +1,96 @@
+"""
+Throughput and accuracy of the batch summary parser against the previous
+line-by-line parser, on synthetic Gemini answers in the formats seen in
+practice (plain, markdown bold, mixed case, extra whitespace, JSON,
+missing priority).
+
+    python -m benchmarks.bench_parse [--responses 100000]
+"""
+import argparse
+import json
+import random
+import time
+
+from summarizer.summarize import parse_summaries
+
+WORDS = "invoice meeting deadline review release payment contract launch update report team budget".split()
+FORMATS = ["plain", "bold", "mixed case", "whitespace", "json", "no priority"]
+
+
+def legacy_parse(text):
+    """The line-by-line parser used before parse_summaries."""
+    summary, priority = "", "Unknown"
+    for line in text.splitlines():
+        if line.lower().startswith("summary:"):
+            summary = line.replace("Summary:", "").strip()
+        elif line.lower().startswith("priority:"):
+            priority = line.replace("Priority:", "").strip()
+    return summary, priority
+
+
+def response(fmt, rng):
+    summary = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 16))).capitalize() + "."
+    priority = rng.choice(["High", "Medium", "Low"])
+    if fmt == "plain":
+        text = f"Summary: {summary}\nPriority: {priority}"
+    elif fmt == "bold":
+        text = f"**Summary:** {summary}\n**Priority:** {priority}"
+    elif fmt == "mixed case":
+        text = f"SUMMARY: {summary}\npriority: {priority.lower()}"
+    elif fmt == "whitespace":
+        text = f"\n  Summary :   {summary}  \n\n   Priority:  {priority}   \n"
+    elif fmt == "json":
+        text = json.dumps({"summary": summary, "priority": priority})
+    else:
+        text, priority = f"Summary: {summary}", "Unknown"
+    return text, (summary, priority)
+
+
+def run(n_responses, seed=0):
+    rng = random.Random(seed)
+    formats = [FORMATS[i % len(FORMATS)] for i in range(n_responses)]
+    samples = [response(fmt, rng) for fmt in formats]
+    texts = [text for text, _ in samples]
+
+    t0 = time.perf_counter()
+    legacy = [legacy_parse(text) for text in texts]
+    legacy_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    batch = [(r["summary"], r["priority"]) for r in parse_summaries(texts)]
+    batch_s = time.perf_counter() - t0
+
+    print(f"{'format':<12} | {'legacy correct':>14} | {'batch correct':>13}")
+    for fmt in FORMATS:
+        rows = [i for i, f in enumerate(formats) if f == fmt]
+        legacy_ok = sum(legacy[i] == samples[i][1] for i in rows) / len(rows)
+        batch_ok = sum(batch[i] == samples[i][1] for i in rows) / len(rows)
+        print(f"{fmt:<12} | {legacy_ok:>14.1%} | {batch_ok:>13.1%}")
+
+    legacy_ok = sum(got == want for got, (_, want) in zip(legacy, samples)) / n_responses
+    batch_ok = sum(got == want for got, (_, want) in zip(batch, samples)) / n_responses
+    print(f"{'all':<12} | {legacy_ok:>14.1%} | {batch_ok:>13.1%}")
+    print(
+        f"\nmixed formats: legacy {n_responses / legacy_s:,.0f} responses/s · "
+        f"batch {n_responses / batch_s:,.0f} responses/s ({n_responses} responses)"
+    )
+
+    # What the pipeline mostly sees: structured output, re-emitted as canonical text.
+    canonical = [response("plain", rng)[0] for _ in range(n_responses)]
+    t0 = time.perf_counter()
+    for text in canonical:
+        legacy_parse(text)
+    legacy_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    parse_summaries(canonical)
+    batch_s = time.perf_counter() - t0
+    print(
+        f"canonical:     legacy {n_responses / legacy_s:,.0f} responses/s · "
+        f"batch {n_responses / batch_s:,.0f} responses/s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--responses", type=int, default=100000)
+    args = parser.parse_args()
+    run(args.responses)
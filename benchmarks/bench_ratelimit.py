@@ -0,0 +1,66 @@
+"""
+Client-side rate limiting against fakes that inject throttling: Gemini
+summaries against a stub that 429s above a concurrency limit, and Gmail
+batch fetches against the fake server with a per-user quota-unit budget.
+Each runs without a limiter and with summarizer.ratelimit.
+
+    python -m benchmarks.bench_ratelimit [--emails 200] [--server-concurrency 6] [--messages 600]
+"""
+import argparse
+import time
+
+from benchmarks.fake_gmail import FakeGmail
+from benchmarks.stub_model import StubChatModel
+from summarizer.fetch import fetch_messages
+from summarizer.ratelimit import AIMDController, ApiLimiter, TokenBucket
+from summarizer.summarize import summarize_emails
+
+
+def gemini(n_emails, server_concurrency, concurrency, latency):
+    emails = [f"Email {i}: the vendor contract needs your sign-off before Friday." for i in range(n_emails)]
+    print(f"Gemini: {n_emails} emails, client concurrency {concurrency}, server allows {server_concurrency} in flight")
+    print(f"{'client':<10} | {'seconds':>7} | {'summarized':>10} | {'429s':>5} | {'retries':>7} | {'final limit':>11}")
+    for name in ("none", "AIMD"):
+        model = StubChatModel(latency=latency, max_concurrent=server_concurrency)
+        limiter = None
+        if name == "AIMD":
+            limiter = ApiLimiter(
+                {"requests": TokenBucket(1000)},
+                controller=AIMDController(initial=concurrency, maximum=concurrency, cooldown=latency),
+                max_retries=8, base_delay=latency,
+            )
+        t0 = time.perf_counter()
+        results = summarize_emails(model, emails, max_concurrency=concurrency, timeout=30, limiter=limiter)
+        elapsed = time.perf_counter() - t0
+        done = sum(1 for r in results if r)
+        retries = limiter.stats["retries"] if limiter else 0
+        final = limiter.controller.limit if limiter else concurrency
+        print(f"{name:<10} | {elapsed:>7.2f} | {done:>10} | {model.throttled:>5} | {retries:>7} | {final:>11}")
+
+
+def gmail(n_messages, units_per_second, batch_size):
+    print(f"\nGmail: fetch {n_messages} messages in batches of {batch_size}, quota {units_per_second:.0f} units/s")
+    print(f"{'client':<10} | {'seconds':>7} | {'fetched':>7} | {'429s':>5}")
+    for name in ("none", "bucket"):
+        with FakeGmail(n_messages, units_per_second=units_per_second) as fake:
+            service = fake.service()
+            ids = [m["id"] for m in fake.messages]
+            limiter = ApiLimiter({"units": TokenBucket(units_per_second)}, base_delay=0.5) if name == "bucket" else None
+            t0 = time.perf_counter()
+            messages = fetch_messages(service, ids, batch_size=batch_size, batch_uri=fake.batch_uri, limiter=limiter)
+            elapsed = time.perf_counter() - t0
+            print(f"{name:<10} | {elapsed:>7.2f} | {len(messages):>7} | {fake.throttled:>5}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--emails", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--server-concurrency", type=int, default=6)
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated seconds per Gemini call")
+    parser.add_argument("--messages", type=int, default=600)
+    parser.add_argument("--units", type=float, default=250, help="Gmail quota units per second")
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+    gemini(args.emails, args.server_concurrency, args.concurrency, args.latency)
+    gmail(args.messages, args.units, args.batch_size)
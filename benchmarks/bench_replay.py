@@ -0,0 +1,105 @@
+"""
+Offline pipeline benchmark on recorded traffic. A run against the fake
+Gmail server and the stub model is recorded to a cassette
+(summarizer.replay). The full pipeline then replays it at 10 / 1k / 10k
+emails: end-to-end throughput, seconds per node and peak Python memory
+(tracemalloc, in a separate replay that must give identical records).
+"instant" replays with no latency. "synthetic" waits --gmail-latency per
+Gmail HTTP request (a batch counts once) and --gemini-latency per Gemini
+call. --cassette replays an existing recording (e.g. one made with
+REPLAY_MODE=record) instead of recording one.
+
+    python -m benchmarks.bench_replay [--emails 10 1000 10000] [--gmail-latency 0.02] [--gemini-latency 0.05]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import httplib2
+
+from benchmarks.fake_gmail import FakeGmail, service_for
+from benchmarks.fixtures import labelled_inbox
+from benchmarks.stub_model import StubChatModel
+from summarizer import config, replay
+from summarizer.pipeline import build_pipeline, run_config
+from summarizer.store import SummaryStore
+
+NODES = ["FetchEmails", "ExtractBodies", "Triage", "OptimizeEmails", "SaveToSheets"]
+
+
+def unthrottled():
+    # Replays have no quota; client-side limits would dominate the timings.
+    config.GMAIL_UNITS_PER_SECOND = 1e9
+    config.GEMINI_RPM = 1e9
+    config.GEMINI_TPM = 1e12
+    config.METRICS_REPORT_PATH = ""
+    config.METRICS_PROMETHEUS_PATH = ""
+
+
+def record(path, n_emails):
+    """Records one run over n_emails fixture emails; returns the cassette."""
+    messages, _ = labelled_inbox(n_emails)
+    cassette = replay.Cassette(path)
+    with FakeGmail(n_emails, factory=lambda i: messages[i]) as fake:
+        service = service_for(fake.base_url, http=replay.RecordingHttp(httplib2.Http(), cassette))
+        model = replay.RecordingModel(StubChatModel(latency=0), cassette)
+        build_pipeline(model).invoke({}, run_config(gmail=lambda: service, max_results=n_emails))
+    return cassette
+
+
+def play(cassette, n_emails, gmail_latency, gemini_latency):
+    """(seconds, final state) of one full pipeline run answered from cassette."""
+    cassette.rewind()
+    service = replay.gmail_service(replay.ReplayHttp(cassette, gmail_latency))
+    graph = build_pipeline(replay.ReplayModel(cassette, gemini_latency), summary_store=SummaryStore(":memory:"))
+    started = time.perf_counter()
+    state = graph.invoke({}, run_config(gmail=lambda: service, max_results=n_emails))
+    return time.perf_counter() - started, state
+
+
+def run(sizes, gmail_latency, gemini_latency, cassette_path=None):
+    unthrottled()
+    profiles = [("instant", 0.0, 0.0), ("synthetic", gmail_latency, gemini_latency)]
+    print(f"Gmail {gmail_latency * 1000:.0f} ms/request, Gemini {gemini_latency * 1000:.0f} ms/call in the synthetic profile\n")
+    header = " | ".join(f"{n[:8]:>8}" for n in NODES)
+    print(f"{'emails':>6} | {'profile':<9} | {'total s':>7} | {'emails/s':>8} | {header} | {'peak MB':>7} | same")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            if cassette_path:
+                cassette = replay.Cassette(cassette_path)
+            else:
+                cassette = record(os.path.join(tmp, f"replay{n}.jsonl"), n)
+            baseline = None
+            for name, gmail, gemini in profiles:
+                seconds, state = play(cassette, n, gmail, gemini)
+                nodes = state["report"]["nodes"]
+                if baseline is None:
+                    # Memory in a second replay: tracemalloc slows the timed one.
+                    tracemalloc.start()
+                    _, again = play(cassette, n, gmail, gemini)
+                    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                    tracemalloc.stop()
+                    baseline = state["records"]
+                    same = again["records"] == baseline
+                    memory = f"{peak:>7.1f}"
+                else:
+                    same = state["records"] == baseline
+                    memory = f"{'':>7}"
+                cells = " | ".join(f"{nodes.get(node, 0.0):>8.3f}" for node in NODES)
+                emails = len(state["records"])
+                print(
+                    f"{emails:>6} | {name:<9} | {seconds:>7.2f} | {emails / seconds:>8,.0f} | {cells} | {memory} | {'yes' if same else 'NO'}"
+                )
+            print(f"{'':>6}   cassette: {len(cassette)} recorded calls")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--emails", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--gmail-latency", type=float, default=0.02)
+    parser.add_argument("--gemini-latency", type=float, default=0.05)
+    parser.add_argument("--cassette", help="replay this recording instead of recording the fixture inbox")
+    args = parser.parse_args()
+    run(args.emails, args.gmail_latency, args.gemini_latency, args.cassette)
@@ -0,0 +1,52 @@
+"""
+Per-rerun cost of the app's module-level setup: constructing the Gemini
+model, opening the summary cache and compiling the LangGraph pipeline on
+every Streamlit script run (before) vs building it once and reusing it
+like st.cache_resource does (after). Imports are warm in both cases, as
+they are on a real rerun.
+
+    python -m benchmarks.bench_rerun [--reruns 50]
+"""
+import argparse
+import functools
+import os
+import tempfile
+import time
+
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from summarizer.cache import SummaryCache
+from summarizer.pipeline import build_pipeline
+
+
+def setup(cache_path):
+    model = ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=os.getenv("GOOGLE_API_KEY", "offline-benchmark"))
+    return build_pipeline(model, summary_cache=SummaryCache(cache_path)), model
+
+
+def reruns(fn, n):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1000
+
+
+def run(n):
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "cache.sqlite3")
+        eager_ms = reruns(lambda: setup(cache_path), n)
+        cached = functools.cache(lambda: setup(cache_path))
+        first_ms = reruns(cached, 1)
+        cached_ms = reruns(cached, n)
+
+    print(f"{'setup':>14} | {'ms per rerun':>12}")
+    print(f"{'every rerun':>14} | {eager_ms:>12.2f}")
+    print(f"{'cached (1st)':>14} | {first_ms:>12.2f}")
+    print(f"{'cached':>14} | {cached_ms:>12.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reruns", type=int, default=50)
+    args = parser.parse_args()
+    run(args.reruns)
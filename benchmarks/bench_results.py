@@ -0,0 +1,132 @@
+"""
+Streamlit results views for large runs: the previous full tables versus
+the paged view backed by the summary store, at 100 / 1k / 10k summaries.
+Each view is rendered headless with streamlit's AppTest. Render time is
+the script run on the server; payload is the size of the elements sent
+to the browser (AgGrid was not installed here: its payload is estimated
+as the rowData JSON it is given). "stream" is the total table payload
+redrawn while a run streams in, one redraw per summary.
+
+    python -m benchmarks.bench_results [--rows 100 1000 10000]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.fixtures import labelled_inbox
+from summarizer.store import SummaryStore
+from summarizer.triage import header_value
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def full_table(path, run_id):
+    """app2.py before: every summary as static HTML."""
+    import pandas as pd
+    import streamlit as st
+    from summarizer.store import SummaryStore
+
+    _, records = SummaryStore(path).latest_run()
+    st.table(pd.DataFrame([{"Summary": r["summary"], "Priority": r["priority"]} for r in records]))
+
+
+def full_dataframe(path, run_id):
+    """Every summary in one st.dataframe (the grid without paging)."""
+    import pandas as pd
+    import streamlit as st
+    from summarizer.store import SummaryStore
+
+    _, records = SummaryStore(path).latest_run()
+    st.dataframe(pd.DataFrame([{"No.": i + 1, "Summary": r["summary"], "Priority": r["priority"]} for i, r in enumerate(records)]))
+
+
+def paged(path, run_id, app):
+    """The paged view from app.py."""
+    import time
+
+    import streamlit as st
+    from summarizer import config
+    from summarizer.store import SummaryStore
+
+    scope = {"st": st, "time": time, "config": config}
+    with open(app, encoding="utf-8") as f:
+        source = f.read()
+    exec(source.split("# 📄 Paged Results\n# ===============================\n")[1].split("# ===============================")[0], scope)
+    scope["show_results_page"](SummaryStore(path), run_id)
+
+
+def payload(node):
+    """Bytes of every element proto under an AppTest node."""
+    total = node.proto.ByteSize() if getattr(node, "proto", None) is not None else 0
+    for child in getattr(node, "children", {}).values():
+        total += payload(child)
+    return total
+
+
+def render(script, args, repeat=3):
+    best, size = float("inf"), 0
+    for _ in range(repeat):
+        from streamlit.testing.v1 import AppTest
+
+        at = AppTest.from_function(script, args=args, default_timeout=60)
+        t0 = time.perf_counter()
+        at.run()
+        best = min(best, time.perf_counter() - t0)
+        assert not at.exception, at.exception
+        size = payload(at.main)
+    return best, size
+
+
+def stream_payload(records, live_rows=None, samples=50):
+    """Table bytes sent over a streamed run, redrawing after every summary (sampled)."""
+    import pandas as pd
+    from streamlit import dataframe_util
+
+    n = len(records)
+    step = max(1, n // samples)
+    total = 0
+    for i in range(step, n + 1, step):
+        shown = records[max(0, i - live_rows):i] if live_rows else records[:i]
+        frame = pd.DataFrame([{"Summary": r["summary"], "Priority": r["priority"]} for r in shown])
+        total += len(dataframe_util.convert_anything_to_arrow_bytes(frame)) * step
+    return total
+
+
+def run(sizes):
+    from summarizer import config
+
+    print(f"{'rows':>6} | {'view':<18} | {'render ms':>9} | {'payload KB':>10} | {'stream KB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = os.path.join(tmp, f"runs{n}.sqlite3")
+            messages, _ = labelled_inbox(n)
+            records = [
+                {"message_id": m["id"], "ts": int(m["internalDate"]) / 1000, "sender": header_value(m, "From"),
+                 "subject": header_value(m, "Subject"), "priority": ("High", "Medium", "Low")[i % 3], "summary": m["snippet"]}
+                for i, m in enumerate(messages)
+            ]
+            run_id = SummaryStore(path).add_run(records)
+
+            full_stream = stream_payload(records) / 1024
+            live_stream = stream_payload(records, config.RESULTS_LIVE_ROWS) / 1024
+            grid_json = len(json.dumps([
+                {"No.": i + 1, "Summary": r["summary"], "Priority": r["priority"]} for i, r in enumerate(records)
+            ])) + len(json.dumps([{"No.": i + 1, "Email Snippet": r["summary"]} for i, r in enumerate(records)]))
+            print(f"{n:>6} | {'AgGrid (before)':<18} | {'':>9} | {grid_json / 1024:>10.1f} | {full_stream:>10.1f}")
+            for name, script, args in (
+                ("st.table (before)", full_table, (path, run_id)),
+                ("st.dataframe (all)", full_dataframe, (path, run_id)),
+                ("paged", paged, (path, run_id, APP)),
+            ):
+                seconds, size = render(script, args)
+                stream = live_stream if name == "paged" else full_stream
+                print(f"{n:>6} | {name:<18} | {seconds * 1000:>9.1f} | {size / 1024:>10.1f} | {stream:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000])
+    args = parser.parse_args()
+    run(args.rows)
@@ -0,0 +1,117 @@
+"""
+Semantic search over saved summaries: query latency and recall@k of the
+exact NumPy index and the IVF index at 10k / 100k / 1M vectors, plus the
+hashing embedder's throughput and an end-to-end SearchIndex (SQLite +
+embedding + index) on the fixture inbox.
+
+Vectors are synthetic unit vectors drawn around topic centers, like
+embeddings of many emails about fewer subjects; queries are perturbed
+copies of stored vectors. Recall is measured against the exact index.
+
+    python -m benchmarks.bench_search [--sizes 10000 100000 1000000] [--dim 128] [--nprobe 4 16]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.fixtures import labelled_inbox
+from summarizer.search import FlatIndex, HashingEmbedder, IVFIndex, SearchIndex, normalize
+from summarizer.triage import header_value
+
+
+def synthetic(n, dim, topics=2000, noise=0.6, seed=0, chunk=100000):
+    rng = np.random.default_rng(seed)
+    centers = normalize(rng.standard_normal((topics, dim), dtype=np.float32))
+    out = np.empty((n, dim), dtype=np.float32)
+    for i in range(0, n, chunk):
+        m = min(chunk, n - i)
+        noisy = centers[rng.integers(0, topics, m)] + noise / np.sqrt(dim) * rng.standard_normal((m, dim), dtype=np.float32)
+        out[i:i + m] = normalize(noisy)
+    return out
+
+
+def timed_queries(index, queries, k):
+    """(mean ms per query, result ids per query)."""
+    results = []
+    t0 = time.perf_counter()
+    for q in queries:
+        results.append(index.search(q, k)[0])
+    return (time.perf_counter() - t0) * 1000 / len(queries), results
+
+
+def recall(found, truth):
+    return np.mean([len(set(f.tolist()) & set(t.tolist())) / len(t) for f, t in zip(found, truth)])
+
+
+def indexes(sizes, dim, nprobes, n_queries, k):
+    print(f"{'vectors':>9} | {'index':<12} | {'build s':>7} | {'ms/query':>8} | {f'recall@{k}':>9}")
+    rng = np.random.default_rng(1)
+    for n in sizes:
+        vectors = synthetic(n, dim)
+        picks = rng.integers(0, n, n_queries)
+        queries = normalize(vectors[picks] + 0.3 / np.sqrt(dim) * rng.standard_normal((n_queries, dim), dtype=np.float32))
+
+        flat = FlatIndex(dim)
+        t0 = time.perf_counter()
+        flat.add(vectors)
+        build = time.perf_counter() - t0
+        ms, truth = timed_queries(flat, queries, k)
+        print(f"{n:>9} | {'flat':<12} | {build:>7.2f} | {ms:>8.2f} | {1.0:>9.3f}")
+
+        ivf = IVFIndex(dim)
+        t0 = time.perf_counter()
+        ivf.add(vectors)
+        build = time.perf_counter() - t0
+        for nprobe in nprobes:
+            ivf.nprobe = nprobe
+            ms, found = timed_queries(ivf, queries, k)
+            # Below min_train vectors the IVF index searches exactly.
+            label = f"ivf {len(ivf.centroids)}/{nprobe}" if ivf.centroids is not None else "ivf (flat)"
+            print(f"{n:>9} | {label:<12} | {build:>7.2f} | {ms:>8.2f} | {recall(found, truth):>9.3f}")
+        del flat, ivf, vectors
+
+
+def end_to_end(n_emails, k):
+    messages, _ = labelled_inbox(n_emails)
+    records = [
+        {"message_id": m["id"], "ts": int(m["internalDate"]) / 1000, "sender": header_value(m, "From"),
+         "subject": header_value(m, "Subject"), "priority": "Low", "summary": m["snippet"][:80]}
+        for m in messages
+    ]
+    snippets = [m["snippet"] for m in messages]
+    embedder = HashingEmbedder()
+    t0 = time.perf_counter()
+    embedder.encode([SearchIndex.text(r, s) for r, s in zip(records, snippets)])
+    embed = time.perf_counter() - t0
+
+    index = SearchIndex(":memory:", embedder)
+    t0 = time.perf_counter()
+    # Saved the way SaveToSheets does, one run at a time.
+    for i in range(0, n_emails, 50):
+        index.add("me", records[i:i + 50], snippets[i:i + 50])
+    insert = time.perf_counter() - t0
+    queries = ["invoice overdue licences", "build failed on main", "weekend hike and dinner", "security sign in new device"]
+    index.search(queries[0], k)  # loads the vectors once
+    t0 = time.perf_counter()
+    for q in queries * 25:
+        top = index.search(q, k)
+    per_query = (time.perf_counter() - t0) * 1000 / (len(queries) * 25)
+    print(
+        f"\nSearchIndex on {n_emails} fixture emails: embedding {n_emails / embed:,.0f} texts/s, "
+        f"incremental inserts {insert * 1e6 / n_emails:.0f} µs/email, {per_query:.2f} ms/query (k={k})"
+    )
+    print(f'  "{q}" → {top[0]["subject"]} ({top[0]["score"]})')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--emails", type=int, default=10000)
+    args = parser.parse_args()
+    indexes(args.sizes, args.dim, args.nprobe, args.queries, args.k)
+    end_to_end(args.emails, args.k)
@@ -0,0 +1,73 @@
+"""
+Digest delivery to many recipients against the fake Gmail send endpoint:
+one messages.send request per recipient (the previous EmailSender path)
+versus summarizer.digest.send_digest's batched sends. Run once without a
+quota, where the per-request latency dominates, and once with Gmail's
+per-user quota, where the limiter's pacing does.
+
+    python -m benchmarks.bench_send [--recipients 200] [--latency 0.02] [--quota-recipients 12]
+"""
+import argparse
+import base64
+import time
+from email.mime.text import MIMEText
+
+from benchmarks.fake_gmail import FakeGmail
+from summarizer.digest import send_digest
+from summarizer.ratelimit import GMAIL_UNITS, ApiLimiter, TokenBucket
+
+SUMMARIES = [{"Summary": f"Vendor contract {i} needs sign-off before Friday.", "Priority": "High"} for i in range(20)]
+
+
+def send_one_by_one(service, recipients, summaries, limiter=None):
+    """The previous EmailSender.send_summary_email, called once per recipient."""
+    failed = 0
+    for to_email in recipients:
+        body_lines = ["📬 Here are your summarized emails:\n"]
+        for i, s in enumerate(summaries, start=1):
+            body_lines.append(f"📨 Email {i}")
+            body_lines.append(f"Summary: {s.get('Summary', 'N/A')}")
+            body_lines.append(f"Priority: {s.get('Priority', 'Unknown')}\n")
+        message = MIMEText("\n".join(body_lines), "plain")
+        message["to"] = to_email
+        message["subject"] = "📧 Your Summarized Emails"
+        raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
+        request = service.users().messages().send(userId="me", body={"raw": raw_message})
+        try:
+            if limiter:
+                limiter.call(request.execute, units=GMAIL_UNITS["send"])
+            else:
+                request.execute()
+        except Exception:
+            failed += 1
+    return failed
+
+
+def scenario(title, n_recipients, latency, units_per_second):
+    recipients = [f"member{i}@team.example.com" for i in range(n_recipients)]
+    print(f"\n{title}: {n_recipients} recipients, {latency * 1000:.0f} ms per HTTP request")
+    print(f"{'client':<20} | {'seconds':>7} | {'HTTP requests':>13} | {'delivered':>9} | {'failed':>6} | {'429s':>5}")
+    for name in ("one by one", "batched"):
+        for limited in ((False, True) if units_per_second else (False,)):
+            with FakeGmail(0, latency=latency, units_per_second=units_per_second) as fake:
+                service = fake.service()
+                limiter = ApiLimiter({"units": TokenBucket(units_per_second)}, base_delay=0.5) if limited else None
+                t0 = time.perf_counter()
+                if name == "one by one":
+                    failed = send_one_by_one(service, recipients, SUMMARIES, limiter)
+                else:
+                    failed = send_digest(service, recipients, SUMMARIES, retries=4, limiter=limiter)["failed"]
+                elapsed = time.perf_counter() - t0
+                label = f"{name} + limiter" if limited else name
+                print(f"{label:<20} | {elapsed:>7.2f} | {fake.http_requests:>13} | {len(fake.sent):>9} | {failed:>6} | {fake.throttled:>5}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--recipients", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated seconds per HTTP request")
+    parser.add_argument("--quota-recipients", type=int, default=12)
+    parser.add_argument("--units", type=float, default=250, help="Gmail quota units per user per second")
+    args = parser.parse_args()
+    scenario("No quota", args.recipients, args.latency, None)
+    scenario(f"Quota {args.units:.0f} units/s (100 per send)", args.quota_recipients, args.latency, args.units)
@@ -0,0 +1,49 @@
+"""
+Per-row append_row vs chunked append_rows against a fake worksheet that
+enforces the Sheets per-minute write quota.
+
+    python -m benchmarks.bench_sheets [--rows 5 100 1000] [--quota 60]
+"""
+import argparse
+
+from benchmarks.fake_sheets import FakeWorksheet
+from summarizer.sheets import append_rows_chunked
+
+
+def per_row(sheet, rows):
+    # The original save_to_sheets_node loop: errors are silently dropped.
+    written = 0
+    for row in rows:
+        try:
+            sheet.append_row(row)
+            written += 1
+        except Exception:
+            pass
+    return written
+
+
+def run(sizes, quota, chunk_size):
+    print(f"{'rows':>6} | {'per-row reqs':>12} {'written':>8} {'lost':>6} | {'bulk reqs':>9} {'written':>8} {'retries':>7} {'failed':>6}")
+    for n in sizes:
+        rows = [[f"Summary {i}", "Low"] for i in range(n)]
+
+        serial = FakeWorksheet(quota=quota)
+        written = per_row(serial, rows)
+
+        bulk = FakeWorksheet(quota=quota)
+        report = append_rows_chunked(bulk, rows, chunk_size=chunk_size, sleep=bulk.sleep)
+        assert len(bulk.rows) == report["written"] and report["written"] + report["failed"] == n
+
+        print(
+            f"{n:>6} | {serial.requests:>12} {written:>8} {n - written:>6} | "
+            f"{bulk.requests:>9} {report['written']:>8} {report['retries']:>7} {report['failed']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[5, 100, 1000])
+    parser.add_argument("--quota", type=int, default=60, help="write requests allowed per simulated minute")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+    run(args.rows, args.quota, args.chunk_size)
@@ -0,0 +1,82 @@
+"""
+Latest-run lookup and filtered queries: one JSON file per run in a
+backups folder (the old load_latest_summary_json) vs the indexed
+SQLite summary store, at 10k+ runs.
+
+    python -m benchmarks.bench_store [--runs 10000] [--per-run 5]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.fixtures import fixture_inbox
+from summarizer.store import SummaryStore
+
+PRIORITIES = ["High", "Medium", "Low"]
+
+
+def load_latest_summary_json(folder):
+    # The original app.py lookup: stat every file to find the newest.
+    json_files = [os.path.join(folder, f) for f in os.listdir(folder) if f.endswith(".json")]
+    latest_file = max(json_files, key=os.path.getmtime)
+    with open(latest_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def timed(fn, repeat=1):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - t0) / repeat * 1000
+
+
+def run(n_runs, per_run):
+    inbox = fixture_inbox(per_run * 50)
+    start = time.time() - n_runs * 3600
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, "backups")
+        os.makedirs(folder)
+        store = SummaryStore(os.path.join(tmp, "summaries.sqlite3"))
+        for r in range(n_runs):
+            created = start + r * 3600
+            emails = [inbox[(r * per_run + i) % len(inbox)] for i in range(per_run)]
+            items = [{"Summary": e["snippet"][:80], "Priority": PRIORITIES[(r + i) % 3]} for i, e in enumerate(emails)]
+            path = os.path.join(folder, f"email_summaries_{time.strftime('%Y%m%d_%H%M%S', time.localtime(created))}_{r}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(items, f)
+            os.utime(path, (created, created))
+            store.add_run(
+                [{"message_id": e["id"], "ts": created, "sender": e["sender"], "subject": e["subject"],
+                  "priority": item["Priority"], "summary": item["Summary"]} for e, item in zip(emails, items)],
+                created_at=created,
+            )
+
+        legacy, legacy_ms = timed(lambda: load_latest_summary_json(folder), repeat=5)
+        (_, latest), store_ms = timed(lambda: store.latest_run(), repeat=100)
+        assert [r["summary"] for r in latest] == [i["Summary"] for i in legacy]
+
+        week_ago = start + (n_runs - 24 * 7) * 3600
+        rows, sender_ms = timed(lambda: store.query(sender="boss@company.com", since=week_ago, limit=1000), repeat=100)
+        high, high_ms = timed(lambda: store.query(priority="High", since=week_ago, limit=1000), repeat=100)
+
+        migrated = SummaryStore(os.path.join(tmp, "migrated.sqlite3"))
+        added, import_ms = timed(lambda: migrated.import_backups(folder))
+        assert added == n_runs
+
+    print(f"{n_runs} runs x {per_run} summaries")
+    print(f"{'operation':>28} | {'ms':>9}")
+    print(f"{'latest run (JSON files)':>28} | {legacy_ms:>9.2f}")
+    print(f"{'latest run (store)':>28} | {store_ms:>9.3f}")
+    print(f"{'sender, last week (store)':>28} | {sender_ms:>9.3f}  ({len(rows)} rows)")
+    print(f"{'High, last week (store)':>28} | {high_ms:>9.3f}  ({len(high)} rows)")
+    print(f"{'import backups/*.json':>28} | {import_ms:>9.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10000)
+    parser.add_argument("--per-run", type=int, default=5)
+    args = parser.parse_args()
+    run(args.runs, args.per_run)
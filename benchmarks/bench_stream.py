@@ -0,0 +1,77 @@
+"""
+Time-to-first-summary vs total time: blocking graph.invoke against
+graph.stream with per-email custom events, using the stub Gemini model.
+
+    python -m benchmarks.bench_stream [--emails 64] [--concurrency 8] [--mode single]
+"""
+import argparse
+import time
+from typing import List, TypedDict
+
+from langgraph.config import get_stream_writer
+from langgraph.graph import END, START, StateGraph
+
+from benchmarks.fixtures import fixture_inbox
+from benchmarks.stub_model import StubChatModel
+from summarizer.summarize import summarize
+
+
+class BenchState(TypedDict):
+    emails: List[str]
+    optimized_emails: List[str]
+
+
+def build_graph(model, n_emails, mode, concurrency):
+    # Same shape as the apps' pipeline, with the fixture inbox as "Gmail".
+    def fetch_emails_node(state):
+        state["emails"] = [e["snippet"] for e in fixture_inbox(n_emails)]
+        get_stream_writer()({"emails": state["emails"]})
+        return state
+
+    def optimize_emails_node(state):
+        writer = get_stream_writer()
+        state["optimized_emails"] = summarize(
+            model, state["emails"], mode=mode, max_concurrency=concurrency,
+            on_result=lambda index, text: writer({"index": index, "summary": text}),
+        )
+        return state
+
+    graph = StateGraph(BenchState)
+    graph.add_node("FetchEmails", fetch_emails_node)
+    graph.add_node("OptimizeEmails", optimize_emails_node)
+    graph.add_edge(START, "FetchEmails")
+    graph.add_edge("FetchEmails", "OptimizeEmails")
+    graph.add_edge("OptimizeEmails", END)
+    return graph.compile()
+
+
+def run(n_emails, concurrency, mode, latency):
+    blocking = build_graph(StubChatModel(latency=latency), n_emails, mode, concurrency)
+    t0 = time.perf_counter()
+    expected = blocking.invoke({})["optimized_emails"]
+    blocking_s = time.perf_counter() - t0
+
+    streaming = build_graph(StubChatModel(latency=latency), n_emails, mode, concurrency)
+    rows, first_s = {}, None
+    t0 = time.perf_counter()
+    for chunk in streaming.stream({}, stream_mode="custom"):
+        if "summary" in chunk:
+            first_s = first_s or time.perf_counter() - t0
+            rows[chunk["index"]] = chunk["summary"]
+    streaming_s = time.perf_counter() - t0
+    assert [rows[i] for i in range(n_emails)] == expected
+
+    print(f"{'path':>9} | {'first summary s':>15} | {'total s':>7}")
+    # With invoke nothing can be shown until the whole graph has finished.
+    print(f"{'invoke':>9} | {blocking_s:>15.2f} | {blocking_s:>7.2f}")
+    print(f"{'stream':>9} | {first_s:>15.2f} | {streaming_s:>7.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--emails", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mode", choices=["single", "packed"], default="single")
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated seconds per Gemini call")
+    args = parser.parse_args()
+    run(args.emails, args.concurrency, args.mode, args.latency)
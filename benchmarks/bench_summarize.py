@@ -0,0 +1,33 @@
+"""
+Summarization throughput vs max concurrency, using the stub Gemini model.
+
+    python -m benchmarks.bench_summarize [--emails 64] [--latency 0.2]
+"""
+import argparse
+import time
+
+from benchmarks.stub_model import StubChatModel
+from summarizer.summarize import summarize_emails
+
+
+def run(n_emails, latency, levels):
+    emails = [f"Email {i}: quarterly numbers are attached, please confirm by Monday." for i in range(n_emails)]
+    print(f"{'concurrency':>11} | {'seconds':>8} | {'emails/s':>9} | speedup")
+    baseline = None
+    for level in levels:
+        model = StubChatModel(latency=latency)
+        t0 = time.perf_counter()
+        results = summarize_emails(model, emails, max_concurrency=level, timeout=30)
+        elapsed = time.perf_counter() - t0
+        assert len(results) == n_emails and all(f"Email {i}:" in r for i, r in enumerate(results))
+        baseline = baseline or elapsed
+        print(f"{level:>11} | {elapsed:>8.2f} | {n_emails / elapsed:>9.1f} | {baseline / elapsed:>6.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--emails", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated seconds per Gemini call")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+    run(args.emails, args.latency, args.levels)
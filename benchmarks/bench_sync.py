@@ -0,0 +1,75 @@
+"""
+Full re-list vs historyId-based incremental sync on the fake Gmail API,
+including history pagination, deltas larger than max_delta (spread over
+several runs) and the expired-history fallback.
+
+    python -m benchmarks.bench_sync [--inbox 5000] [--delta 25]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.fake_gmail import FakeGmail
+from summarizer.fetch import list_message_ids
+from summarizer.sync import SyncStateStore, sync_message_ids
+
+
+def timed(fake, fn):
+    fake.http_requests, fake.bytes_sent = 0, 0
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0, fake.http_requests, fake.bytes_sent / 1024
+
+
+def run(inbox, delta, latency):
+    with tempfile.TemporaryDirectory() as tmp, FakeGmail(n_messages=inbox, latency=latency) as fake:
+        service = fake.service()
+        store = SyncStateStore(os.path.join(tmp, "sync_state.json"))
+
+        # First run: nothing stored yet, so a full list seeds the history id.
+        (ids, history_id), *_ = timed(fake, lambda: sync_message_ids(service, store, "me", max_results=inbox))
+        store.set("me", history_id)
+        assert len(ids) == inbox
+
+        fake.add_messages(delta)
+        expected = [m["id"] for m in fake.messages[::-1][:delta]]
+
+        full, full_s, full_reqs, full_kb = timed(fake, lambda: list_message_ids(service, max_results=inbox + delta))
+        (inc, history_id), inc_s, inc_reqs, inc_kb = timed(fake, lambda: sync_message_ids(service, store, "me", max_results=inbox))
+        assert inc == expected and full[:delta] == expected
+        store.set("me", history_id)
+
+        print(f"{'mode':>12} | {'ids':>6} | {'requests':>8} | {'KB':>8} | {'seconds':>7}")
+        print(f"{'full list':>12} | {len(full):>6} | {full_reqs:>8} | {full_kb:>8.1f} | {full_s:>7.3f}")
+        print(f"{'incremental':>12} | {len(inc):>6} | {inc_reqs:>8} | {inc_kb:>8.1f} | {inc_s:>7.3f}")
+
+        # More added than max_delta: oldest first over several runs, none skipped.
+        fake.add_messages(3 * delta + 1)
+        added = [m["id"] for m in fake.messages[::-1][:3 * delta + 1]]
+        runs, synced = 0, []
+        while True:
+            (ids, history_id), *_ = timed(fake, lambda: sync_message_ids(service, store, "me", max_results=inbox, max_delta=delta))
+            store.set("me", history_id)
+            if not ids:
+                break
+            runs += 1
+            synced = ids + synced
+        assert synced == added, "messages lost or repeated past max_delta"
+        print(f"{'overflow':>12} | {len(synced):>6} | {'':>8} | {'':>8} | {'':>7}  ({runs} runs of max_delta={delta}, none skipped)")
+
+        # Expired history: falls back to the newest max_results via a full list.
+        fake.add_messages(3)
+        fake.expire_history()
+        (fallback, _), fb_s, fb_reqs, _ = timed(fake, lambda: sync_message_ids(service, store, "me", max_results=10))
+        assert fallback == [m["id"] for m in fake.messages[::-1][:10]]
+        print(f"{'expired':>12} | {len(fallback):>6} | {fb_reqs:>8} | {'':>8} | {fb_s:>7.3f}  (fell back to full list)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--inbox", type=int, default=5000)
+    parser.add_argument("--delta", type=int, default=25)
+    parser.add_argument("--latency", type=float, default=0.01)
+    args = parser.parse_args()
+    run(args.inbox, args.delta, args.latency)
@@ -0,0 +1,61 @@
+"""
+LLM calls and prompt tokens for per-message vs thread summarization, and
+for updating threads after one new reply each.
+
+    python -m benchmarks.bench_threads [--threads 50] [--replies 4]
+"""
+import argparse
+
+from benchmarks.fixtures import threaded_inbox
+from benchmarks.stub_model import StubChatModel
+from summarizer.summarize import summarize_emails
+from summarizer.threads import ThreadStore, summarize_threads
+
+
+def to_messages(inbox):
+    return [
+        {
+            "id": m["id"],
+            "threadId": m["threadId"],
+            "internalDate": m["internalDate"],
+            "payload": {"headers": [{"name": "From", "value": m["sender"]}, {"name": "Subject", "value": m["subject"]}]},
+        }
+        for m in inbox
+    ]
+
+
+def run(threads, replies):
+    inbox = threaded_inbox(threads, replies + 1)
+    # Hold back each thread's last reply to arrive in a later run.
+    first = [m for m in inbox if not m["id"].endswith(f"{replies + 1:02d}")]
+    rows = []
+
+    model = StubChatModel(latency=0)
+    summarize_emails(model, [m["body"] for m in first], max_concurrency=32)
+    rows.append(("per message", len(first), model.calls, model.prompt_tokens))
+
+    store = ThreadStore(":memory:")
+    model = StubChatModel(latency=0)
+    summaries = summarize_threads(model, to_messages(first), [m["body"] for m in first], store=store, max_concurrency=32)
+    assert len(summaries) == threads and all(summaries.values())
+    rows.append(("per thread", len(first), model.calls, model.prompt_tokens))
+
+    model = StubChatModel(latency=0)
+    summarize_threads(model, to_messages(first), [m["body"] for m in first], store=store, max_concurrency=32)
+    rows.append(("rerun, no new mail", len(first), model.calls, model.prompt_tokens))
+
+    model = StubChatModel(latency=0)
+    summarize_threads(model, to_messages(inbox), [m["body"] for m in inbox], store=store, max_concurrency=32)
+    rows.append(("rerun, +1 reply each", len(inbox), model.calls, model.prompt_tokens))
+
+    print(f"{'mode':<22} | {'emails':>6} | {'calls':>5} | {'prompt tokens':>13}")
+    for name, emails, calls, tokens in rows:
+        print(f"{name:<22} | {emails:>6} | {calls:>5} | {tokens:>13}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument("--replies", type=int, default=4, help="replies per thread in the first run")
+    args = parser.parse_args()
+    run(args.threads, args.replies)
@@ -0,0 +1,51 @@
+"""
+LLM calls avoided by local triage and its accuracy per threshold, for the
+built-in weights and a model fitted on the labelled fixture inbox
+(LABELLED_TEMPLATES). Both are evaluated on an inbox built from
+HELDOUT_TEMPLATES: other senders and wording, never used to write the
+built-in weights or to fit.
+
+    python -m benchmarks.bench_triage [--emails 2000] [--thresholds 0.5 0.8 0.9 0.95]
+"""
+import argparse
+import time
+
+from benchmarks.fixtures import HELDOUT_TEMPLATES, labelled_inbox
+from summarizer.triage import TriageModel, header_value, triage_scores
+
+
+def report(name, scores, labels, thresholds):
+    for threshold in thresholds:
+        skipped = scores >= threshold
+        automated = sum(labels)
+        true_pos = int(sum(s and l for s, l in zip(skipped, labels)))
+        # Mail that needed reading but got a template Low summary.
+        false_pos = int(skipped.sum()) - true_pos
+        print(
+            f"{name:<9} | {threshold:>9.2f} | {int(skipped.sum()):>7} | {skipped.mean():>7.1%} | "
+            f"{true_pos / max(1, skipped.sum()):>9.1%} | {true_pos / max(1, automated):>6.1%} | {false_pos:>15}"
+        )
+
+
+def run(n_emails, thresholds):
+    train, train_labels = labelled_inbox(n_emails)
+    messages, labels = labelled_inbox(n_emails, seed=11, templates=HELDOUT_TEMPLATES)
+    emails = [m["snippet"] for m in messages]
+    print(f"{'model':<9} | {'threshold':>9} | {'skipped':>7} | {'avoided':>7} | {'precision':>9} | {'recall':>6} | {'important as Low':>15}")
+
+    model = TriageModel()
+    t0 = time.perf_counter()
+    scores = triage_scores(messages, emails, model)
+    elapsed = time.perf_counter() - t0
+    report("built-in", scores, labels, thresholds)
+
+    fitted = TriageModel().fit([f"{header_value(m, 'Subject')} {m['snippet']}" for m in train], train_labels)
+    report("fitted", triage_scores(messages, emails, fitted), labels, thresholds)
+    print(f"\nscored {n_emails} emails in {elapsed * 1000:.1f} ms ({n_emails / elapsed:,.0f} emails/s)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.5, 0.8, 0.9, 0.95])
+    args = parser.parse_args()
+    run(args.emails, args.thresholds)
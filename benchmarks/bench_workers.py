@@ -0,0 +1,102 @@
+"""
+Load test for the multi-user worker pool: one fake Gmail server per
+mailbox, the stub Gemini model, and the real queue, pipeline and stores
+in a temp dir. Reports mailboxes per minute for each pool shape; with
+--kill a worker is terminated mid-run and its jobs must be recovered.
+
+    python -m benchmarks.bench_workers [--mailboxes 100] [--pools 1x1 2x4 4x4] [--kill]
+"""
+import argparse
+import functools
+import os
+import tempfile
+import time
+
+from benchmarks.fake_gmail import FakeGmail, make_message, service_for
+from benchmarks.stub_model import StubChatModel
+
+_services = {}
+
+
+def fake_gmail(payload):
+    # The job's "token" is the base URL of that user's fake mailbox.
+    url = payload["token_path"]
+    if url not in _services:
+        _services[url] = service_for(url)
+    return _services[url]
+
+
+def mailbox(box, i):
+    # Distinct ids and text per mailbox so the shared summary cache gets no cross-user hits.
+    message = make_message(i)
+    message["id"] = f"b{box:04d}{message['id']}"
+    message["snippet"] = f"Mailbox {box}. {message['snippet']}"
+    return message
+
+
+def run_pool(fakes, workers, slots, latency, rpm, kill, lease):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({
+            "JOB_QUEUE_PATH": os.path.join(tmp, "jobs.sqlite3"),
+            "JOB_STATE_DIR": os.path.join(tmp, "tenants"),
+            "JOB_LEASE_SECONDS": str(lease),
+            "SUMMARY_CACHE_PATH": os.path.join(tmp, "cache.sqlite3"),
+            "SUMMARY_STORE_PATH": os.path.join(tmp, "summaries.sqlite3"),
+            "GMAIL_SYNC_MODE": "incremental",
+            "GEMINI_RPM": str(rpm),
+            "GEMINI_TPM": str(rpm * 1000),
+        })
+        # Imported here so config picks up the temp paths (workers are spawned and re-read them).
+        from summarizer import config
+        from summarizer.jobs import JobQueue, start_pool
+
+        queue = JobQueue(os.environ["JOB_QUEUE_PATH"], lease_seconds=lease)
+        for i, fake in enumerate(fakes):
+            queue.enqueue(f"user{i}@example.com", fake.base_url, max_results=len(fake.messages))
+        config.JOB_QUEUE_PATH = os.environ["JOB_QUEUE_PATH"]
+
+        t0 = time.perf_counter()
+        processes = start_pool(
+            workers, slots, model_factory=functools.partial(StubChatModel, latency=latency), gmail_factory=fake_gmail, drain=True,
+        )
+        killed = False
+        while any(p.is_alive() for p in processes):
+            if kill and not killed and queue.counts().get("done", 0) >= len(fakes) // 4:
+                processes[0].terminate()
+                killed = True
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - t0
+        counts = queue.counts()
+        recovered = queue._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'done' AND attempts > 1").fetchone()[0]
+        return counts, elapsed, recovered
+
+
+def run(n_mailboxes, per_mailbox, pools, latency, rpm, kill, lease):
+    fakes = [FakeGmail(per_mailbox, factory=functools.partial(mailbox, box)).start() for box in range(n_mailboxes)]
+    try:
+        print(f"{n_mailboxes} mailboxes x {per_mailbox} emails, stub latency {latency}s, Gemini {rpm:.0f} RPM")
+        print(f"{'pool':>6} | {'seconds':>7} | {'done':>5} | {'failed':>6} | {'recovered':>9} | {'mailboxes/min':>13}")
+        for shape in pools:
+            workers, slots = (int(x) for x in shape.split("x"))
+            counts, elapsed, recovered = run_pool(fakes, workers, slots, latency, rpm, kill, lease)
+            done = counts.get("done", 0)
+            print(
+                f"{shape:>6} | {elapsed:>7.2f} | {done:>5} | {counts.get('failed', 0):>6} | "
+                f"{recovered:>9} | {done / elapsed * 60:>13.0f}"
+            )
+    finally:
+        for fake in fakes:
+            fake.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mailboxes", type=int, default=100)
+    parser.add_argument("--emails", type=int, default=20, help="messages per mailbox")
+    parser.add_argument("--pools", nargs="+", default=["1x1", "2x4", "4x4"], help="WORKERSxSLOTS")
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated seconds per Gemini call")
+    parser.add_argument("--rpm", type=float, default=60000, help="project-wide Gemini requests per minute")
+    parser.add_argument("--kill", action="store_true", help="terminate one worker after a quarter of the jobs")
+    parser.add_argument("--lease", type=float, default=3.0, help="job lease seconds (recovery delay after --kill)")
+    args = parser.parse_args()
+    run(args.mailboxes, args.emails, args.pools, args.latency, args.rpm, args.kill, args.lease)
@@ -0,0 +1,362 @@
+import base64
+import json
+import re
+import threading
+import time
+import urllib.parse
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.header import decode_header, make_header
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httplib2
+from googleapiclient.discovery import build
+from googleapiclient.http import BatchHttpRequest
+
+# ===============================
+# 🧪 Local Fake Gmail API
+# ===============================
+# Serves the subset of the Gmail REST API the pipeline uses, including the
+# multipart/mixed batch endpoint, with a configurable per-HTTP-request
+# latency so round-trip savings show up in benchmarks. Every added message
+# bumps historyId and is recorded for users.history.list; history older
+# than `history_floor` is treated as expired (404), like Gmail does.
+# format=full omits attachment bytes (attachmentId only); format=raw
+# returns the whole RFC 822 message, attachments included. With
+# units_per_second set, calls beyond that per-user quota (list/get cost 5
+# units, like Gmail) are answered with 429 rateLimitExceeded.
+# messages.send (100 units) parses the raw MIME message into `sent`;
+# addresses in `reject` get a 400 like an invalid recipient would.
+
+SENDERS = ["alerts@github.com", "noreply@google.com", "team@gamma.app", "boss@company.com", "friend@gmail.com"]
+
+
+def make_message(i):
+    return {
+        "id": f"m{i:06d}",
+        "threadId": f"t{i // 3:06d}",
+        "labelIds": ["INBOX"],
+        "snippet": f"Message {i}: please review the attached update before Friday.",
+        "internalDate": str(1760000000000 + i * 1000),
+        "sizeEstimate": 4096,
+        "payload": {
+            "mimeType": "text/plain",
+            "headers": [
+                {"name": "From", "value": SENDERS[i % len(SENDERS)]},
+                {"name": "To", "value": "me@example.com"},
+                {"name": "Subject", "value": f"Update #{i}"},
+                {"name": "Date", "value": "Mon, 13 Oct 2025 10:00:00 +0000"},
+            ],
+            "body": {"size": 4000, "data": "x" * 4000},
+        },
+    }
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def make_large_message(i):
+    """
+    A realistic heavy message: multipart/alternative text + HTML with a
+    quoted reply chain and signature, plus a multi-MB PDF attachment.
+    Every third one is an HTML-only newsletter.
+    """
+    message = make_message(i)
+    new = f"Hi,\n\nUpdate {i}: the vendor contract needs your sign-off before Friday. " * 6
+    quoted = "".join(f"> Earlier message line {n} about the contract terms and pricing.\n" for n in range(400))
+    plain = f"{new}\n\nThanks,\n-- \nAlex\nHead of Procurement\n\nOn Mon, Oct 13, 2025 Sam wrote:\n{quoted}"
+    html = (
+        "<html><head><style>" + "p{margin:0}" * 500 + "</style></head><body>"
+        + "".join(f"<p>{line}</p>" for line in new.split("\n"))
+        + "<div class='gmail_quote'><blockquote>" + "<p>Earlier message about terms.</p>" * 2000 + "</blockquote></div>"
+        + "</body></html>"
+    )
+    text_parts = [
+        {"mimeType": "text/plain", "filename": "", "headers": [{"name": "Content-Type", "value": "text/plain; charset=UTF-8"}],
+         "body": {"size": len(plain), "data": _b64(plain.encode())}},
+        {"mimeType": "text/html", "filename": "", "headers": [{"name": "Content-Type", "value": "text/html; charset=UTF-8"}],
+         "body": {"size": len(html), "data": _b64(html.encode())}},
+    ]
+    if i % 3 == 2:
+        newsletter = "<html><body>" + "<div><h2>Top story</h2><p>Ten new AI templates this week.</p></div>" * 4000 + "</body></html>"
+        alternative = {"mimeType": "text/html", "filename": "", "headers": [], "body": {"size": len(newsletter), "data": _b64(newsletter.encode())}}
+    else:
+        alternative = {"mimeType": "multipart/alternative", "filename": "", "headers": [], "body": {"size": 0}, "parts": text_parts}
+    attachment = {
+        "mimeType": "application/pdf", "filename": f"contract-{i}.pdf", "headers": [],
+        "body": {"size": 2_000_000 + (i % 5) * 500_000, "attachmentId": f"att{i}"},
+    }
+    headers = message["payload"]["headers"]
+    message["payload"] = {"mimeType": "multipart/mixed", "filename": "", "headers": headers, "body": {"size": 0}, "parts": [alternative, attachment]}
+    message["sizeEstimate"] = attachment["body"]["size"] + 200_000
+    return message
+
+
+def _to_mime(part):
+    maintype, subtype = part.get("mimeType", "text/plain").split("/", 1)
+    if part.get("parts"):
+        mime = MIMEMultipart(subtype)
+        for child in part["parts"]:
+            mime.attach(_to_mime(child))
+    else:
+        body = part.get("body", {})
+        data = base64.urlsafe_b64decode(body["data"] + "=" * (-len(body["data"]) % 4)) if body.get("data") else b"\0" * body.get("size", 0)
+        mime = MIMEBase(maintype, subtype)
+        mime.set_payload(base64.encodebytes(data).decode())
+        mime["Content-Transfer-Encoding"] = "base64"
+        if part.get("filename"):
+            mime.add_header("Content-Disposition", "attachment", filename=part["filename"])
+    return mime
+
+
+def to_raw(message):
+    """The base64url RFC 822 form Gmail returns for format=raw."""
+    mime = _to_mime(message["payload"])
+    for header in message["payload"].get("headers", []):
+        mime[header["name"]] = header["value"]
+    return _b64(mime.as_bytes())
+
+
+def _project(message, fmt):
+    if fmt == "raw":
+        slim = {k: v for k, v in message.items() if k != "payload"}
+        slim["raw"] = to_raw(message)
+        return slim
+    if fmt != "metadata":
+        return message
+    slim = {k: v for k, v in message.items() if k != "payload"}
+    slim["payload"] = {"mimeType": message["payload"]["mimeType"], "headers": message["payload"]["headers"]}
+    return slim
+
+
+class FakeGmail:
+    def __init__(self, n_messages=100, latency=0.0, factory=make_message, units_per_second=None, reject=()):
+        self.factory = factory
+        self.reject = set(reject)
+        self.sent = []
+        # Per-user quota enforced like Gmail's: calls over budget get a 429.
+        self.units_per_second = units_per_second
+        self._units = units_per_second or 0.0
+        self._units_at = time.monotonic()
+        self.throttled = 0
+        self.messages = []
+        self.by_id = {}
+        self.history = []
+        self.history_id = 1000
+        self.history_floor = 0
+        self.latency = latency
+        self.http_requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self.add_messages(n_messages)
+
+    def add_messages(self, count):
+        """Delivers `count` new messages, each with its own history record."""
+        for _ in range(count):
+            message = self.factory(len(self.messages))
+            self.history_id += 1
+            self.messages.append(message)
+            self.by_id[message["id"]] = message
+            ref = {"id": message["id"], "threadId": message["threadId"], "labelIds": message["labelIds"]}
+            self.history.append({"id": str(self.history_id), "messagesAdded": [{"message": ref}]})
+
+    def expire_history(self):
+        """Drops all history up to now; older startHistoryIds get a 404."""
+        self.history_floor = self.history_id
+
+    # ---------- request routing ----------
+    def _over_quota(self, units):
+        if not self.units_per_second:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            self._units = min(self.units_per_second, self._units + (now - self._units_at) * self.units_per_second)
+            self._units_at = now
+            if self._units < units:
+                self.throttled += 1
+                return True
+            self._units -= units
+            return False
+
+    def handle(self, method, path, query, body):
+        """Returns (status, payload dict) for a single API call."""
+        units = 2 if path.endswith("/history") else 1 if path.endswith("/profile") else 100 if path.endswith("/send") else 5
+        if self._over_quota(units):
+            return 429, {"error": {"code": 429, "message": "User-rate limit exceeded.", "errors": [{"reason": "rateLimitExceeded"}]}}
+        if re.fullmatch(r"/gmail/v1/users/[^/]+/messages/send", path) and method == "POST":
+            return self._send(body)
+        m = re.fullmatch(r"/gmail/v1/users/[^/]+/messages", path)
+        if m and method == "GET":
+            return self._list(query)
+        if re.fullmatch(r"/gmail/v1/users/[^/]+/profile", path):
+            return 200, {"emailAddress": "me@example.com", "messagesTotal": len(self.messages), "historyId": str(self.history_id)}
+        if re.fullmatch(r"/gmail/v1/users/[^/]+/history", path):
+            return self._history(query)
+        m = re.fullmatch(r"/gmail/v1/users/[^/]+/messages/([^/]+)", path)
+        if m and method == "GET":
+            message = self.by_id.get(m.group(1))
+            if message is None:
+                return 404, {"error": {"code": 404, "message": "Not Found"}}
+            return 200, _project(message, query.get("format", ["full"])[0])
+        return 404, {"error": {"code": 404, "message": f"No route for {method} {path}"}}
+
+    def _send(self, body):
+        raw = json.loads(body or b"{}").get("raw", "")
+        message = BytesParser().parsebytes(base64.urlsafe_b64decode(raw + "=" * (-len(raw) % 4)))
+        to = message["to"] or ""
+        if not to or to in self.reject:
+            return 400, {"error": {"code": 400, "message": f"Invalid To header: {to!r}"}}
+        with self._lock:
+            message_id = f"sent{len(self.sent):06d}"
+            self.sent.append({
+                "id": message_id,
+                "to": to,
+                "subject": str(make_header(decode_header(message["subject"] or ""))),
+                "body": message.get_payload(decode=True).decode(message.get_content_charset() or "utf-8"),
+            })
+        return 200, {"id": message_id, "threadId": message_id, "labelIds": ["SENT"]}
+
+    def _list(self, query):
+        start = int(query.get("pageToken", ["0"])[0])
+        size = int(query.get("maxResults", ["100"])[0])
+        newest_first = self.messages[::-1]
+        if "labelIds" in query:
+            newest_first = [m for m in newest_first if set(query["labelIds"]) <= set(m.get("labelIds", []))]
+        page = newest_first[start:start + size]
+        payload = {"messages": [{"id": m["id"], "threadId": m["threadId"]} for m in page]}
+        if start + size < len(newest_first):
+            payload["nextPageToken"] = str(start + size)
+        return 200, payload
+
+    def _history(self, query):
+        start_id = int(query["startHistoryId"][0])
+        if start_id < self.history_floor:
+            return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+        records = [h for h in self.history if int(h["id"]) > start_id]
+        if "labelId" in query:
+            records = [
+                h for h in records
+                if any(query["labelId"][0] in a["message"].get("labelIds", []) for a in h.get("messagesAdded", []))
+            ]
+        offset = int(query.get("pageToken", ["0"])[0])
+        size = int(query.get("maxResults", ["100"])[0])
+        payload = {"history": records[offset:offset + size], "historyId": str(self.history_id)}
+        if offset + size < len(records):
+            payload["nextPageToken"] = str(offset + size)
+        return 200, payload
+
+    def handle_batch(self, content_type, body):
+        raw = b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body
+        outer = BytesParser(policy=HTTP).parsebytes(raw)
+        boundary = "batch_fake_boundary"
+        parts = []
+        for part in outer.iter_parts():
+            inner = part.get_payload(decode=True).decode()
+            request_line = inner.split("\n", 1)[0].strip()
+            method, target, _ = request_line.split(" ", 2)
+            body = re.split(r"\r?\n\r?\n", inner, 1)[1] if method == "POST" else ""
+            parsed = urllib.parse.urlparse(target)
+            status, payload = self.handle(method, parsed.path, urllib.parse.parse_qs(parsed.query), body.encode())
+            data = json.dumps(payload)
+            parts.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{part['Content-ID'][1:-1]}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status < 300 else 'Error'}\r\n"
+                "Content-Type: application/json; charset=UTF-8\r\n"
+                f"Content-Length: {len(data)}\r\n\r\n"
+                f"{data}\r\n"
+            )
+        parts.append(f"--{boundary}--\r\n")
+        return f"multipart/mixed; boundary={boundary}", "".join(parts).encode()
+
+    # ---------- server lifecycle ----------
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, content_type, data):
+                with fake._lock:
+                    fake.http_requests += 1
+                    fake.bytes_sent += len(data)
+                if fake.latency:
+                    time.sleep(fake.latency)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _dispatch(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                parsed = urllib.parse.urlparse(self.path)
+                if parsed.path.startswith("/batch/"):
+                    content_type, data = fake.handle_batch(self.headers["Content-Type"], body)
+                    return self._reply(200, content_type, data)
+                status, payload = fake.handle(method, parsed.path, urllib.parse.parse_qs(parsed.query), body)
+                self._reply(status, "application/json; charset=UTF-8", json.dumps(payload).encode())
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        # Clients that go away mid-response (e.g. a killed worker) are not an error here.
+        self._server.handle_error = lambda request, client_address: None
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/"
+
+    @property
+    def batch_uri(self):
+        return self.base_url + "batch/gmail/v1"
+
+    def service(self):
+        """A real googleapiclient Gmail service pointed at this server."""
+        return service_for(self.base_url)
+
+
+def service_for(base_url, http=None):
+    """
+    Gmail service for a fake server running elsewhere (e.g. a parent
+    process). http replaces the plain httplib2.Http (e.g. a recorder).
+    """
+    service = build(
+        "gmail", "v1",
+        http=http or httplib2.Http(),
+        static_discovery=True,
+        client_options={"api_endpoint": base_url},
+    )
+    # api_endpoint does not move the batch endpoint, so point it here too.
+    batch_uri = base_url + "batch/gmail/v1"
+    service.new_batch_http_request = lambda callback=None: BatchHttpRequest(callback=callback, batch_uri=batch_uri)
+    return service
@@ -0,0 +1,49 @@
+import json
+
+import requests
+from gspread.exceptions import APIError
+
+# ===============================
+# 🧪 Fake gspread Worksheet
+# ===============================
+# Stands in for gspread's Worksheet (append_row / append_rows) and counts
+# every API request. Writes beyond `quota` per `window` seconds of a
+# simulated clock get a 429 like the real Sheets API; pass fake.sleep as
+# the retry sleep so backoff advances that clock instead of real time.
+
+
+def _error_response(status, message):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps({"error": {"code": status, "message": message, "status": "RESOURCE_EXHAUSTED"}}).encode()
+    return response
+
+
+class FakeWorksheet:
+    def __init__(self, quota=60, window=60.0):
+        self.rows = []
+        self.requests = 0
+        self.throttled = 0
+        self.quota = quota
+        self.window = window
+        self.clock = 0.0
+        self._recent = []
+
+    def sleep(self, seconds):
+        self.clock += seconds
+
+    def _request(self):
+        self.requests += 1
+        self._recent = [t for t in self._recent if t > self.clock - self.window]
+        if self.quota and len(self._recent) >= self.quota:
+            self.throttled += 1
+            raise APIError(_error_response(429, "Quota exceeded for quota metric 'Write requests' per minute per user."))
+        self._recent.append(self.clock)
+
+    def append_row(self, values, value_input_option="RAW"):
+        self._request()
+        self.rows.append(list(values))
+
+    def append_rows(self, values, value_input_option="RAW"):
+        self._request()
+        self.rows.extend(list(row) for row in values)
@@ -0,0 +1,175 @@
+import random
+
+# ===============================
+# 🧪 Fixture Inbox
+# ===============================
+# Deterministic, snippet-sized emails in the mix a real inbox sees:
+# security alerts, newsletters, receipts, CI notices and personal mail.
+
+TEMPLATES = [
+    ("noreply@google.com", "Security alert", "Your Google Account was just signed in to from a new {device} device. If this was you, you don't need to do anything. If not, we'll help you secure your account."),
+    ("team@gamma.app", "Gamma weekly", "Discover {n} new AI-powered templates this week. Smart layouts, diagrams and charts help bring your ideas to life. Unsubscribe any time."),
+    ("orders@shop.example.com", "Your order #{n}", "Thanks for your order #{n}. Your {device} will ship within 2 business days. View your receipt and track delivery from your account page."),
+    ("alerts@github.com", "[ci] Build failed", "Run #{n} failed on main: 3 tests failed in test_{device}.py. View the workflow logs for details. You are receiving this because you are subscribed."),
+    ("boss@company.com", "Q{q} numbers", "Hi, can you send me the Q{q} revenue numbers and the {device} rollout plan before Friday's board meeting? It's urgent, thanks."),
+    ("friend@gmail.com", "Weekend plans", "Hey! Are you free on Saturday? We're thinking of a hike around {n} and dinner after. Let me know by Thursday."),
+]
+DEVICES = ["Windows", "iPhone", "Android", "Mac", "Linux", "iPad"]
+
+
+def fixture_inbox(n=200, seed=42):
+    """Returns n dicts with id, threadId, sender, subject and snippet."""
+    rng = random.Random(seed)
+    inbox = []
+    for i in range(n):
+        sender, subject, body = rng.choice(TEMPLATES)
+        fill = {"device": rng.choice(DEVICES), "n": rng.randint(100, 9999), "q": rng.randint(1, 4)}
+        inbox.append({
+            "id": f"f{i:06d}",
+            "threadId": f"ft{i // 4:06d}",
+            "sender": sender,
+            "subject": subject.format(**fill),
+            "snippet": body.format(**fill),
+        })
+    return inbox
+
+
+REPLIES = [
+    "Sounds good, I will take the {device} part.",
+    "Can we move the deadline to Thursday? The {device} build is still red.",
+    "Attached the updated numbers for Q{q}. Revenue is up {n} units.",
+    "Thanks all. Let us sync tomorrow at {n} to close this out.",
+    "I disagree on the rollout order, the {device} users should go first.",
+]
+
+
+def threaded_inbox(threads=50, replies=4, seed=7):
+    """
+    Returns threads * (replies + 1) dicts with id, threadId, internalDate,
+    sender and body, where each reply quotes the whole conversation so far
+    the way mail clients do ("On ... wrote:" plus "> " lines).
+    """
+    rng = random.Random(seed)
+    inbox = []
+    for t in range(threads):
+        sender, subject, body = rng.choice(TEMPLATES)
+        fill = {"device": rng.choice(DEVICES), "n": rng.randint(100, 9999), "q": rng.randint(1, 4)}
+        text = body.format(**fill)
+        order = rng.sample(REPLIES, len(REPLIES))
+        for r in range(replies + 1):
+            if r:
+                quoted = "\n".join("> " + line for line in text.splitlines())
+                new = order[(r - 1) % len(order)].format(**fill)
+                text = f"{new}\n\nOn Mon, 3 Mar 2025 at 10:{r:02d}, {sender} wrote:\n{quoted}"
+                sender = f"user{rng.randint(1, 9)}@company.com"
+            inbox.append({
+                "id": f"m{t:04d}{r:02d}",
+                "threadId": f"t{t:04d}",
+                "internalDate": str(1_700_000_000_000 + t * 10_000_000 + r * 60_000),
+                "sender": sender,
+                "subject": ("Re: " if r else "") + subject.format(**fill),
+                "body": text,
+            })
+    return inbox
+
+
+# (sender, subject, snippet, extra headers, labelIds, automated?)
+LABELLED_TEMPLATES = [
+    ("team@gamma.app", "Gamma weekly", "Discover {n} new AI-powered templates this week. Smart layouts help bring your ideas to life. Unsubscribe any time.",
+     {"List-Unsubscribe": "<mailto:u@gamma.app>"}, ["CATEGORY_PROMOTIONS"], True),
+    ("orders@shop.example.com", "Your order #{n}", "Thanks for your order #{n}. Your {device} will ship within 2 business days. View your receipt and track delivery.",
+     {}, ["CATEGORY_UPDATES"], True),
+    ("deals@store.example.com", "{n}% off this weekend", "Our biggest sale of the year: {n}% off every {device} accessory. Offer ends Sunday. Manage your preferences.",
+     {"List-Unsubscribe": "<https://store.example.com/u>", "Precedence": "bulk"}, ["CATEGORY_PROMOTIONS"], True),
+    ("notifications@linkedin.com", "You appeared in {n} searches", "You appeared in {n} searches this week and 3 people liked your post. See all notifications.",
+     {"List-Unsubscribe": "<mailto:u@linkedin.com>"}, ["CATEGORY_SOCIAL"], True),
+    ("digest@medium.com", "Medium Daily Digest", "Today's highlights: {n} stories picked for you about {device} development. You are receiving this digest because you subscribed.",
+     {"List-Unsubscribe": "<mailto:u@medium.com>"}, [], True),
+    ("alex.writer@substack.com", "Issue {n}: notes on {device}", "This week's newsletter covers the {device} launch and {n} links worth reading. Read in browser.",
+     {"List-Unsubscribe": "<mailto:u@substack.com>"}, [], True),
+    ("noreply@calendar.example.com", "Invitation accepted", "Sam accepted your invitation to the {device} sync on {n}. This is an automated notification.",
+     {"Auto-Submitted": "auto-generated"}, ["CATEGORY_UPDATES"], True),
+    ("noreply@google.com", "Security alert", "Your Google Account was just signed in to from a new {device} device. If this was not you, secure your account now.",
+     {"Auto-Submitted": "auto-generated"}, ["CATEGORY_UPDATES"], False),
+    ("notifications@github.com", "[ci] Build failed", "Run #{n} failed on main: 3 tests failed in test_{device}.py. You are receiving this because you are subscribed.",
+     {"List-Unsubscribe": "<mailto:u@github.com>"}, ["CATEGORY_UPDATES"], False),
+    ("billing@vendor.example.com", "Invoice {n} overdue", "Invoice {n} for the {device} licences is now overdue. Please pay before Friday to avoid suspension.",
+     {}, [], False),
+    ("boss@company.com", "Q{q} numbers", "Hi, can you send me the Q{q} revenue numbers and the {device} rollout plan before Friday's board meeting? It's urgent, thanks.",
+     {}, ["IMPORTANT"], False),
+    ("friend@gmail.com", "Weekend plans", "Hey! Are you free on Saturday? We're thinking of a hike around {n} and dinner after. Let me know by Thursday.",
+     {}, [], False),
+    ("recruiter@talent.example.com", "Quick question", "Hi, I came across your {device} work and would love to chat this week. Can you share a time that suits you?",
+     {}, [], False),
+    ("colleague@company.com", "Re: {device} design review", "Thanks for the notes. I updated the doc, can you take another look before the meeting at {n}?",
+     {}, [], False),
+    ("support@saas.example.com", "Your usage report", "Your team used {n} minutes this month. Download the full report from the dashboard.",
+     {}, [], True),
+    ("events@conf.example.com", "Your ticket for DevConf", "Ticket #{n} is confirmed. Doors open at 9am, bring this email or the app pass.",
+     {"List-Unsubscribe": "<mailto:u@conf.example.com>"}, ["CATEGORY_UPDATES"], True),
+    ("team@startup.example.com", "Offer letter", "Hi, we are happy to extend an offer for the {device} engineer role. Please sign and return it by Friday.",
+     {}, [], False),
+    ("drive-shares-noreply@google.com", "Document shared with you", "Sam shared \"{device} contract\" with you and asked you to review it by tomorrow.",
+     {}, ["CATEGORY_UPDATES"], False),
+]
+
+# Other senders and wording, never used to build or fit a triage model:
+# benchmarks/bench_triage.py evaluates on these.
+HELDOUT_TEMPLATES = [
+    ("newsletter@techweekly.example.org", "Tech Weekly #{n}", "In this issue: {n} tools for {device} developers, a deep dive on caching, and jobs. You're getting this email because you signed up at techweekly.",
+     {"List-Unsubscribe": "<mailto:leave@techweekly.example.org>", "Precedence": "list"}, [], True),
+    ("no-reply@rides.example.com", "Your trip receipt", "Thanks for riding with us. Total charged: ${n}.40 to your card ending 4242. Rate your driver in the app.",
+     {"Auto-Submitted": "auto-generated"}, ["CATEGORY_UPDATES"], True),
+    ("marketing@airline.example.com", "Fares from ${n}", "Escape this winter: fares to {n} destinations, book by Monday. Terms apply. Update your email preferences.",
+     {"List-Unsubscribe": "<https://airline.example.com/optout>", "Precedence": "bulk"}, ["CATEGORY_PROMOTIONS"], True),
+    ("updates@community.example.net", "New replies in the {device} forum", "{n} new replies in threads you follow, including 'Battery drain after update'. Manage notification settings.",
+     {"List-Unsubscribe": "<mailto:u@community.example.net>"}, ["CATEGORY_FORUMS"], True),
+    ("shipment-tracking@parcel.example.com", "Package out for delivery", "Your package with tracking number 1Z{n}X is out for delivery and should arrive today by 8pm.",
+     {}, ["CATEGORY_UPDATES"], True),
+    ("calendar-notification@google.com", "Reminder: 1:1 at {n}", "This is a reminder for your event 1:1 today. Invitation from Google Calendar.",
+     {"Auto-Submitted": "auto-generated"}, [], True),
+    ("hello@fitness.example.com", "Your monthly recap", "You logged {n} workouts in October. Keep the streak going! Open the app to set next month's goal.",
+     {"List-Unsubscribe": "<mailto:u@fitness.example.com>"}, ["CATEGORY_PROMOTIONS"], True),
+    ("security@bank.example.com", "Unusual card activity", "We noticed a charge of ${n} at an online store that doesn't match your usual activity. Reply YES if this was you or call us.",
+     {"Auto-Submitted": "auto-generated"}, ["CATEGORY_UPDATES"], False),
+    ("alerts@monitoring.example.com", "CRITICAL: api latency", "Incident #{n} triggered: p99 latency above 2s on the {device} API for 10 minutes. Acknowledge in the app.",
+     {"Auto-Submitted": "auto-generated"}, [], False),
+    ("landlord@mail.example.com", "Lease renewal", "Hello, your lease ends next month. Let me know by the {q}th whether you plan to renew, the new rent would be ${n}.",
+     {}, [], False),
+    ("mom@family.example.com", "Sunday", "Are you coming over on Sunday? Dad is making lasagna. Bring the {device} charger you borrowed!",
+     {}, [], False),
+    ("pm@company.com", "Re: launch checklist", "I still need your sign-off on the {device} release notes. Can we close this today?",
+     {}, ["IMPORTANT"], False),
+    ("hr@company.com", "Benefits enrollment closes soon", "Open enrollment closes on the {q}th. If you do not choose a plan you will keep last year's coverage.",
+     {}, [], False),
+    ("dmv-noreply@state.example.gov", "Your licence renewal", "Your driver licence expires in {n} days. Renew online to avoid a late fee.",
+     {"Auto-Submitted": "auto-generated"}, [], False),
+]
+
+
+def labelled_inbox(n=1000, seed=3, missing=0.3, templates=LABELLED_TEMPLATES):
+    """
+    Returns n Gmail-shaped messages (metadata format) and a parallel list
+    of labels: True for automated mail that only ever needs a Low
+    template summary, False for mail the model should read. Each header
+    and category label is dropped with probability `missing`, as happens
+    with forwarded mail and other providers.
+    """
+    rng = random.Random(seed)
+    messages, labels = [], []
+    for i in range(n):
+        sender, subject, body, extra, label_ids, automated = rng.choice(templates)
+        fill = {"device": rng.choice(DEVICES), "n": rng.randint(10, 9999), "q": rng.randint(1, 4)}
+        headers = [{"name": "From", "value": sender}, {"name": "Subject", "value": subject.format(**fill)}]
+        headers += [{"name": k, "value": v} for k, v in extra.items() if rng.random() >= missing]
+        label_ids = [label for label in label_ids if rng.random() >= missing]
+        messages.append({
+            "id": f"l{i:06d}",
+            "threadId": f"lt{i:06d}",
+            "labelIds": ["INBOX", *label_ids],
+            "snippet": body.format(**fill),
+            "internalDate": str(1_700_000_000_000 + i * 1000),
+            "payload": {"mimeType": "text/plain", "headers": headers},
+        })
+        labels.append(automated)
+    return messages, labels
@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+from langchain_core.messages import AIMessage
+
+from summarizer.summarize import estimate_tokens, parse_summary
+
+# ===============================
+# 🧪 Stub Gemini Chat Model
+# ===============================
+# Duck-types the parts of ChatGoogleGenerativeAI the pipeline uses
+# (invoke / ainvoke) with a fixed simulated latency and a deterministic
+# "Summary / Priority" answer, so benchmarks run fully offline. Packed
+# prompts (<email id="..."> blocks) get a JSON array back; thread prompts
+# are answered from their "New messages" section. max_concurrent makes it
+# throttle like a loaded endpoint. with_structured_output() answers with
+# {"summary", "priority"} dicts, like Gemini bound to a response schema.
+#
+# Context caching (summarizer.context_cache) is priced the way Gemini 2.5
+# Flash bills it. Cached prompt tokens cost CACHED_INPUT_RATE of the input
+# price. An explicit cache (StubCacheBackend) also costs STORAGE_RATE
+# input-token equivalents per cached token per hour it lives. A leading
+# system message of at least min_cache_tokens counts as an implicit cache
+# hit once it has been seen. token_latency adds prefill time per prompt
+# token that is not served from a cache.
+CACHED_INPUT_RATE = 0.1
+# $1.00 per 1M tokens per hour of storage / $0.30 per 1M input tokens
+STORAGE_RATE = 1.0 / 0.30
+
+PRIORITIES = ["High", "Medium", "Low"]
+_PACKED_EMAIL = re.compile(r'<email id="([^"]+)">\n(.*?)\n</email>', re.S)
+
+
+def fake_summary(email: str):
+    digest = hashlib.sha1(email.encode("utf-8")).digest()
+    return " ".join(email.split()[:12]), PRIORITIES[digest[0] % 3]
+
+
+def fake_answer(prompt: str, drop_rate=0.0, rng=None) -> str:
+    packed = _PACKED_EMAIL.findall(prompt)
+    if not packed:
+        email = prompt.rsplit("New messages:\n", 1)[-1] if "New messages:\n" in prompt else prompt.rsplit("Email:\n", 1)[-1]
+        summary, priority = fake_summary(email)
+        return f"Summary: {summary}\nPriority: {priority}"
+    entries = []
+    for email_id, email in packed:
+        if rng and rng.random() < drop_rate:
+            continue
+        summary, priority = fake_summary(email)
+        entries.append({"id": email_id, "summary": summary, "priority": priority})
+    return "```json\n" + json.dumps(entries) + "\n```"
+
+
+def prompt_text(prompt):
+    """A string prompt, or the contents of a list of chat messages joined as build_prompt would."""
+    if isinstance(prompt, str):
+        return prompt
+    return "\n\n".join(str(getattr(m, "content", m)) for m in prompt)
+
+
+class StubCacheBackend:
+    """Offline stand-in for Gemini cached contents (summarizer.context_cache backend)."""
+
+    def __init__(self, min_tokens=1024, clock=time.time):
+        self.min_tokens = min_tokens
+        self.clock = clock
+        self.caches = {}
+        self.created = 0
+
+    def create(self, model, instruction, ttl_seconds):
+        tokens = estimate_tokens(instruction)
+        if tokens < self.min_tokens:
+            raise ValueError(f"400 INVALID_ARGUMENT: cached content has {tokens} tokens, minimum is {self.min_tokens}")
+        now = self.clock()
+        name = f"cachedContents/stub{self.created}"
+        self.created += 1
+        self.caches[name] = {"tokens": tokens, "created": now, "expire_at": now + ttl_seconds}
+        return name, now + ttl_seconds
+
+    def extend(self, name, ttl_seconds):
+        cache = self.caches.get(name)
+        if cache is None or cache["expire_at"] <= self.clock():
+            raise KeyError(f"404 NOT_FOUND: {name}")
+        cache["expire_at"] = self.clock() + ttl_seconds
+        return cache["expire_at"]
+
+    def tokens(self, name):
+        """Prompt tokens the live cache name stands for."""
+        cache = self.caches.get(name)
+        if cache is None or cache["expire_at"] <= self.clock():
+            raise KeyError(f"404 NOT_FOUND: {name}")
+        return cache["tokens"]
+
+    def storage_token_hours(self):
+        """Cached tokens times the hours each cache lives (its full TTL is paid for)."""
+        return sum(c["tokens"] * (c["expire_at"] - c["created"]) / 3600 for c in self.caches.values())
+
+
+class Throttled(Exception):
+    """What the Gemini client raises for 429 RESOURCE_EXHAUSTED."""
+
+    code = 429
+
+
+class StubChatModel:
+    def __init__(self, latency=0.2, drop_rate=0.0, seed=0, max_concurrent=None, caches=None, min_cache_tokens=1024,
+                 token_latency=0.0):
+        self.latency = latency
+        self.token_latency = token_latency
+        # Explicit caches (StubCacheBackend) and prefixes seen for implicit hits.
+        self.caches = caches
+        self.min_cache_tokens = min_cache_tokens
+        self._prefixes = set()
+        self.cached_tokens = 0
+        self.latencies = []
+        self.drop_rate = drop_rate
+        # Server-side limit: calls beyond max_concurrent in flight get a 429.
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self.throttled = 0
+        self.calls = 0
+        self.prompt_tokens = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _tokens(self, prompt, cached_content=None):
+        """(prompt tokens, of which cached) for one request."""
+        text = prompt_text(prompt)
+        if cached_content:
+            cached = self.caches.tokens(cached_content)
+            return cached + estimate_tokens(text), cached
+        cached = 0
+        if not isinstance(prompt, str) and prompt and getattr(prompt[0], "type", "") == "system":
+            prefix = str(prompt[0].content)
+            if estimate_tokens(prefix) >= self.min_cache_tokens:
+                with self._lock:
+                    cached = estimate_tokens(prefix) if prefix in self._prefixes else 0
+                    self._prefixes.add(prefix)
+        return estimate_tokens(text), cached
+
+    def _delay(self, tokens, cached):
+        seconds = self.latency + self.token_latency * (tokens - cached)
+        with self._lock:
+            self.latencies.append(seconds)
+        return seconds
+
+    def _answer(self, prompt, tokens, cached):
+        text = prompt_text(prompt)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += tokens
+            self.cached_tokens += cached
+            answer = fake_answer(text, self.drop_rate, self._rng)
+        return AIMessage(content=answer, usage_metadata={
+            "input_tokens": tokens, "output_tokens": estimate_tokens(answer), "total_tokens": tokens + estimate_tokens(answer),
+            "input_token_details": {"cache_read": cached},
+        })
+
+    def billed_tokens(self):
+        """Prompt cost in input-token equivalents: cached tokens at a discount, plus cache storage."""
+        storage = self.caches.storage_token_hours() * STORAGE_RATE if self.caches else 0.0
+        return self.prompt_tokens - self.cached_tokens * (1 - CACHED_INPUT_RATE) + storage
+
+    def invoke(self, prompt, cached_content=None, **kwargs):
+        tokens, cached = self._tokens(prompt, cached_content)
+        time.sleep(self._delay(tokens, cached))
+        return self._answer(prompt, tokens, cached)
+
+    async def ainvoke(self, prompt, cached_content=None, **kwargs):
+        with self._lock:
+            if self.max_concurrent and self.in_flight >= self.max_concurrent:
+                self.throttled += 1
+                raise Throttled("429 RESOURCE_EXHAUSTED: too many concurrent requests")
+            self.in_flight += 1
+        try:
+            tokens, cached = self._tokens(prompt, cached_content)
+            await asyncio.sleep(self._delay(tokens, cached))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        return self._answer(prompt, tokens, cached)
+
+    def with_structured_output(self, schema, **kwargs):
+        return StructuredStub(self)
+
+
+class StructuredStub:
+    """Same calls and counters as its StubChatModel, dict answers."""
+
+    def __init__(self, model):
+        self.model = model
+
+    @staticmethod
+    def _record(message):
+        summary, priority = parse_summary(message.content)
+        return {"summary": summary, "priority": priority}
+
+    def invoke(self, prompt, **kwargs):
+        return self._record(self.model.invoke(prompt, **kwargs))
+
+    async def ainvoke(self, prompt, **kwargs):
+        return self._record(await self.model.ainvoke(prompt, **kwargs))
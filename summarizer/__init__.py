@@ -0,0 +1,3 @@
+"""
+Shared pipeline code for the Gmail summarizer apps (app.py / app2.py).
+"""
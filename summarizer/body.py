@@ -0,0 +1,186 @@
+import base64
+import codecs
+import re
+from html.parser import HTMLParser
+
+# ===============================
+# 📄 Body Extraction
+# ===============================
+# Turns a format=full Gmail message into a short plain-text body for the
+# prompt. Gmail already leaves attachment bytes out of format=full (they
+# only carry an attachmentId); inline parts are walked, the best text part
+# is base64url-decoded chunk by chunk and fed through an incremental HTML
+# parser, and decoding stops as soon as the token budget is filled, so a
+# 300 KB newsletter never gets decoded or held in memory in full.
+DECODE_CHUNK = 48 * 1024  # base64 characters; must be a multiple of 4
+
+_QUOTE_HEADER = re.compile(
+    r"^\s*(On .+ wrote:|-{2,}\s*Original Message\s*-{2,}|-{2,}\s*Forwarded message\s*-{2,}|From: .+ Sent: .+)\s*$",
+    re.I,
+)
+_SIGNATURE = re.compile(r"^(-- ?|__+|Sent from my \w+.*)$")
+_BLOCK_TAGS = {"p", "div", "br", "li", "tr", "table", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "hr"}
+_SKIP_TAGS = {"script", "style", "head", "title", "noscript"}
+
+
+class _Budget(Exception):
+    """Raised internally once enough text has been collected."""
+
+
+class _TextSink:
+    """Collects cleaned lines: drops quoted replies, stops at signatures."""
+
+    def __init__(self, max_chars):
+        self.max_chars = max_chars
+        self.lines = []
+        self.length = 0
+        self._partial = ""
+
+    def write(self, text):
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._line(line)
+
+    def close(self):
+        if self._partial:
+            self._line(self._partial)
+            self._partial = ""
+
+    def _line(self, line):
+        line = " ".join(line.split())
+        if _QUOTE_HEADER.match(line) or _SIGNATURE.match(line):
+            raise _Budget
+        if not line or line.startswith(">"):
+            return
+        self.lines.append(line)
+        self.length += len(line) + 1
+        if self.length >= self.max_chars:
+            raise _Budget
+
+    def text(self):
+        return "\n".join(self.lines)[:self.max_chars]
+
+
+class _HTMLToText(HTMLParser):
+    def __init__(self, sink):
+        super().__init__(convert_charrefs=True)
+        self.sink = sink
+        self._skip = 0
+        self._quote = 0
+        self._divs = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+        elif tag == "blockquote":
+            self._quote += 1
+        elif tag == "div":
+            # Gmail and Outlook wrap quoted history in these containers.
+            classes = dict(attrs).get("class") or ""
+            quoted = "gmail_quote" in classes or "OutlookMessageHeader" in classes
+            self._divs.append(quoted)
+            self._quote += quoted
+        if tag in _BLOCK_TAGS:
+            self.sink.write("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag == "blockquote":
+            self._quote = max(0, self._quote - 1)
+        elif tag == "div" and self._divs:
+            self._quote -= self._divs.pop()
+        if tag in _BLOCK_TAGS:
+            self.sink.write("\n")
+
+    def handle_data(self, data):
+        if not self._skip and not self._quote:
+            self.sink.write(data.replace("\n", " "))
+
+
+def _header(part, name):
+    for header in part.get("headers", []):
+        if header.get("name", "").lower() == name.lower():
+            return header.get("value", "")
+    return ""
+
+
+def _charset(part):
+    match = re.search(r'charset="?([\w.-]+)"?', _header(part, "Content-Type"), re.I)
+    try:
+        return codecs.lookup(match.group(1)).name if match else "utf-8"
+    except LookupError:
+        return "utf-8"
+
+
+def iter_decoded(data, charset="utf-8", chunk_chars=DECODE_CHUNK):
+    """Decodes Gmail's (unpadded) base64url body data chunk by chunk."""
+    decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+    for start in range(0, len(data), chunk_chars):
+        piece = data[start:start + chunk_chars]
+        yield decoder.decode(base64.urlsafe_b64decode(piece + "=" * (-len(piece) % 4)))
+    yield decoder.decode(b"", final=True)
+
+
+def walk_parts(part):
+    """Yields the leaf MIME parts of a Gmail payload, depth first."""
+    children = part.get("parts")
+    if not children:
+        yield part
+        return
+    for child in children:
+        yield from walk_parts(child)
+
+
+def pick_text_part(payload, max_part_bytes=512 * 1024):
+    """
+    The part to summarize: the first inline text/plain, else text/html.
+    Attachments (a filename or attachmentId) and parts larger than
+    max_part_bytes are skipped.
+    """
+    html = None
+    for part in walk_parts(payload):
+        body = part.get("body", {})
+        if part.get("filename") or body.get("attachmentId") or not body.get("data"):
+            continue
+        if body.get("size", 0) > max_part_bytes:
+            continue
+        mime = part.get("mimeType", "")
+        if mime == "text/plain":
+            return part
+        if mime == "text/html" and html is None:
+            html = part
+    return html
+
+
+def extract_body(message, max_tokens=1000, max_part_bytes=512 * 1024):
+    """
+    Plain-text body of a format=full message, with quoted replies and the
+    signature removed, capped at roughly max_tokens (4 chars per token).
+    Falls back to the snippet when there is no usable text part.
+    """
+    part = pick_text_part(message.get("payload", {}), max_part_bytes)
+    if part is None:
+        return message.get("snippet", "")
+    sink = _TextSink(max_tokens * 4)
+    parser = _HTMLToText(sink) if part.get("mimeType") == "text/html" else None
+    try:
+        for text in iter_decoded(part["body"]["data"], _charset(part)):
+            if parser:
+                parser.feed(text)
+            else:
+                sink.write(text)
+        if parser:
+            parser.close()
+        sink.close()
+    except _Budget:
+        pass
+    return sink.text() or message.get("snippet", "")
+
+
+def strip_body(message):
+    """Drops the body parts from a message once extracted, keeping headers."""
+    payload = message.get("payload", {})
+    message["payload"] = {"mimeType": payload.get("mimeType"), "headers": payload.get("headers", [])}
+    return message
@@ -0,0 +1,137 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from summarizer import metrics
+
+# ===============================
+# 🗃️ Persistent Summary Cache
+# ===============================
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    key TEXT PRIMARY KEY,
+    message_id TEXT,
+    summary TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_summaries_last_used ON summaries(last_used);
+CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+
+class SummaryCache:
+    """
+    SQLite-backed cache of LLM summaries.
+
+    Entries are keyed by Gmail message id plus a hash of the email text,
+    model name and prompt version, so editing the prompt or switching
+    models never serves a stale summary. Entries older than ttl_seconds
+    expire; beyond max_entries the least recently used rows are evicted.
+    """
+
+    def __init__(self, path=".cache/summary_cache.sqlite3", max_entries=50000, ttl_seconds=30 * 86400):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Workers in several processes write into the same file.
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    @staticmethod
+    def key(message_id, content, model_name, prompt_version):
+        digest = hashlib.sha256("\0".join([content, model_name, prompt_version]).encode("utf-8")).hexdigest()
+        return f"{message_id}:{digest}"
+
+    def get_many(self, keys):
+        """Returns {key: summary} for every fresh entry among keys."""
+        now = time.time()
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, summary FROM summaries WHERE key IN ({','.join('?' * len(chunk))}) AND created_at > ?",
+                    [*chunk, now - self.ttl_seconds],
+                ).fetchall()
+                found.update(rows)
+            self._conn.executemany("UPDATE summaries SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+            self._conn.commit()
+        return found
+
+    def put_many(self, items):
+        """Stores (key, summary) pairs, then enforces TTL and size cap."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO summaries (key, message_id, summary, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                [(k, k.split(":", 1)[0], summary, now, now) for k, summary in items],
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM summaries WHERE created_at <= ?", (now - self.ttl_seconds,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM summaries WHERE key IN (SELECT key FROM summaries ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def get_or_compute(self, keys, emails, summarize, on_result=None):
+        """
+        Returns summaries for emails (aligned with keys), calling
+        summarize(list_of_emails, on_result=...) only for cache misses.
+        Empty results (failed calls) are not cached. on_result(index, text)
+        fires for hits right away and for misses as they complete.
+        """
+        cached = self.get_many(keys)
+        missing = [i for i, k in enumerate(keys) if k not in cached]
+        self._count(hits=len(keys) - len(missing), misses=len(missing))
+        if on_result:
+            for i, k in enumerate(keys):
+                if k in cached:
+                    on_result(i, cached[k])
+
+        remap = (lambda j, text: on_result(missing[j], text)) if on_result else None
+        fresh = summarize([emails[i] for i in missing], on_result=remap) if missing else []
+        self.put_many([(keys[i], text) for i, text in zip(missing, fresh) if text])
+        results = [cached.get(k) for k in keys]
+        for i, text in zip(missing, fresh):
+            results[i] = text
+        return results
+
+    def _count(self, hits, misses):
+        self.hits += hits
+        self.misses += misses
+        metrics.record_cache(hits, misses)
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO stats (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                [("hits", hits), ("misses", misses)],
+            )
+            self._conn.commit()
+
+    def stats(self):
+        """Hit/miss counters for this instance plus lifetime totals."""
+        with self._lock:
+            totals = dict(self._conn.execute("SELECT name, value FROM stats").fetchall())
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "total_hits": totals.get("hits", 0),
+            "total_misses": totals.get("misses", 0),
+            "entries": size,
+        }
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,305 @@
+import argparse
+import json
+import re
+import sys
+import time
+from datetime import datetime
+
+from summarizer import config
+
+# ===============================
+# 🖥️ Headless CLI
+# ===============================
+# `python -m summarizer run` runs the same LangGraph pipeline as the
+# Streamlit apps without importing Streamlit, pandas or AgGrid, so it can
+# be started from cron or a worker. Each summary is written as one JSON
+# line as soon as it is ready; a run report goes to stderr. `enqueue` and
+# `worker` drive the multi-user pool in summarizer.jobs; `send-digest`
+# mails the latest saved run to a list of recipients. `schedule-digest`
+# sets a user's daily digest and `digest-scheduler` sends the ones that
+# are due (in a loop, or once per cron tick with --once). `search` queries
+# the saved summaries; `index-summaries` adds runs saved before the search
+# index existed. With REPLAY_MODE=record or replay (summarizer.replay),
+# `run` captures its Gmail and Gemini traffic to a cassette or serves it
+# from one offline.
+
+_RELATIVE = re.compile(r"^(\d+)([hdmy])$")
+
+
+def since_query(value):
+    """
+    Turns --since into a Gmail search query: "2025-11-01" -> after:2025/11/01,
+    "12h" -> after:<epoch seconds>, "3d"/"2m"/"1y" -> newer_than:3d etc.
+    """
+    match = _RELATIVE.match(value.strip().lower())
+    if match:
+        amount, unit = int(match.group(1)), match.group(2)
+        if unit == "h":
+            return f"after:{int(time.time()) - amount * 3600}"
+        return f"newer_than:{amount}{unit}"
+    try:
+        day = datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD or a relative age like 12h/3d, got {value!r}")
+    return f"after:{day:%Y/%m/%d}"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m summarizer", description="Gmail summarizer pipeline (headless).")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="fetch, summarize and save, printing JSON lines")
+    run.add_argument("--max-results", type=int, default=config.GMAIL_MAX_RESULTS, help="newest messages to process")
+    run.add_argument("--since", type=since_query, help="only messages after YYYY-MM-DD or within e.g. 12h / 3d")
+    run.add_argument("--concurrency", type=int, default=config.SUMMARY_CONCURRENCY, help="Gemini calls in flight")
+    run.add_argument("--token", default="token.json", help="authorized Gmail token file")
+    run.add_argument("--user", default="me", help="key for the incremental sync state")
+    run.add_argument("--sheets-cred", help="service-account key file; omit to skip Google Sheets")
+    run.add_argument("--output", "-o", default="-", help="JSON-lines output file (default: stdout)")
+    enqueue = commands.add_parser("enqueue", help="queue a run for one mailbox in the worker pool")
+    enqueue.add_argument("--user", required=True, help="mailbox owner; one job per user runs at a time")
+    enqueue.add_argument("--token", required=True, help="that user's authorized Gmail token file")
+    enqueue.add_argument("--max-results", type=int, default=config.GMAIL_MAX_RESULTS)
+    enqueue.add_argument("--since", type=since_query)
+    enqueue.add_argument("--sheets-cred")
+    worker = commands.add_parser("worker", help="run worker processes that drain the job queue")
+    worker.add_argument("--workers", type=int, default=config.WORKER_PROCESSES, help="worker processes")
+    worker.add_argument("--slots", type=int, default=config.WORKER_SLOTS, help="concurrent jobs per process")
+    worker.add_argument("--drain", action="store_true", help="exit once the queue is empty")
+    digest = commands.add_parser("send-digest", help="email the latest saved run to one or more recipients")
+    digest.add_argument("--to", nargs="+", required=True, help="recipient addresses")
+    digest.add_argument("--token", default="token.json", help="Gmail token file authorized for gmail.send")
+    digest.add_argument("--user", help="only runs saved for this user (default: newest run of anyone)")
+    digest.add_argument("--template", help="text file with $name, $email, $count and $digest placeholders")
+    digest.add_argument("--subject")
+    schedule = commands.add_parser("schedule-digest", help="send a user's daily digest at a fixed local time")
+    schedule.add_argument("--user", required=True, help="whose saved summaries the digest covers")
+    schedule.add_argument("--to", nargs="+", required=True, help="recipient addresses")
+    schedule.add_argument("--at", default="07:00", help="local send time, HH:MM")
+    schedule.add_argument("--tz", default="UTC", help="IANA time zone, e.g. Europe/Berlin")
+    schedule.add_argument("--token", default="token.json", help="Gmail token file authorized for gmail.send")
+    scheduler = commands.add_parser("digest-scheduler", help="send scheduled daily digests as they fall due")
+    scheduler.add_argument("--once", action="store_true", help="send what is due now and exit (for cron)")
+    search = commands.add_parser("search", help="find saved summaries similar to a query, printing JSON lines")
+    search.add_argument("query")
+    search.add_argument("-k", type=int, default=10, help="results to return")
+    search.add_argument("--user", help="only this user's summaries")
+    commands.add_parser("index-summaries", help="add every summary in the summary store to the search index")
+    migrate = commands.add_parser("import-backups", help="import legacy backups/*.json files into the summary store")
+    migrate.add_argument("--folder", default="backups")
+    migrate.add_argument("--user", default="me")
+    return parser
+
+
+def run_pipeline(args, out):
+    # Deferred so `--help` and argument errors return instantly.
+    from summarizer.clients import GMAIL_READONLY, gemini_model, gmail_service
+    from summarizer.fetch import header_value
+    from summarizer.pipeline import (
+        build_pipeline, cache_from_config, open_sheet, run_config, store_from_config, thread_store_from_config,
+    )
+    from summarizer.scheduler import digests_from_config
+    from summarizer.search import search_from_config
+    from summarizer.sync import SyncStateStore
+
+    started = time.perf_counter()
+    summary_cache = cache_from_config()
+    graph = build_pipeline(
+        gemini_model(),
+        summary_cache=summary_cache,
+        sync_store=SyncStateStore(config.SYNC_STATE_PATH),
+        summary_store=store_from_config(),
+        thread_store=thread_store_from_config(),
+        digest_store=digests_from_config(),
+        search_index=search_from_config(),
+    )
+    settings = run_config(
+        gmail=lambda: gmail_service(token_path=args.token, scopes=GMAIL_READONLY),
+        sheet=(lambda: open_sheet(args.sheets_cred)) if args.sheets_cred else None,
+        user=args.user,
+        max_results=args.max_results,
+        query=args.since,
+        concurrency=args.concurrency,
+    )
+
+    messages, state, first_summary_s, written = [], {}, None, 0
+    for mode, chunk in graph.stream({}, settings, stream_mode=["custom", "values"]):
+        if mode == "values":
+            state = chunk
+            continue
+        if "messages" in chunk:
+            messages = chunk["messages"]
+            continue
+        if first_summary_s is None:
+            first_summary_s = time.perf_counter() - started
+        msg = messages[chunk["index"]] if chunk["index"] < len(messages) else {}
+        record = chunk["record"]
+        out.write(json.dumps({
+            "id": msg.get("id"),
+            "threadId": msg.get("threadId"),
+            "from": header_value(msg, "From"),
+            "subject": header_value(msg, "Subject"),
+            "date": header_value(msg, "Date"),
+            "snippet": msg.get("snippet", ""),
+            "summary": record["summary"],
+            "priority": record["priority"],
+            "similar": record.get("similar", 1),
+        }, ensure_ascii=False) + "\n")
+        out.flush()
+        written += 1
+
+    report = {
+        "emails": written,
+        "first_summary_s": round(first_summary_s or 0.0, 3),
+        "total_s": round(time.perf_counter() - started, 3),
+        "run_id": state.get("run_id"),
+        "sheets": {k: v for k, v in state.get("sheets_report", {}).items() if k != "errors"},
+        "metrics": state.get("report"),
+    }
+    if summary_cache is not None:
+        report["cache"] = summary_cache.stats()
+    print(json.dumps(report), file=sys.stderr)
+    return 0
+
+
+def import_backups(args):
+    from summarizer.store import SummaryStore
+
+    store = SummaryStore(config.SUMMARY_STORE_PATH)
+    added = store.import_backups(args.folder, user=args.user)
+    print(f"imported {added} runs from {args.folder} into {config.SUMMARY_STORE_PATH}", file=sys.stderr)
+    return 0
+
+
+def send_digest_command(args):
+    from summarizer.clients import GMAIL_SEND, gmail_service
+    from summarizer.digest import DEFAULT_SUBJECT, DEFAULT_TEMPLATE, send_digest
+    from summarizer.ratelimit import limiter_for
+    from summarizer.store import SummaryStore
+
+    run, records = SummaryStore(config.SUMMARY_STORE_PATH).latest_run(args.user)
+    if run is None:
+        print("no saved runs to send", file=sys.stderr)
+        return 1
+    template = DEFAULT_TEMPLATE
+    if args.template:
+        with open(args.template, "r", encoding="utf-8") as f:
+            template = f.read()
+    report = send_digest(
+        gmail_service(token_path=args.token, scopes=GMAIL_SEND), args.to, records,
+        template=template, subject=args.subject or DEFAULT_SUBJECT,
+        batch_size=config.DIGEST_BATCH_SIZE, limiter=limiter_for("gmail", args.user or "me"),
+    )
+    for result in report.pop("results"):
+        print(json.dumps(result))
+    print(json.dumps({"run_id": run["id"], **report}), file=sys.stderr)
+    return 0 if not report["failed"] else 1
+
+
+def search_command(args):
+    from summarizer.search import search_from_config
+
+    index = search_from_config()
+    if index is None:
+        print("search is disabled (SEARCH_INDEX_PATH is empty)", file=sys.stderr)
+        return 1
+    started = time.perf_counter()
+    results = index.search(args.query, k=args.k, user=args.user)
+    for result in results:
+        print(json.dumps(result, ensure_ascii=False))
+    print(json.dumps({"results": len(results), "ms": round((time.perf_counter() - started) * 1000, 2)}), file=sys.stderr)
+    return 0
+
+
+def index_summaries(args):
+    from summarizer.search import search_from_config
+    from summarizer.store import SummaryStore
+
+    index = search_from_config()
+    if index is None:
+        print("search is disabled (SEARCH_INDEX_PATH is empty)", file=sys.stderr)
+        return 1
+    added = index.import_store(SummaryStore(config.SUMMARY_STORE_PATH))
+    print(f"indexed {added} summaries from {config.SUMMARY_STORE_PATH} into {config.SEARCH_INDEX_PATH}", file=sys.stderr)
+    return 0
+
+
+def schedule_digest(args):
+    from summarizer.scheduler import DigestStore
+
+    store = DigestStore(config.DIGEST_STORE_PATH)
+    try:
+        store.set_schedule(args.user, args.to, send_at=args.at, tz=args.tz, token_path=args.token)
+    except (ValueError, KeyError) as e:
+        print(f"invalid schedule: {e}", file=sys.stderr)
+        return 2
+    print(json.dumps({"user": args.user, "to": args.to, "at": args.at, "tz": args.tz}))
+    return 0
+
+
+def digest_scheduler(args):
+    from summarizer.scheduler import DigestStore, run_due
+
+    store = DigestStore(config.DIGEST_STORE_PATH)
+    failed = False
+    try:
+        while True:
+            for result in run_due(store):
+                failed = failed or bool(result["failed"])
+                print(json.dumps(result), flush=True)
+            if args.once:
+                break
+            time.sleep(config.DIGEST_POLL_SECONDS)
+    except KeyboardInterrupt:
+        pass
+    return 1 if failed else 0
+
+
+def enqueue(args):
+    from summarizer.jobs import queue_from_config
+
+    job_id = queue_from_config().enqueue(
+        args.user, args.token, max_results=args.max_results, query=args.since, sheets_cred=args.sheets_cred,
+    )
+    print(json.dumps({"job": job_id, "user": args.user}))
+    return 0
+
+
+def run_workers(args):
+    from summarizer.jobs import queue_from_config, start_pool
+
+    processes = start_pool(args.workers, args.slots, drain=args.drain)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # Jobs interrupted here are picked up again once their lease expires.
+        for process in processes:
+            process.terminate()
+    print(json.dumps(queue_from_config().counts()), file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "import-backups":
+        return import_backups(args)
+    if args.command == "enqueue":
+        return enqueue(args)
+    if args.command == "send-digest":
+        return send_digest_command(args)
+    if args.command == "search":
+        return search_command(args)
+    if args.command == "index-summaries":
+        return index_summaries(args)
+    if args.command == "schedule-digest":
+        return schedule_digest(args)
+    if args.command == "digest-scheduler":
+        return digest_scheduler(args)
+    if args.command == "worker":
+        return run_workers(args)
+    if args.command == "run":
+        if args.output == "-":
+            return run_pipeline(args, sys.stdout)
+        with open(args.output, "w", encoding="utf-8") as out:
+            return run_pipeline(args, out)
+    return 2
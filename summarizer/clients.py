@@ -0,0 +1,192 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from summarizer import config
+
+# ===============================
+# 🔌 Client Registry
+# ===============================
+# Streamlit re-executes the app script on every interaction, but imported
+# modules survive reruns. Clients cached here are therefore built once per
+# process and user: the discovery document is parsed once, each client
+# keeps its HTTP connection open between clicks, and the in-memory
+# credentials only hit the token endpoint when their access token has
+# actually expired (google-auth refreshes invalid tokens before a request).
+# Rebuilding from token.json each time re-refreshed a stale file token on
+# every click. The Google client libraries are imported on first build so
+# that importing this module stays cheap for the UI. With REPLAY_MODE set,
+# Gmail and Gemini are recorded to or answered from a cassette (see
+# summarizer.replay).
+# - Keys identify the user by OAuth client and refresh token (or token
+#   file), never by id() of an object: a freed object's id can be reused
+#   for another user's credentials.
+# - httplib2 is not thread-safe and every Gmail service owns one Http, so
+#   a thread never shares its Gmail service with another live thread. The
+#   registry keeps one ThreadClients per user; a thread that has finished
+#   (Streamlit runs every rerun on a new script thread) hands its service
+#   to the next thread that asks, so reruns reuse it instead of building
+#   one per thread. The number of services per user is bounded by how many
+#   threads use them at the same time.
+# - The registry keeps at most CLIENT_CACHE_MAX_ENTRIES clients and drops
+#   the least recently used, so a long-lived server does not keep every
+#   user it has ever seen.
+GMAIL_READONLY = ["https://www.googleapis.com/auth/gmail.readonly"]
+GMAIL_SEND = ["https://www.googleapis.com/auth/gmail.send"]
+SHEETS_SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+
+
+class ClientRegistry:
+    """Process-wide LRU cache of built clients, keyed per user and scope."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.evictions = 0
+
+    def get(self, key, factory):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+            client = self._items[key] = factory()
+            self.builds += 1
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+                self.evictions += 1
+            return client
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class ThreadClients:
+    """Clients that are each used by one live thread at a time, reused once their thread has finished."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._owners = []  # [client, thread that last took it]
+        self.builds = 0
+
+    def get(self):
+        current = threading.current_thread()
+        with self._lock:
+            free = None
+            for entry in self._owners:
+                if entry[1] is current:
+                    return entry[0]
+                if free is None and not entry[1].is_alive():
+                    free = entry
+            if free is not None:
+                free[1] = current
+                return free[0]
+        client = self._factory()
+        with self._lock:
+            self._owners.append([client, current])
+            self.builds += 1
+        return client
+
+
+registry = ClientRegistry(config.CLIENT_CACHE_MAX_ENTRIES)
+
+
+def _file_key(path):
+    # Re-running the OAuth flow rewrites the file, which invalidates the entry.
+    return (os.path.abspath(path), os.path.getmtime(path))
+
+
+def _identity(creds):
+    """Stable key of the user behind creds, or None when there is nothing to tell users apart by."""
+    secret = getattr(creds, "refresh_token", None) or getattr(creds, "token", None)
+    if not secret:
+        return None
+    return (getattr(creds, "client_id", None), hashlib.sha256(secret.encode("utf-8")).hexdigest(), tuple(getattr(creds, "scopes", None) or ()))
+
+
+def _get(kind, creds, factory, per_thread=False):
+    """registry.get for a client of creds; built uncached if creds have no identity."""
+    identity = _identity(creds)
+    if identity is None:
+        return factory()
+    if per_thread:
+        return registry.get((kind, identity), lambda: ThreadClients(factory)).get()
+    return registry.get((kind, identity), factory)
+
+
+def user_credentials(token_path=None, token_info=None, scopes=GMAIL_READONLY):
+    """
+    Cached OAuth user credentials from a token file (app.py) or an
+    authorized-user dict kept in session state (app2.py).
+    """
+    from google.oauth2.credentials import Credentials
+
+    if token_path:
+        key = ("creds", _file_key(token_path), tuple(scopes))
+        return registry.get(key, lambda: Credentials.from_authorized_user_file(token_path, scopes))
+    refresh_token = hashlib.sha256((token_info.get("refresh_token") or "").encode("utf-8")).hexdigest()
+    key = ("creds", token_info.get("client_id"), refresh_token, tuple(scopes))
+    return registry.get(key, lambda: Credentials.from_authorized_user_info(token_info, scopes))
+
+
+def gmail_service(token_path=None, token_info=None, scopes=GMAIL_READONLY):
+    from googleapiclient.discovery import build
+
+    if config.REPLAY_MODE == "replay":
+        # Answered from the cassette (summarizer.replay); no token needed.
+        from summarizer import replay
+
+        return registry.get(("gmail-replay", config.REPLAY_PATH), lambda: replay.gmail_service(
+            replay.ReplayHttp(replay.cassette_for(config.REPLAY_PATH), replay.latency_from_config()),
+        ))
+    creds = user_credentials(token_path, token_info, scopes)
+    if config.REPLAY_MODE == "record":
+        from google_auth_httplib2 import AuthorizedHttp
+        from googleapiclient.http import build_http
+
+        from summarizer import replay
+
+        def recording():
+            http = replay.RecordingHttp(AuthorizedHttp(creds, http=build_http()), replay.cassette_for(config.REPLAY_PATH))
+            return replay.gmail_service(http)
+
+        return _get("gmail-record", creds, recording, per_thread=True)
+    return _get("gmail", creds, lambda: build("gmail", "v1", credentials=creds, cache_discovery=False), per_thread=True)
+
+
+def gemini_model():
+    """The Gemini chat model, recording to or replaced by the cassette when REPLAY_MODE is set."""
+    if config.REPLAY_MODE == "replay":
+        from summarizer import replay
+
+        return replay.ReplayModel(replay.cassette_for(config.REPLAY_PATH), replay.latency_from_config())
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    model = ChatGoogleGenerativeAI(model=config.GEMINI_MODEL)
+    if config.REPLAY_MODE == "record":
+        from summarizer import replay
+
+        return replay.RecordingModel(model, replay.cassette_for(config.REPLAY_PATH))
+    return model
+
+
+def oauth2_service(creds):
+    from googleapiclient.discovery import build
+
+    # One Http per service, so per thread as for Gmail.
+    return _get("oauth2", creds, lambda: build("oauth2", "v2", credentials=creds, cache_discovery=False), per_thread=True)
+
+
+def sheets_client(keyfile, scopes=SHEETS_SCOPE):
+    def factory():
+        import gspread
+        from oauth2client.service_account import ServiceAccountCredentials
+
+        creds = ServiceAccountCredentials.from_json_keyfile_name(keyfile, scopes)
+        return gspread.authorize(creds)
+
+    return registry.get(("sheets", _file_key(keyfile), tuple(scopes)), factory)
@@ -0,0 +1,153 @@
+import os
+from dotenv import load_dotenv
+
+# ===============================
+# ⚙️ Settings (overridable via .env)
+# ===============================
+load_dotenv()
+
+GMAIL_MAX_RESULTS = int(os.getenv("GMAIL_MAX_RESULTS", "5"))
+GMAIL_BATCH_SIZE = int(os.getenv("GMAIL_BATCH_SIZE", "50"))
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "8"))
+SUMMARY_TIMEOUT = float(os.getenv("SUMMARY_TIMEOUT", "60"))
+# "single" = one Gemini call per email, "packed" = many emails per call
+SUMMARY_MODE = os.getenv("SUMMARY_MODE", "single")
+PACK_MAX_TOKENS = int(os.getenv("PACK_MAX_TOKENS", "8000"))
+
+# Set SUMMARY_CACHE_PATH to an empty string to disable the summary cache.
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", ".cache/summary_cache.sqlite3")
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "50000"))
+SUMMARY_CACHE_TTL_DAYS = float(os.getenv("SUMMARY_CACHE_TTL_DAYS", "30"))
+
+# "full" = re-list the newest GMAIL_MAX_RESULTS messages every run,
+# "incremental" = only messages added since the last run (Gmail historyId)
+GMAIL_SYNC_MODE = os.getenv("GMAIL_SYNC_MODE", "full")
+GMAIL_MAX_DELTA = int(os.getenv("GMAIL_MAX_DELTA", "1000"))
+# Label both sync modes read; empty = all mail (spam and trash excluded)
+GMAIL_LABEL = os.getenv("GMAIL_LABEL", "INBOX")
+SYNC_STATE_PATH = os.getenv("SYNC_STATE_PATH", ".cache/sync_state.json")
+
+SHEETS_CHUNK_SIZE = int(os.getenv("SHEETS_CHUNK_SIZE", "500"))
+SHEETS_MAX_RETRIES = int(os.getenv("SHEETS_MAX_RETRIES", "5"))
+
+# Saved runs (replaces one backups/email_summaries_*.json file per run)
+SUMMARY_STORE_PATH = os.getenv("SUMMARY_STORE_PATH", "backups/summaries.sqlite3")
+
+# "snippet" = summarize Gmail's ~200-char snippet, "full" = extracted body
+BODY_MODE = os.getenv("BODY_MODE", "snippet")
+BODY_MAX_TOKENS = int(os.getenv("BODY_MAX_TOKENS", "1000"))
+BODY_MAX_PART_BYTES = int(os.getenv("BODY_MAX_PART_BYTES", str(512 * 1024)))
+
+# "message" = one summary per email, "thread" = one running summary per
+# Gmail thread, updated only from messages and sentences not seen before
+SUMMARIZE_BY = os.getenv("SUMMARIZE_BY", "message")
+THREAD_STORE_PATH = os.getenv("THREAD_STORE_PATH", ".cache/threads.sqlite3")
+
+# Local triage: emails scored >= TRIAGE_THRESHOLD (0-1) as automated mail
+# get a template Low summary without a Gemini call. "off" disables it.
+TRIAGE_MODE = os.getenv("TRIAGE_MODE", "off")
+TRIAGE_THRESHOLD = float(os.getenv("TRIAGE_THRESHOLD", "0.9"))
+# Optional .npz saved by TriageModel.save(); empty = built-in word weights
+TRIAGE_MODEL_PATH = os.getenv("TRIAGE_MODEL_PATH", "")
+
+# Client-side quotas (see summarizer.ratelimit). Gmail: quota units per
+# user per second; Gemini: per project; Sheets: write requests per minute
+GMAIL_UNITS_PER_SECOND = float(os.getenv("GMAIL_UNITS_PER_SECOND", "250"))
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "1000"))
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "1000000"))
+# AIMD bounds for concurrent Gemini calls; 0 = ignore latency, react to 429s only
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "32"))
+GEMINI_TARGET_LATENCY = float(os.getenv("GEMINI_TARGET_LATENCY", "0"))
+SHEETS_WRITES_PER_MINUTE = float(os.getenv("SHEETS_WRITES_PER_MINUTE", "60"))
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "4"))
+RATE_LIMIT_BASE_DELAY = float(os.getenv("RATE_LIMIT_BASE_DELAY", "1.0"))
+
+# Multi-user worker pool (python -m summarizer worker)
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", ".cache/jobs.sqlite3")
+# Per-tenant incremental sync state, one JSON file per user
+JOB_STATE_DIR = os.getenv("JOB_STATE_DIR", ".cache/tenants")
+# A job whose worker stops heartbeating for this long is handed to another worker
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "4"))
+# Jobs each worker process runs at once
+WORKER_SLOTS = int(os.getenv("WORKER_SLOTS", "4"))
+
+# "json" = Gemini structured output bound to a {summary, priority} schema,
+# "text" = free-text "Summary:/Priority:" answers parsed with a regex
+SUMMARY_OUTPUT = os.getenv("SUMMARY_OUTPUT", "json")
+
+# Instrumentation (see summarizer.metrics): the last run's JSON report and
+# a Prometheus textfile ("{pid}" = one file per worker process); empty = off
+METRICS_REPORT_PATH = os.getenv("METRICS_REPORT_PATH", ".cache/last_run.json")
+METRICS_PROMETHEUS_PATH = os.getenv("METRICS_PROMETHEUS_PATH", ".cache/metrics.prom")
+
+# Digest sending (summarizer.digest): sends per Gmail batch request; with
+# the Gmail limiter a batch is also capped to what its quota bucket covers
+DIGEST_BATCH_SIZE = int(os.getenv("DIGEST_BATCH_SIZE", "50"))
+
+# Scheduled daily digests (summarizer.scheduler): rollups are updated as
+# runs are saved; empty DIGEST_STORE_PATH disables them
+DIGEST_STORE_PATH = os.getenv("DIGEST_STORE_PATH", ".cache/digests.sqlite3")
+# Missed days sent after downtime, oldest first
+DIGEST_MAX_CATCHUP = int(os.getenv("DIGEST_MAX_CATCHUP", "7"))
+DIGEST_TOP_SENDERS = int(os.getenv("DIGEST_TOP_SENDERS", "5"))
+DIGEST_MAX_HIGH = int(os.getenv("DIGEST_MAX_HIGH", "20"))
+DIGEST_POLL_SECONDS = float(os.getenv("DIGEST_POLL_SECONDS", "60"))
+
+# Near-duplicate detection before summarizing (summarizer.dedup): "minhash"
+# summarizes one email per cluster of near-identical emails and reuses
+# its summary for the rest; "off" summarizes every email
+DEDUP_MODE = os.getenv("DEDUP_MODE", "off")
+# Estimated Jaccard similarity (0-1) of word 3-shingles to join a cluster
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "64"))
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16"))
+
+# Semantic search over saved summaries (summarizer.search); empty
+# SEARCH_INDEX_PATH disables it. SEARCH_EMBEDDER is "hashing" (offline,
+# deterministic) or a local sentence-transformers model name, e.g.
+# all-MiniLM-L6-v2; SEARCH_INDEX is "flat" (exact) or "ivf" (approximate)
+SEARCH_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", ".cache/search.sqlite3")
+SEARCH_EMBEDDER = os.getenv("SEARCH_EMBEDDER", "hashing")
+SEARCH_DIM = int(os.getenv("SEARCH_DIM", "512"))
+SEARCH_INDEX = os.getenv("SEARCH_INDEX", "flat")
+# IVF lists scanned per query: higher = better recall, slower
+SEARCH_NPROBE = int(os.getenv("SEARCH_NPROBE", "16"))
+SEARCH_RESULTS = int(os.getenv("SEARCH_RESULTS", "10"))
+
+# Streamlit results view: summaries per page, rows redrawn while a run
+# streams, and senders offered in the sender filter
+RESULTS_PAGE_SIZE = int(os.getenv("RESULTS_PAGE_SIZE", "50"))
+RESULTS_LIVE_ROWS = int(os.getenv("RESULTS_LIVE_ROWS", "20"))
+RESULTS_MAX_SENDERS = int(os.getenv("RESULTS_MAX_SENDERS", "200"))
+
+# Record/replay of Gmail and Gemini traffic (summarizer.replay): "record"
+# appends every Gmail response and Gemini answer to the REPLAY_PATH
+# cassette, "replay" answers from it offline without credentials, "off"
+# talks to the real APIs. Sheets writes are never recorded
+REPLAY_MODE = os.getenv("REPLAY_MODE", "off")
+REPLAY_PATH = os.getenv("REPLAY_PATH", "fixtures/replay.jsonl")
+# Seconds per replayed call (a Gmail batch counts once); empty = as recorded
+REPLAY_LATENCY = os.getenv("REPLAY_LATENCY", "")
+
+# Gemini context caching of the shared instructions (summarizer.context_cache),
+# opt-in: "off" = one plain prompt, as before; "implicit" = instruction sent
+# as a system message, so Gemini's automatic prefix caching can apply;
+# "explicit" = instruction kept in a Gemini cached content that calls
+# reference by name (falls back to implicit for instructions under
+# PROMPT_CACHE_MIN_TOKENS)
+PROMPT_CACHE = os.getenv("PROMPT_CACHE", "off")
+# Live cache names, shared by later runs and other processes
+PROMPT_CACHE_STATE_PATH = os.getenv("PROMPT_CACHE_STATE_PATH", ".cache/context_caches.sqlite3")
+PROMPT_CACHE_TTL_SECONDS = float(os.getenv("PROMPT_CACHE_TTL_SECONDS", "3600"))
+# A cache this close to expiring is extended by another TTL before use
+PROMPT_CACHE_REFRESH_SECONDS = float(os.getenv("PROMPT_CACHE_REFRESH_SECONDS", "300"))
+# Gemini's minimum cached content size (2.5 Flash: 1024 tokens)
+PROMPT_CACHE_MIN_TOKENS = int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "1024"))
+
+# Built Google clients kept per process (summarizer.clients), least recently
+# used dropped first; each user's pool of per-thread Gmail services counts once
+CLIENT_CACHE_MAX_ENTRIES = int(os.getenv("CLIENT_CACHE_MAX_ENTRIES", "256"))
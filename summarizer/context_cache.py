@@ -0,0 +1,206 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from summarizer.summarize import PACKED_SYSTEM_PROMPT, SYSTEM_PROMPT, THREAD_SYSTEM_PROMPT, estimate_tokens
+
+# ===============================
+# 🗄️ Gemini Context Caching
+# ===============================
+# Every prompt starts with one of three fixed instructions. Without
+# caching, each call pays the full input price for that instruction again.
+# - "implicit": the instruction is sent as a system message, ahead of the
+#   email. Gemini 2.5 caches repeated prefixes by itself and bills cache
+#   hits at a discount. This is best effort and needs a prefix of at least
+#   min_tokens.
+# - "explicit": the instruction is stored once as a Gemini cached content.
+#   Calls reference it by name (cached_content) and send only the email.
+#   A cache lives ttl seconds and costs storage for that time.
+#   - Cache names are kept in a small SQLite table, so later runs and
+#     other processes reuse a live cache; each save is one upsert.
+#   - A cache within refresh seconds of expiring is extended rather than
+#     recreated, so a long run keeps its cache.
+#   - Gemini rejects caches under min_tokens, so shorter instructions use
+#     the implicit form instead. So does a cache that cannot be created.
+#   - Gemini also refuses cached_content in a request that sets tools or
+#     tool_config, which with_structured_output's function calling does.
+#     A call refused like that is retried without the cache
+#     (summarizer.summarize), and reject() moves its instruction back to
+#     the implicit form for the rest of the process.
+# Only the backend (create / extend) talks to Gemini;
+# benchmarks/stub_model.py has an offline one that prices cached prefixes.
+INSTRUCTIONS = (SYSTEM_PROMPT, PACKED_SYSTEM_PROMPT, THREAD_SYSTEM_PROMPT)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS context_caches (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    expire_at REAL NOT NULL
+);
+"""
+# Instruction held by each cache name handed out in this process.
+_CACHED = {}
+
+
+def cached_instruction(name):
+    """The instruction stored in cache name, if this process handed it out."""
+    return _CACHED.get(name)
+
+
+def split_prompt(prompt, instructions=INSTRUCTIONS):
+    """
+    (instruction, rest) of a prompt built by summarizer.summarize, else
+    (None, prompt). Prompts join the two with a blank line, which is not
+    part of either.
+    """
+    for instruction in instructions:
+        if prompt.startswith(instruction):
+            return instruction, prompt[len(instruction):].removeprefix("\n\n")
+    return None, prompt
+
+
+class GeminiCacheBackend:
+    """Creates and extends Gemini cached contents through the google-genai client."""
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            # Deferred: google-genai is only needed once a cache is created.
+            from google import genai
+
+            self._client = genai.Client()
+        return self._client
+
+    def create(self, model, instruction, ttl_seconds):
+        """(cache name, expiry as epoch seconds)."""
+        from google.genai import types
+
+        cache = self.client.caches.create(model=model, config=types.CreateCachedContentConfig(
+            display_name="summarizer-instructions", system_instruction=instruction, ttl=f"{int(ttl_seconds)}s",
+        ))
+        return cache.name, cache.expire_time.timestamp()
+
+    def extend(self, name, ttl_seconds):
+        """New expiry (epoch seconds) of cache name, ttl_seconds from now."""
+        from google.genai import types
+
+        cache = self.client.caches.update(name=name, config=types.UpdateCachedContentConfig(ttl=f"{int(ttl_seconds)}s"))
+        return cache.expire_time.timestamp()
+
+
+class ContextCache:
+    """Turns prompts into cache-friendly Gemini requests; see the section comment for the modes."""
+
+    def __init__(self, model, backend=None, mode="explicit", path=None, ttl_seconds=3600, refresh_seconds=300,
+                 min_tokens=1024, instructions=INSTRUCTIONS, clock=time.time):
+        self.model = model
+        self.backend = backend or GeminiCacheBackend()
+        self.mode = mode
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.refresh_seconds = refresh_seconds
+        self.min_tokens = min_tokens
+        self.instructions = instructions
+        self.clock = clock
+        self.created = 0
+        self.extended = 0
+        self.rejected = 0
+        self._entries = {}
+        self._failed = set()
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            if path != ":memory:":
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            # Workers in several processes share the cache names.
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    # ---------- cache names, shared through SQLite ----------
+    def _load(self, key):
+        if self._conn is None:
+            return None
+        row = self._conn.execute("SELECT name, expire_at FROM context_caches WHERE key = ?", (key,)).fetchone()
+        return {"name": row[0], "expire_at": row[1]} if row else None
+
+    def _save(self, key, entry):
+        if self._conn is None:
+            return
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO context_caches (key, name, expire_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET name = excluded.name, expire_at = excluded.expire_at",
+                (key, entry["name"], entry["expire_at"]),
+            )
+
+    def _key(self, instruction):
+        return f"{self.model}:{hashlib.sha256(instruction.encode('utf-8')).hexdigest()[:16]}"
+
+    def cache_name(self, instruction):
+        """Name of a live cache holding instruction, or None if none can be had."""
+        key = self._key(instruction)
+        with self._lock:
+            if key in self._failed:
+                return None
+            entry = self._entries.get(key)
+            now = self.clock()
+            if entry and entry["expire_at"] - now > self.refresh_seconds:
+                return entry["name"]
+            # Another run may have created or extended it since.
+            entry = self._load(key) or entry
+            if entry and entry["expire_at"] - now > self.refresh_seconds:
+                self._entries[key] = entry
+                return entry["name"]
+            try:
+                if entry and entry["expire_at"] > now:
+                    try:
+                        entry = {"name": entry["name"], "expire_at": self.backend.extend(entry["name"], self.ttl_seconds)}
+                        self.extended += 1
+                    except Exception:
+                        # Deleted or expired on Gemini's side: start a new one.
+                        entry = None
+                if not entry or entry["expire_at"] <= now:
+                    name, expire_at = self.backend.create(self.model, instruction, self.ttl_seconds)
+                    entry = {"name": name, "expire_at": expire_at}
+                    self.created += 1
+            except Exception:
+                # Caching only saves money; calls go out with the implicit form instead.
+                self._failed.add(key)
+                return None
+            self._entries[key] = entry
+            self._save(key, entry)
+            return entry["name"]
+
+    def reject(self, name):
+        """Stops using cache name: Gemini refused a call that referenced it."""
+        instruction = _CACHED.get(name)
+        if instruction is None:
+            return
+        with self._lock:
+            self._failed.add(self._key(instruction))
+            self.rejected += 1
+
+    # ---------- requests ----------
+    def request(self, prompt):
+        """(model input, ainvoke kwargs, text actually sent) for a prompt string."""
+        if self.mode == "off" or not isinstance(prompt, str):
+            return prompt, {}, prompt
+        instruction, rest = split_prompt(prompt, self.instructions)
+        if instruction is None:
+            return prompt, {}, prompt
+        from langchain_core.messages import HumanMessage, SystemMessage
+
+        if self.mode == "explicit" and estimate_tokens(instruction) >= self.min_tokens:
+            name = self.cache_name(instruction)
+            if name:
+                _CACHED[name] = instruction
+                return [HumanMessage(content=rest)], {"cached_content": name}, rest
+        return [SystemMessage(content=instruction), HumanMessage(content=rest)], {}, prompt
+
+    def stats(self):
+        return {"mode": self.mode, "created": self.created, "extended": self.extended, "rejected": self.rejected}
@@ -0,0 +1,216 @@
+import numpy as np
+
+# ===============================
+# 🧬 Near-Duplicate Detection
+# ===============================
+# Alerts, CI failures and order notices arrive in near-identical copies
+# that differ only in a run number or an order id. Before the LLM node,
+# emails are grouped into clusters of near-duplicates. Only one
+# representative per cluster is summarized, and its summary is fanned
+# out to the other members. Steps:
+# - words are runs of lowercase letters and digits. Numbers are kept:
+#   "Invoice 1200 ... $40" and "Invoice 9876 ... $98,000" must not share
+#   a summary, so emails only cluster when their numbers are identical.
+#   Only long opaque ids with a digit (tracking numbers, message ids,
+#   _ID_LENGTH characters or more) hash to one placeholder and never
+#   split a cluster;
+# - MinHash over word 3-shingles, with the whole batch hashed at once in
+#   NumPy from its UTF-8 bytes (uint32 multiply-xorshift permutations,
+#   min per email via np.minimum.reduceat);
+# - LSH banding: emails that agree on every row of any band become
+#   candidates;
+# - verification: candidate pairs below the similarity threshold
+#   (estimated Jaccard) are dropped, and an email joins a cluster only if
+#   it is that similar to the cluster's representative, so chains of
+#   pairwise matches cannot drift.
+SHINGLE = 3
+_MIX = np.uint32(0x9E3779B1)
+_MIX64 = np.uint64(0x9E3779B97F4A7C15)
+# Letters past this position do not change a word's hash.
+_WORD_PREFIX = 32
+_POWERS = np.cumprod(np.full(_WORD_PREFIX, 131, dtype=np.uint64), dtype=np.uint64)
+# Shingles hashed per step; bounds the (num_perm, shingles) work array.
+_CHUNK = 1 << 14
+# Tokens with a digit at least this long are opaque ids, not amounts.
+_ID_LENGTH = 8
+_ID_HASH = np.uint64(0x5DEECE66D)
+
+
+def _seeds(num_perm, seed):
+    rng = np.random.default_rng(seed)
+    xor = rng.integers(0, 2 ** 32, num_perm, dtype=np.uint32)
+    # Odd multipliers keep each permutation a bijection on uint32.
+    mult = rng.integers(0, 2 ** 32, num_perm, dtype=np.uint32) | np.uint32(1)
+    return xor, mult
+
+
+def word_hashes(texts):
+    """
+    (hashes, text index, numeric) for every word in the batch: a uint64
+    hash, the text it belongs to, and whether it is a number (a word with
+    a digit that is shorter than _ID_LENGTH). Texts are lowercased and
+    words are runs of letters and digits; longer words with a digit all
+    get the same placeholder hash. Hashed from the UTF-8 bytes of the
+    whole batch at once.
+    """
+    encoded = [text.lower().encode("utf-8") for text in texts]
+    data = np.frombuffer(b" ".join(encoded), dtype=np.uint8)
+    digit = (data >= 48) & (data <= 57)
+    char = ((data >= 97) & (data <= 122)) | (data >= 128) | digit
+    first = char & ~np.r_[False, char[:-1]]
+    positions = np.flatnonzero(char)
+    if not len(positions):
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool)
+    word = np.cumsum(first)[positions] - 1
+    starts = np.flatnonzero(first)
+    offset = np.minimum(positions - starts[word], _WORD_PREFIX - 1)
+    with np.errstate(over="ignore"):
+        hashes = np.add.reduceat(data[positions].astype(np.uint64) * _POWERS[offset], np.flatnonzero(first[positions]))
+    has_digit = np.bincount(word, weights=digit[positions], minlength=len(starts)) > 0
+    opaque = has_digit & (np.bincount(word, minlength=len(starts)) >= _ID_LENGTH)
+    hashes[opaque] = _ID_HASH
+    text_starts = np.cumsum([0] + [len(e) + 1 for e in encoded[:-1]])
+    return hashes, np.searchsorted(text_starts, starts, side="right") - 1, has_digit & ~opaque
+
+
+def number_keys(texts):
+    """
+    uint64 per text identifying the multiset of its numbers; texts without
+    numbers get 0. Emails with different keys never cluster.
+    """
+    hashes, doc, numeric = word_hashes(texts)
+    keys = np.zeros(len(texts), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        mixed = hashes[numeric] * _MIX64
+        mixed ^= mixed >> np.uint64(29)
+        np.add.at(keys, doc[numeric], mixed)
+    return keys
+
+
+def shingle_hashes(texts, k=SHINGLE):
+    """
+    uint32 hashes of the word k-shingles of every text, concatenated, and
+    per text the offset and count of its shingles (np.minimum.reduceat
+    layout). Each text is padded with k - 1 blank words, so any text with
+    a word has at least one shingle; texts without words have none.
+    """
+    words, doc, _ = word_hashes(texts)
+    counts = np.bincount(doc, minlength=len(texts)).astype(np.int64)
+    padded = np.zeros(len(words) + (k - 1) * len(texts), dtype=np.uint64)
+    padded[np.arange(len(words)) + (k - 1) * doc] = words
+    padded_doc = np.repeat(np.arange(len(texts)), counts + k - 1)
+    n = len(padded) - k + 1
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+    if n <= 0:
+        return np.zeros(0, dtype=np.uint32), offsets, counts
+    # A shingle is valid when its k words belong to the same text.
+    valid = padded_doc[:n] == padded_doc[k - 1:]
+    h = np.zeros(n, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for j in range(k):
+            h = (h ^ padded[j:j + n]) * _MIX64
+            h ^= h >> np.uint64(29)
+    h = h[valid]
+    return (h ^ (h >> np.uint64(32))).astype(np.uint32), offsets, counts
+
+
+def minhash(texts, num_perm=64, seed=1):
+    """(len(texts), num_perm) uint32 MinHash signatures; empty texts get all 0xFFFFFFFF."""
+    hashes, offsets, lengths = shingle_hashes(texts)
+    xor, mult = _seeds(num_perm, seed)
+    signatures = np.full((len(texts), num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+    docs = np.flatnonzero(lengths)
+    if not len(docs):
+        return signatures
+    # Chunk by whole texts so reduceat never splits one; permutations run
+    # along rows so each min is over contiguous memory.
+    ends = offsets[docs] + lengths[docs]
+    start = 0
+    while start < len(docs):
+        stop = int(np.searchsorted(ends, offsets[docs[start]] + _CHUNK, side="right"))
+        stop = max(stop, start + 1)
+        lo, hi = offsets[docs[start]], ends[stop - 1]
+        with np.errstate(over="ignore"):
+            permuted = (hashes[None, lo:hi] ^ xor[:, None]) * mult[:, None]
+            permuted ^= permuted >> np.uint32(16)
+        signatures[docs[start:stop]] = np.minimum.reduceat(permuted, offsets[docs[start:stop]] - lo, axis=1).T
+        start = stop
+    return signatures
+
+
+def _components(n, a, b):
+    """Connected-component label (smallest member index) per node for edges a-b."""
+    labels = np.arange(n)
+    while True:
+        before = labels.copy()
+        np.minimum.at(labels, a, labels[b])
+        np.minimum.at(labels, b, labels[a])
+        labels = labels[labels]
+        if np.array_equal(labels, before):
+            return labels
+
+
+def _similarity(signatures, a, b):
+    return (signatures[a] == signatures[b]).mean(axis=1)
+
+
+def clusters(signatures, bands=16, threshold=0.8, keys=None):
+    """
+    Representative index per email: the first email of its cluster, or
+    the email itself. Empty texts are never clustered, and with keys
+    (number_keys) neither are emails whose keys differ.
+    """
+    n, num_perm = signatures.shape
+    if n < 2:
+        return np.arange(n)
+    rows = num_perm // bands
+    empty = (signatures == np.iinfo(np.uint32).max).all(axis=1)
+    a, b = [], []
+    for band in range(bands):
+        # One uint64 key per band; a key collision only adds a candidate.
+        key = np.zeros(n, dtype=np.uint64) if keys is None else keys.copy()
+        with np.errstate(over="ignore"):
+            for column in signatures[:, band * rows:(band + 1) * rows].T:
+                key = (key ^ column) * np.uint64(0x9E3779B97F4A7C15)
+        order = np.argsort(key, kind="stable")
+        first = np.r_[True, key[order][1:] != key[order][:-1]]
+        # Link every email to the first email of its bucket.
+        leader = order[np.flatnonzero(first)[np.cumsum(first) - 1]]
+        linked = (leader != order) & ~empty[order]
+        a.append(order[linked])
+        b.append(leader[linked])
+    # The same pair usually shares several bands; verify it once.
+    pairs = np.unique(np.concatenate(a).astype(np.int64) * n + np.concatenate(b))
+    a, b = pairs // n, pairs % n
+    keep = _similarity(signatures, a, b) >= threshold
+    if keys is not None:
+        # Band keys only rarely collide across keys; drop those pairs too.
+        keep &= keys[a] == keys[b]
+    a, b = a[keep], b[keep]
+
+    # Members too far from their component's first email (a chain of
+    # matches) are clustered again among themselves.
+    representative = np.arange(n)
+    pending = np.ones(n, dtype=bool)
+    while len(a):
+        labels = _components(n, a, b)
+        close = pending & (_similarity(signatures, np.arange(n), labels) >= threshold)
+        representative[close] = labels[close]
+        pending &= ~close
+        still = pending[a] & pending[b]
+        if still.all():
+            break
+        a, b = a[still], b[still]
+    return representative
+
+
+def near_duplicates(texts, num_perm=64, bands=16, threshold=0.8):
+    """
+    {representative index: [member indexes, representative first]} for
+    every cluster of two or more near-duplicate texts.
+    """
+    representative = clusters(minhash(texts, num_perm), bands, threshold, number_keys(texts))
+    groups = {}
+    for i in np.flatnonzero(representative != np.arange(len(texts))):
+        groups.setdefault(int(representative[i]), [int(representative[i])]).append(int(i))
+    return groups
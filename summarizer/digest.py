@@ -0,0 +1,128 @@
+import base64
+import random
+import time
+from email.mime.text import MIMEText
+from email.utils import getaddresses
+from string import Template
+
+from googleapiclient.http import BatchHttpRequest
+
+from summarizer import metrics
+from summarizer.ratelimit import GMAIL_UNITS
+
+# ===============================
+# 📤 Digest Sending
+# ===============================
+# A digest goes to many recipients at once. The summary list is rendered
+# once. Each recipient only gets a string.Template substitution ($name,
+# $email, $count, $digest) and its own MIME envelope. Sends go out as
+# Gmail batch requests over the caller's cached client. Each send costs
+# 100 quota units, so with a limiter a batch is never larger than the
+# units bucket can cover in one go. Recipients that get a 429 or 5xx are
+# retried in a later batch with backoff. Everything else is reported per
+# recipient.
+DEFAULT_SUBJECT = "📧 Your Summarized Emails"
+DEFAULT_TEMPLATE = "Hi $name,\n\n$digest"
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def render_digest(summaries) -> str:
+    """The digest body shared by every recipient."""
+    body_lines = ["📬 Here are your summarized emails:\n"]
+    for i, s in enumerate(summaries, start=1):
+        s_lower = {k.lower(): v for k, v in s.items()}
+        body_lines.append(f"📨 Email {i}")
+        body_lines.append(f"Summary: {s_lower.get('summary', 'N/A')}")
+        body_lines.append(f"Priority: {s_lower.get('priority', 'Unknown')}\n")
+    return "\n".join(body_lines)
+
+
+def recipient_name(recipient) -> str:
+    """ "Ada Lovelace <ada@x.org>" -> "Ada Lovelace", "ada.l@x.org" -> "Ada L"."""
+    name, address = getaddresses([recipient])[0]
+    if name:
+        return name
+    return address.split("@", 1)[0].replace(".", " ").replace("_", " ").title() or recipient
+
+
+def personalize(template, recipient, digest, count) -> str:
+    _, address = getaddresses([recipient])[0]
+    return Template(template).safe_substitute(name=recipient_name(recipient), email=address, count=count, digest=digest)
+
+
+def raw_message(to, subject, body) -> str:
+    message = MIMEText(body, "plain", "utf-8")
+    message["to"] = to
+    message["subject"] = subject
+    return base64.urlsafe_b64encode(message.as_bytes()).decode()
+
+
+def _status(error):
+    return getattr(error, "status_code", None) or getattr(getattr(error, "resp", None), "status", None)
+
+
+def send_digest(service, recipients, summaries, template=DEFAULT_TEMPLATE, subject=DEFAULT_SUBJECT,
+                batch_size=50, retries=2, limiter=None, batch_uri=None, user_id="me", digest=None, count=None):
+    """
+    Sends the digest of summaries to every recipient (duplicates once).
+    digest and count override the rendered $digest text and $count (the
+    scheduler passes a pre-rendered daily rollup).
+
+    Returns a report dict with sent/failed counts, batches and retries,
+    and "results": one {"recipient", "status", "id", "error", "attempts"}
+    per recipient, in the given order. status is "sent" or "failed".
+    """
+    digest = render_digest(summaries) if digest is None else digest
+    count = len(summaries) if count is None else count
+    recipients = list(dict.fromkeys(recipients))
+    raws = {r: raw_message(r, subject, personalize(template, r, digest, count)) for r in recipients}
+    results = {r: {"recipient": r, "status": "failed", "id": None, "error": None, "attempts": 0} for r in recipients}
+    report = {"sent": 0, "failed": 0, "batches": 0, "retries": 0}
+
+    send_units = GMAIL_UNITS["send"]
+    if limiter and "units" in limiter.buckets:
+        batch_size = min(batch_size, max(1, int(limiter.buckets["units"].capacity // send_units)))
+    batch_size = max(1, min(batch_size, 100))
+
+    index = {r: str(i) for i, r in enumerate(recipients)}
+    pending = recipients
+    for attempt in range(retries + 1):
+        if not pending:
+            break
+        if attempt:
+            report["retries"] += len(pending)
+            metrics.record_retry("gmail", len(pending))
+            time.sleep(limiter.backoff(attempt - 1) if limiter else random.uniform(0, 2 ** (attempt - 1)))
+        retry = []
+
+        def callback(request_id, response, exception):
+            result = results[recipients[int(request_id)]]
+            result["attempts"] += 1
+            if exception is None:
+                result.update(status="sent", id=response.get("id"), error=None)
+            else:
+                result["error"] = str(exception)
+                if _status(exception) in RETRYABLE_STATUS:
+                    retry.append(result["recipient"])
+
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            if batch_uri:
+                batch = BatchHttpRequest(callback=callback, batch_uri=batch_uri)
+            else:
+                batch = service.new_batch_http_request(callback=callback)
+            if limiter:
+                limiter.acquire(units=send_units * len(chunk))
+            for recipient in chunk:
+                request = service.users().messages().send(userId=user_id, body={"raw": raws[recipient]})
+                batch.add(request, request_id=index[recipient])
+            with metrics.call("gmail", "messages.batchSend") as call:
+                call.sent = sum(len(raws[r]) for r in chunk)
+                batch.execute()
+            report["batches"] += 1
+        pending = retry
+
+    report["results"] = [results[r] for r in recipients]
+    report["sent"] = sum(1 for r in report["results"] if r["status"] == "sent")
+    report["failed"] = len(recipients) - report["sent"]
+    return report
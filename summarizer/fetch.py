@@ -0,0 +1,126 @@
+import time
+
+from googleapiclient.http import BatchHttpRequest
+
+from summarizer import metrics
+from summarizer.ratelimit import GMAIL_UNITS
+
+# ===============================
+# 📥 Gmail Fetch Engine
+# ===============================
+# Gmail accepts up to 100 calls per batch, but recommends staying at or
+# below 50 to avoid per-user rate limiting inside a single batch.
+GMAIL_BATCH_LIMIT = 100
+LIST_PAGE_LIMIT = 500
+
+# The last three feed the local triage rules (summarizer.triage).
+METADATA_HEADERS = ["From", "To", "Subject", "Date", "List-Unsubscribe", "Precedence", "Auto-Submitted"]
+MESSAGE_FIELDS = "id,threadId,labelIds,snippet,internalDate,payload/headers"
+# format=full carries inline parts only; attachments come as attachmentIds.
+FULL_MESSAGE_FIELDS = "id,threadId,labelIds,snippet,internalDate,sizeEstimate,payload"
+
+
+def list_message_ids(service, max_results=5, query=None, user_id="me", limiter=None, label_id=None):
+    """
+    Lists the newest message ids (only those labelled label_id, if given),
+    following nextPageToken until max_results ids have been collected or
+    the mailbox is exhausted.
+    """
+    ids, page_token = [], None
+    while len(ids) < max_results:
+        if limiter:
+            limiter.acquire(units=GMAIL_UNITS["list"])
+        with metrics.call("gmail", "messages.list") as call:
+            results = service.users().messages().list(
+                userId=user_id,
+                maxResults=min(LIST_PAGE_LIMIT, max_results - len(ids)),
+                pageToken=page_token,
+                q=query,
+                labelIds=label_id,
+                fields="messages/id,nextPageToken",
+            ).execute()
+            call.received = metrics.payload_size(results)
+        ids.extend(m["id"] for m in results.get("messages", []))
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            break
+    return ids[:max_results]
+
+
+def _get_request(service, message_id, user_id, fmt="metadata"):
+    if fmt == "full":
+        return service.users().messages().get(userId=user_id, id=message_id, format="full", fields=FULL_MESSAGE_FIELDS)
+    return service.users().messages().get(
+        userId=user_id,
+        id=message_id,
+        format="metadata",
+        metadataHeaders=METADATA_HEADERS,
+        fields=MESSAGE_FIELDS,
+    )
+
+
+def fetch_messages(service, message_ids, batch_size=50, batch_uri=None, user_id="me", retries=2, fmt="metadata", limiter=None,
+                   transform=None):
+    """
+    Fetches message metadata (snippet + headers) for message_ids using
+    Gmail batch requests of batch_size calls each. fmt="full" also
+    returns the inline body parts (see summarizer.body).
+
+    Results come back in the same order as message_ids. Calls that fail
+    inside a batch (e.g. a 429 for one item) are retried in a follow-up
+    batch up to `retries` times; ids that still fail (or no longer exist)
+    are left out.
+    batch_uri overrides the service's batch endpoint (used by the local
+    fake Gmail server in benchmarks/). With a limiter (summarizer.ratelimit)
+    each batch first waits for its quota units, and retry rounds back off
+    with jitter instead of re-sending straight away. transform, if given,
+    is applied to each message as its batch arrives and only its result
+    is kept, so format=full payloads never pile up across batches.
+    """
+    batch_size = max(1, min(batch_size, GMAIL_BATCH_LIMIT))
+    found = {}
+    pending = list(dict.fromkeys(message_ids))
+
+    for attempt in range(retries + 1):
+        if not pending:
+            break
+        if attempt:
+            metrics.record_retry("gmail", len(pending))
+            if limiter:
+                time.sleep(limiter.backoff(attempt - 1))
+        failed, received = [], []
+
+        def callback(request_id, response, exception):
+            if exception is not None:
+                # A 404 means the message was deleted since it was listed.
+                if getattr(exception, "status_code", None) != 404:
+                    failed.append(request_id)
+            else:
+                received.append(metrics.payload_size(response))
+                found[request_id] = transform(response) if transform else response
+
+        for start in range(0, len(pending), batch_size):
+            if batch_uri:
+                batch = BatchHttpRequest(callback=callback, batch_uri=batch_uri)
+            else:
+                batch = service.new_batch_http_request(callback=callback)
+            chunk = pending[start:start + batch_size]
+            if limiter:
+                limiter.acquire(units=GMAIL_UNITS["get"] * len(chunk))
+            for message_id in chunk:
+                batch.add(_get_request(service, message_id, user_id, fmt), request_id=message_id)
+            with metrics.call("gmail", "messages.batchGet") as call:
+                batch.execute()
+                call.received = sum(received)
+            received.clear()
+        pending = failed
+
+    return [found[i] for i in message_ids if i in found]
+
+
+def header_value(message, name, default=""):
+    """Returns a header (e.g. "From", "Subject") from a metadata message."""
+    for header in message.get("payload", {}).get("headers", []):
+        if header.get("name", "").lower() == name.lower():
+            return header.get("value", default)
+    return default
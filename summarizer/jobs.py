@@ -0,0 +1,292 @@
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+
+from summarizer import config
+
+# ===============================
+# 🏭 Multi-User Job Queue & Worker Pool
+# ===============================
+# Mailboxes are processed as jobs in a SQLite queue shared by a pool of
+# worker processes. Each process compiles the pipeline once and runs
+# WORKER_SLOTS jobs at a time on an asyncio loop; a job's blocking graph
+# run goes to a thread so the loop stays free to heartbeat its lease.
+#
+# - Crash recovery: a claimed job carries a lease that its worker keeps
+#   extending. If the process dies the lease runs out and another worker
+#   picks the job up again. Re-running is safe because the sync historyId
+#   is only committed after a run is saved, and the summary cache turns
+#   already-summarized emails into hits.
+# - Isolation: a job only carries the path of its user's token file;
+#   clients are built per token file, and every tenant has its own sync
+#   state file, so no job can see or advance another user's mailbox.
+# - Fairness: at most one job per user runs at a time, a user has at most
+#   one queued job, and the Gemini quota is split equally between the jobs
+#   running in all workers, so a 50k-message mailbox cannot starve small
+#   ones. A slot rescales its job's slice on claim and then every few
+#   seconds as other jobs start and finish, so a lone job gets the whole
+#   quota rather than a fixed 1 / (workers * slots).
+# - A heartbeat that finds the job handed to another worker (the lease ran
+#   out) cancels the run before its next node, so it never saves or
+#   commits a historyId.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs(user, status);
+"""
+
+
+class JobQueue:
+    """
+    Jobs are dicts with id, user, payload (token_path, max_results, query,
+    sheets_cred), status (queued / running / done / failed) and attempts.
+    Safe to share between processes: every transition is one
+    BEGIN IMMEDIATE transaction.
+    """
+
+    def __init__(self, path=".cache/jobs.sqlite3", lease_seconds=300.0, max_attempts=3):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def _transaction(self, fn):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn, time.time())
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def enqueue(self, user, token_path, **options):
+        """Queues a run for user and returns its id (the existing one if already queued)."""
+        payload = json.dumps({"token_path": token_path, **options})
+
+        def insert(conn, now):
+            row = conn.execute("SELECT id FROM jobs WHERE user = ? AND status = 'queued'", (user,)).fetchone()
+            if row:
+                return row["id"]
+            return conn.execute(
+                "INSERT INTO jobs (user, payload, created_at, updated_at) VALUES (?, ?, ?, ?)", (user, payload, now, now)
+            ).lastrowid
+
+        return self._transaction(insert)
+
+    def claim(self, worker):
+        """Leases the oldest queued job whose user has no running job, or returns None."""
+        def take(conn, now):
+            # Leases left behind by dead workers: retry, or give up after max_attempts.
+            conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                "error = 'lease expired', worker = NULL, updated_at = ? WHERE status = 'running' AND lease_until < ?",
+                (self.max_attempts, now, now),
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs j WHERE status = 'queued' AND NOT EXISTS "
+                "(SELECT 1 FROM jobs r WHERE r.user = j.user AND r.status = 'running') ORDER BY created_at, id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, lease_until = ?, updated_at = ? WHERE id = ?",
+                (worker, now + self.lease_seconds, now, row["id"]),
+            )
+            job = dict(row)
+            job["payload"] = json.loads(job["payload"])
+            job["attempts"] += 1
+            return job
+
+        return self._transaction(take)
+
+    def heartbeat(self, job_id, worker):
+        """Extends the lease; False if the job was meanwhile handed to someone else."""
+        def extend(conn, now):
+            return conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (now + self.lease_seconds, now, job_id, worker),
+            ).rowcount == 1
+
+        return self._transaction(extend)
+
+    def complete(self, job_id, worker, result):
+        self._transaction(lambda conn, now: conn.execute(
+            "UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_until = NULL, updated_at = ? WHERE id = ? AND worker = ?",
+            (json.dumps(result), now, job_id, worker),
+        ))
+
+    def fail(self, job_id, worker, error):
+        """Requeues the job, or marks it failed once max_attempts is reached."""
+        self._transaction(lambda conn, now: conn.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, error = ?, worker = NULL, "
+            "lease_until = NULL, updated_at = ? WHERE id = ? AND worker = ?",
+            (self.max_attempts, error, now, job_id, worker),
+        ))
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: n for status, n in rows}
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def close(self):
+        self._conn.close()
+
+
+def queue_from_config():
+    return JobQueue(config.JOB_QUEUE_PATH, lease_seconds=config.JOB_LEASE_SECONDS, max_attempts=config.JOB_MAX_ATTEMPTS)
+
+
+def default_model():
+    from summarizer.clients import gemini_model
+
+    return gemini_model()
+
+
+def default_gmail(payload):
+    from summarizer.clients import GMAIL_READONLY, gmail_service
+
+    return gmail_service(token_path=payload["token_path"], scopes=GMAIL_READONLY)
+
+
+def tenant_sync_store(user):
+    from summarizer.sync import SyncStateStore
+
+    name = hashlib.sha256(user.encode("utf-8")).hexdigest()[:16]
+    return SyncStateStore(os.path.join(config.JOB_STATE_DIR, f"{name}.json"))
+
+
+def run_job(graph, job, gmail_factory, limiter, cancel=None):
+    """
+    Runs the pipeline for one job (blocking) and returns its result dict.
+    Setting cancel (a threading.Event) stops it before its next node.
+    """
+    from summarizer.pipeline import open_sheet, run_config
+
+    payload = job["payload"]
+    started = time.perf_counter()
+    settings = run_config(
+        gmail=lambda: gmail_factory(payload),
+        sheet=(lambda: open_sheet(payload["sheets_cred"])) if payload.get("sheets_cred") else None,
+        user=job["user"],
+        max_results=payload.get("max_results"),
+        query=payload.get("query"),
+        concurrency=payload.get("concurrency"),
+        gemini_limiter=limiter,
+        sync_store=tenant_sync_store(job["user"]),
+        cancel=cancel,
+    )
+    state = graph.invoke({}, settings)
+    return {
+        "emails": len(state.get("optimized_emails", [])),
+        "run_id": state.get("run_id"),
+        "seconds": round(time.perf_counter() - started, 3),
+        "report": state.get("report"),
+    }
+
+
+def _active_share(queue):
+    """This job's slice of the Gemini quota: one over the jobs running in every worker."""
+    return 1.0 / max(1, queue.counts().get("running", 0))
+
+
+async def _serve(queue, graph, name, slots, gmail_factory, drain, poll=0.5, rescale=5.0):
+    from summarizer.ratelimit import gemini_limiter
+
+    async def slot(n):
+        worker = f"{name}/{n}"
+        limiter = gemini_limiter()
+        while True:
+            job = queue.claim(worker)
+            if job is None:
+                counts = queue.counts()
+                if drain and not counts.get("running") and not counts.get("queued"):
+                    return
+                await asyncio.sleep(poll)
+                continue
+            limiter.set_share(_active_share(queue))
+            cancel = threading.Event()
+            task = asyncio.ensure_future(asyncio.to_thread(run_job, graph, job, gmail_factory, limiter, cancel))
+            next_heartbeat = time.monotonic() + queue.lease_seconds / 3
+            while not task.done():
+                await asyncio.wait({task}, timeout=min(rescale, queue.lease_seconds / 3))
+                if task.done():
+                    break
+                limiter.set_share(_active_share(queue))
+                if not cancel.is_set() and time.monotonic() >= next_heartbeat:
+                    next_heartbeat = time.monotonic() + queue.lease_seconds / 3
+                    if not queue.heartbeat(job["id"], worker):
+                        # The lease ran out and another worker owns the job now.
+                        cancel.set()
+            if cancel.is_set():
+                task.exception()
+                continue
+            try:
+                queue.complete(job["id"], worker, task.result())
+            except Exception as e:
+                queue.fail(job["id"], worker, f"{type(e).__name__}: {e}")
+
+    await asyncio.gather(*(slot(n) for n in range(slots)))
+
+
+def worker_main(name, slots, model_factory=default_model, gmail_factory=default_gmail, drain=False):
+    """Entry point of one worker process: compile the pipeline once, then serve jobs."""
+    from summarizer.pipeline import build_pipeline, cache_from_config, store_from_config, thread_store_from_config
+    from summarizer.scheduler import digests_from_config
+    from summarizer.search import search_from_config
+
+    queue = queue_from_config()
+    graph = build_pipeline(
+        model_factory(),
+        summary_cache=cache_from_config(),
+        summary_store=store_from_config(),
+        thread_store=thread_store_from_config(),
+        digest_store=digests_from_config(),
+        search_index=search_from_config(),
+    )
+    asyncio.run(_serve(queue, graph, name, slots, gmail_factory, drain))
+
+
+def start_pool(workers=4, slots=4, model_factory=default_model, gmail_factory=default_gmail, drain=False):
+    """
+    Starts `workers` processes with `slots` concurrent jobs each and
+    returns them. Running jobs share the Gemini quota equally, however
+    many there are. Factories must be importable module-level functions.
+    """
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for i in range(workers):
+        process = context.Process(
+            target=worker_main, args=(f"w{i}", slots, model_factory, gmail_factory, drain), daemon=True,
+        )
+        process.start()
+        processes.append(process)
+    return processes
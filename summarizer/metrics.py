@@ -0,0 +1,327 @@
+import bisect
+import contextvars
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+# ===============================
+# 📈 Instrumentation
+# ===============================
+# Every pipeline node and every external call (Gmail, Gemini, Sheets) is
+# timed here. Two sinks are fed at once:
+# - `registry`: process-wide counters and latency histograms, exported in
+#   Prometheus text format (to_prometheus(), or a textfile for
+#   node_exporter's textfile collector after each run);
+# - the RunReport of the run in progress, found through a context variable
+#   that each node sets while it runs. asyncio tasks and asyncio.to_thread
+#   inherit it, so concurrent runs (the worker pool) never mix their numbers.
+# Recording is a dict update under a lock, cheap enough to stay always on.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRICS = {
+    "summarizer_node_seconds": ("histogram", "Wall time of each pipeline node."),
+    "summarizer_api_call_seconds": ("histogram", "Latency of external API calls."),
+    "summarizer_api_calls_total": ("counter", "External API calls by outcome."),
+    "summarizer_api_bytes_total": ("counter", "JSON payload bytes sent to and received from external APIs."),
+    "summarizer_api_retries_total": ("counter", "Calls retried after a throttle or transient error."),
+    "summarizer_rate_limit_wait_seconds_total": ("counter", "Seconds calls waited for client-side rate limits, summed over concurrent calls."),
+    "summarizer_gemini_tokens_total": ("counter", "Gemini tokens by kind (usage metadata, else estimated)."),
+    "summarizer_cache_lookups_total": ("counter", "Summary cache lookups by result."),
+    "summarizer_dedup_skipped_total": ("counter", "Emails that reused a near-duplicate's summary instead of a Gemini call."),
+    "summarizer_runs_total": ("counter", "Completed pipeline runs."),
+}
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class MetricsRegistry:
+    """Process-wide counters and histograms keyed by metric name and labels."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # Per-bucket counts (last one is +Inf), sum, count.
+                histogram = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][bisect.bisect_left(self.buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def value(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, _labels(labels)), 0)
+
+    def to_prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (list(h[0]), h[1], h[2])) for key, h in self._histograms.items())
+        lines, described = [], set()
+
+        def describe(name):
+            if name not in described:
+                kind, text = METRICS.get(name, ("untyped", name))
+                lines.extend([f"# HELP {name} {text}", f"# TYPE {name} {kind}"])
+                described.add(name)
+
+        for (name, labels), (counts, total, count) in histograms:
+            describe(name)
+            cumulative = 0
+            for bound, n in zip([*self.buckets, "+Inf"], counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        for (name, labels), value in counters:
+            describe(name)
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+registry = MetricsRegistry()
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+class RunReport:
+    """
+    One run's breakdown: seconds per node, per-API calls, errors, retries,
+    latencies and bytes, Gemini tokens and summary cache hits.
+    """
+
+    def __init__(self, user="me"):
+        self.user = user
+        self.started_at = time.time()
+        self.nodes = {}
+        self.apis = {}
+        self.tokens = {"prompt": 0, "completion": 0, "cached": 0}
+        self.cache = {"hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    def _api(self, api):
+        if api not in self.apis:
+            self.apis[api] = {
+                "calls": 0, "errors": 0, "retries": 0, "waited": 0.0, "bytes_sent": 0, "bytes_received": 0, "latencies": [],
+            }
+        return self.apis[api]
+
+    def to_dict(self):
+        with self._lock:
+            apis = {}
+            for api, stats in self.apis.items():
+                latencies = stats["latencies"]
+                apis[api] = {
+                    **{k: v for k, v in stats.items() if k != "latencies"},
+                    "waited": round(stats["waited"], 4),
+                    "seconds": round(sum(latencies), 4),
+                    "p50": round(_percentile(latencies, 0.5), 4),
+                    "p95": round(_percentile(latencies, 0.95), 4),
+                    "max": round(max(latencies, default=0.0), 4),
+                }
+            return {
+                "user": self.user,
+                "started_at": self.started_at,
+                "seconds": round(sum(self.nodes.values()), 4),
+                "nodes": {name: round(s, 4) for name, s in self.nodes.items()},
+                "apis": apis,
+                "tokens": dict(self.tokens),
+                "cache": dict(self.cache),
+            }
+
+
+_current = contextvars.ContextVar("summarizer_run_report", default=None)
+
+
+def current_report():
+    return _current.get()
+
+
+class _Call:
+    __slots__ = ("sent", "received")
+
+    def __init__(self):
+        self.sent = 0
+        self.received = 0
+
+
+def payload_size(obj):
+    """Bytes of obj as compact JSON, the size of an API request or response body."""
+    if isinstance(obj, str):
+        return len(obj.encode("utf-8"))
+    return len(json.dumps(obj, separators=(",", ":"), default=str))
+
+
+@contextmanager
+def call(api, method):
+    """
+    Times one external call: `with call("gmail", "list") as c: ...`.
+    Set c.sent / c.received to the payload sizes; an exception counts the
+    call as an error and is re-raised.
+    """
+    c = _Call()
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        yield c
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        registry.observe("summarizer_api_call_seconds", seconds, api=api, method=method)
+        registry.inc("summarizer_api_calls_total", api=api, method=method, status=status)
+        if c.sent:
+            registry.inc("summarizer_api_bytes_total", c.sent, api=api, direction="sent")
+        if c.received:
+            registry.inc("summarizer_api_bytes_total", c.received, api=api, direction="received")
+        report = _current.get()
+        if report is not None:
+            with report._lock:
+                stats = report._api(api)
+                stats["calls"] += 1
+                stats["errors"] += status == "error"
+                stats["bytes_sent"] += c.sent
+                stats["bytes_received"] += c.received
+                stats["latencies"].append(seconds)
+
+
+def record_retry(api, n=1):
+    registry.inc("summarizer_api_retries_total", n, api=api)
+    report = _current.get()
+    if report is not None:
+        with report._lock:
+            report._api(api)["retries"] += n
+
+
+def record_wait(api, seconds):
+    registry.inc("summarizer_rate_limit_wait_seconds_total", seconds, api=api)
+    report = _current.get()
+    if report is not None:
+        with report._lock:
+            report._api(api)["waited"] += seconds
+
+
+def record_tokens(prompt, completion, cached=0):
+    """cached counts the prompt tokens served from a Gemini context cache."""
+    registry.inc("summarizer_gemini_tokens_total", prompt, kind="prompt")
+    registry.inc("summarizer_gemini_tokens_total", completion, kind="completion")
+    registry.inc("summarizer_gemini_tokens_total", cached, kind="cached")
+    report = _current.get()
+    if report is not None:
+        with report._lock:
+            report.tokens["prompt"] += prompt
+            report.tokens["completion"] += completion
+            report.tokens["cached"] += cached
+
+
+def record_cache(hits, misses):
+    registry.inc("summarizer_cache_lookups_total", hits, result="hit")
+    registry.inc("summarizer_cache_lookups_total", misses, result="miss")
+    report = _current.get()
+    if report is not None:
+        with report._lock:
+            report.cache["hits"] += hits
+            report.cache["misses"] += misses
+
+
+@contextmanager
+def node(name, report=None):
+    """Times a pipeline node and makes `report` current while it runs."""
+    token = _current.set(report) if report is not None else None
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        registry.observe("summarizer_node_seconds", seconds, node=name)
+        if report is not None:
+            with report._lock:
+                report.nodes[name] = report.nodes.get(name, 0.0) + seconds
+        if token is not None:
+            _current.reset(token)
+
+
+def _write(path, text):
+    """Atomically replaces path; each call has its own temp file, so concurrent runs never share one."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def finish_run(report, report_path=None, prometheus_path=None):
+    """
+    Counts the run and writes its JSON report and the process's Prometheus
+    textfile (either path may be empty to skip it; "{pid}" in
+    prometheus_path gives every worker process its own file). Returns the
+    report as a dict. Write errors are logged, never raised: this runs after
+    the run was saved, so it must not fail (and re-queue) a finished run.
+    """
+    registry.inc("summarizer_runs_total")
+    data = report.to_dict()
+    if report_path:
+        try:
+            _write(report_path, json.dumps(data, indent=2))
+        except Exception:
+            log.exception("Could not write the run report to %s", report_path)
+    if prometheus_path:
+        path = prometheus_path.format(pid=os.getpid())
+        try:
+            _write(path, registry.to_prometheus())
+        except Exception:
+            log.exception("Could not write the Prometheus textfile %s", path)
+    return data
+
+
+def load_report(path):
+    """The last saved run report, or None."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,371 @@
+from typing import List, TypedDict
+
+from langgraph.config import get_config, get_stream_writer
+from langgraph.graph import END, START, StateGraph
+
+from summarizer import config, metrics
+from summarizer.body import extract_body, strip_body
+from summarizer.cache import SummaryCache
+from summarizer.clients import sheets_client
+from summarizer.context_cache import ContextCache
+from summarizer.dedup import near_duplicates
+from summarizer.fetch import fetch_messages, header_value, list_message_ids
+from summarizer.ratelimit import limiter_for
+from summarizer.sheets import append_rows_chunked
+from summarizer.store import SummaryStore
+from summarizer.summarize import PROMPT_VERSION, parse_summaries, structured_model, summarize
+from summarizer.sync import sync_message_ids
+from summarizer.threads import ThreadStore, group_by_thread, summarize_threads
+from summarizer.triage import model_from_path, triage
+
+# ===============================
+# 🚀 Fetch → Summarize → Save Pipeline
+# ===============================
+# Shared by the Streamlit apps and the headless CLI (python -m summarizer).
+# The graph is built once around a model, cache and sync store; everything
+# that differs per run or per user (Gmail client, sheet, limits) is passed
+# in `configurable`, see run_config().
+
+
+class EmailState(TypedDict, total=False):
+    messages: List[dict]
+    emails: List[str]
+    # extracted bodies (BODY_MODE=full), set by FetchEmails as batches arrive
+    bodies: List[str]
+    optimized_emails: List[str]
+    # {"summary", "priority"} per email, parsed once in OptimizeEmails
+    records: List[dict]
+    history_id: str
+    run_id: int
+    sheets_report: dict
+    thread_summaries: dict
+    triaged: dict
+    # {representative index: member indexes} of near-duplicate clusters
+    duplicates: dict
+    # metrics.RunReport.to_dict() of this run, set after SaveToSheets
+    report: dict
+
+
+class RunCancelled(Exception):
+    """Raised before the next node of a run whose cancel event was set."""
+
+
+def run_config(gmail, sheet=None, user="me", max_results=None, query=None, concurrency=None,
+               gemini_limiter=None, sync_store=None, cancel=None):
+    """
+    Per-run settings for app_graph.invoke/stream. gmail and sheet are
+    zero-argument callables returning a Gmail service and a gspread
+    worksheet (or None to skip Sheets); unset limits fall back to config.
+    gemini_limiter and sync_store replace the shared Gemini limiter and
+    the graph's sync store for this run (the worker pool gives every job
+    its own quota share and per-tenant sync state). cancel is a
+    threading.Event: once set, the run stops with RunCancelled before its
+    next node, so nothing more is saved or committed. Node timings and API
+    calls are collected in a fresh metrics.RunReport.
+    """
+    return {"configurable": {
+        "report": metrics.RunReport(user),
+        "gemini_limiter": gemini_limiter,
+        "sync_store": sync_store,
+        "gmail": gmail,
+        "sheet": sheet,
+        "user": user,
+        "max_results": max_results or config.GMAIL_MAX_RESULTS,
+        "query": query,
+        "concurrency": concurrency or config.SUMMARY_CONCURRENCY,
+        "cancel": cancel,
+    }}
+
+
+def open_sheet(keyfile, title="Email Summaries"):
+    """First worksheet of the summaries spreadsheet, or None if unavailable."""
+    try:
+        return sheets_client(keyfile).open(title).sheet1
+    except Exception:
+        return None
+
+
+def cache_from_config():
+    """The summary cache configured in .env, or None when disabled."""
+    if not config.SUMMARY_CACHE_PATH:
+        return None
+    return SummaryCache(
+        config.SUMMARY_CACHE_PATH,
+        max_entries=config.SUMMARY_CACHE_MAX_ENTRIES,
+        ttl_seconds=config.SUMMARY_CACHE_TTL_DAYS * 86400,
+    )
+
+
+def context_cache_from_config():
+    """How prompts reuse the shared instructions (PROMPT_CACHE), or None when off."""
+    if config.PROMPT_CACHE == "off":
+        return None
+    # Replays answer from a cassette, so no cache is created on Gemini; cassette
+    # keys do not depend on the mode the recording used (summarizer.replay).
+    mode = "implicit" if config.REPLAY_MODE == "replay" else config.PROMPT_CACHE
+    return ContextCache(
+        config.GEMINI_MODEL, mode=mode, path=config.PROMPT_CACHE_STATE_PATH, ttl_seconds=config.PROMPT_CACHE_TTL_SECONDS,
+        refresh_seconds=config.PROMPT_CACHE_REFRESH_SECONDS, min_tokens=config.PROMPT_CACHE_MIN_TOKENS,
+    )
+
+
+def store_from_config():
+    return SummaryStore(config.SUMMARY_STORE_PATH)
+
+
+def thread_store_from_config():
+    """The running thread summaries, or None unless SUMMARIZE_BY=thread."""
+    if config.SUMMARIZE_BY != "thread":
+        return None
+    return ThreadStore(config.THREAD_STORE_PATH)
+
+
+def _options():
+    return get_config().get("configurable", {})
+
+
+def _gemini_limiter(opts):
+    return opts.get("gemini_limiter") or limiter_for("gemini")
+
+
+def _extract(msg):
+    """(message without its body parts, extracted body) of a format=full message."""
+    body = extract_body(msg, max_tokens=config.BODY_MAX_TOKENS, max_part_bytes=config.BODY_MAX_PART_BYTES)
+    return strip_body(msg), body
+
+
+def _instrumented(name, node, final=False):
+    """Times node into the run's report; the final node also finishes the run."""
+    def run(state: EmailState):
+        opts = _options()
+        cancel = opts.get("cancel")
+        if cancel is not None and cancel.is_set():
+            raise RunCancelled(name)
+        report = opts.get("report")
+        with metrics.node(name, report):
+            state = node(state)
+        if final and report is not None:
+            state["report"] = metrics.finish_run(report, config.METRICS_REPORT_PATH, config.METRICS_PROMETHEUS_PATH)
+        return state
+
+    return run
+
+
+def build_pipeline(model, summary_cache=None, sync_store=None, summary_store=None, thread_store=None, digest_store=None,
+                   search_index=None, context_cache=None):
+    """
+    Compiles the FetchEmails → ExtractBodies → Triage → OptimizeEmails → SaveToSheets graph.
+    context_cache defaults to the one configured by PROMPT_CACHE.
+    """
+    context_cache = context_cache or context_cache_from_config()
+    triage_model = model_from_path(config.TRIAGE_MODEL_PATH) if config.TRIAGE_MODE != "off" else None
+    # Packed prompts ask for their own JSON array, so they keep the plain model.
+    use_schema = config.SUMMARY_OUTPUT == "json" and config.SUMMARY_MODE != "packed"
+    summary_model = structured_model(model) if use_schema else model
+
+    def fetch_emails_node(state: EmailState):
+        opts = _options()
+        service = opts["gmail"]()
+        # Gmail quota units are per user.
+        limiter = limiter_for("gmail", opts.get("user", "me"))
+        # An explicit query (e.g. --since) always lists; otherwise sync if enabled.
+        store = opts.get("sync_store") or sync_store
+        if config.GMAIL_SYNC_MODE == "incremental" and store and not opts.get("query"):
+            message_ids, history_id = sync_message_ids(
+                service, store, opts.get("user", "me"),
+                max_results=opts["max_results"], max_delta=config.GMAIL_MAX_DELTA, limiter=limiter,
+                label_id=config.GMAIL_LABEL or None,
+            )
+            state["history_id"] = history_id
+        else:
+            message_ids = list_message_ids(
+                service, max_results=opts["max_results"], query=opts.get("query"), limiter=limiter,
+                label_id=config.GMAIL_LABEL or None,
+            )
+        if config.BODY_MODE == "full":
+            # Bodies are extracted per batch; only headers and text are kept.
+            fetched = fetch_messages(
+                service, message_ids, batch_size=config.GMAIL_BATCH_SIZE, fmt="full", limiter=limiter, transform=_extract,
+            )
+            messages = [msg for msg, _ in fetched]
+            state["bodies"] = [body for _, body in fetched]
+        else:
+            messages = fetch_messages(service, message_ids, batch_size=config.GMAIL_BATCH_SIZE, limiter=limiter)
+        emails = [msg.get("snippet", "") for msg in messages]
+        state["messages"] = messages
+        state["emails"] = emails
+        # Lets callers show the fetched snippets before any summary is ready.
+        get_stream_writer()({"emails": emails, "messages": messages})
+        return state
+
+    def extract_bodies_node(state: EmailState):
+        if config.BODY_MODE != "full":
+            return state
+        # Extracted while fetching (see _extract); the snippets make way for them.
+        state["emails"] = state.get("bodies") or state["emails"]
+        state["bodies"] = []
+        return state
+
+    def triage_node(state: EmailState):
+        if config.TRIAGE_MODE == "off":
+            return state
+        state["triaged"] = triage(
+            state.get("messages", []), state["emails"], threshold=config.TRIAGE_THRESHOLD, model=triage_model,
+        )
+        return state
+
+    def optimize_emails_node(state: EmailState):
+        opts = _options()
+        writer = get_stream_writer()
+
+        # Each distinct answer is parsed once; events and state carry the record.
+        parsed, records = {}, {}
+
+        def emit(index, text, similar=1):
+            if text not in parsed:
+                parsed[text] = parse_summaries([text])[0]
+            record = parsed[text] if similar == 1 else {**parsed[text], "similar": similar}
+            records[index] = record
+            writer({"index": index, "summary": text, "record": record})
+
+        def run(emails, on_result=None):
+            return summarize(
+                summary_model, emails, mode=config.SUMMARY_MODE, max_prompt_tokens=config.PACK_MAX_TOKENS,
+                max_concurrency=opts.get("concurrency", config.SUMMARY_CONCURRENCY), timeout=config.SUMMARY_TIMEOUT,
+                on_result=on_result, limiter=_gemini_limiter(opts), context_cache=context_cache,
+            )
+
+        # Triaged emails already have their template summary; the rest go to the model.
+        triaged = state.get("triaged") or {}
+        for index, text in triaged.items():
+            emit(index, text)
+        todo = [i for i in range(len(state["emails"])) if i not in triaged]
+        all_messages = state.get("messages", [])
+        emails = [state["emails"][i] for i in todo]
+        messages = [all_messages[i] for i in todo] if all_messages else []
+
+        def emit_todo(j, text, similar=1):
+            emit(todo[j], text, similar)
+
+        if config.SUMMARIZE_BY == "thread":
+            # Every message shows its thread's summary; one call per changed thread.
+            groups = group_by_thread(messages)
+
+            def emit_thread(thread_id, text):
+                for j in groups[thread_id]:
+                    emit_todo(j, text)
+
+            summaries = summarize_threads(
+                summary_model, messages, emails, store=thread_store,
+                max_concurrency=opts.get("concurrency", config.SUMMARY_CONCURRENCY), timeout=config.SUMMARY_TIMEOUT,
+                on_result=emit_thread, limiter=_gemini_limiter(opts), context_cache=context_cache,
+            )
+            results = [""] * len(emails)
+            for thread_id, indexes in groups.items():
+                for j in indexes:
+                    results[j] = summaries.get(thread_id, "")
+            state["thread_summaries"] = summaries
+        else:
+            # Near-duplicates share their representative's summary, with the cluster size.
+            groups = {}
+            if config.DEDUP_MODE == "minhash" and len(emails) > 1:
+                texts = [f"{header_value(m, 'Subject')} {e}" for m, e in zip(messages, emails)] if messages else emails
+                groups = near_duplicates(
+                    texts, num_perm=config.DEDUP_NUM_PERM, bands=config.DEDUP_BANDS, threshold=config.DEDUP_THRESHOLD,
+                )
+                state["duplicates"] = {todo[r]: [todo[j] for j in members] for r, members in groups.items()}
+            copies = {j for members in groups.values() for j in members[1:]}
+            unique = [j for j in range(len(emails)) if j not in copies]
+            if copies:
+                metrics.registry.inc("summarizer_dedup_skipped_total", len(copies))
+
+            def emit_unique(u, text):
+                members = groups.get(unique[u], [unique[u]])
+                for j in members:
+                    emit_todo(j, text, len(members))
+
+            unique_emails = [emails[j] for j in unique]
+            if summary_cache is None:
+                unique_results = run(unique_emails, on_result=emit_unique)
+            else:
+                message_ids = [messages[j].get("id", "") for j in unique] if messages else [""] * len(unique)
+                keys = [
+                    SummaryCache.key(i, email, config.GEMINI_MODEL, PROMPT_VERSION) for i, email in zip(message_ids, unique_emails)
+                ]
+                unique_results = summary_cache.get_or_compute(keys, unique_emails, run, on_result=emit_unique)
+            results = [""] * len(emails)
+            for j, text in zip(unique, unique_results):
+                for member in groups.get(j, [j]):
+                    results[member] = text
+
+        optimized = [triaged.get(i, "") for i in range(len(state["emails"]))]
+        for j, text in zip(todo, results):
+            optimized[j] = text
+        state["optimized_emails"] = optimized
+        missing = [i for i in range(len(optimized)) if i not in records]
+        for i, record in zip(missing, parse_summaries([optimized[i] for i in missing])):
+            records[i] = record
+        state["records"] = [records[i] for i in range(len(optimized))]
+        return state
+
+    def save_to_sheets_node(state: EmailState):
+        opts = _options()
+        parsed = state.get("records") or parse_summaries(state["optimized_emails"])
+        data_to_save = [{"Summary": r["summary"], "Priority": r["priority"]} for r in parsed]
+
+        # Local stores first: they must never depend on Sheets being reachable.
+        if summary_store is not None or digest_store is not None or search_index is not None:
+            messages = state.get("messages", [])
+            records = []
+            for i, row in enumerate(data_to_save):
+                msg = messages[i] if i < len(messages) else {}
+                records.append({
+                    "message_id": msg.get("id"),
+                    "thread_id": msg.get("threadId"),
+                    "ts": int(msg["internalDate"]) / 1000 if msg.get("internalDate") else None,
+                    "sender": header_value(msg, "From"),
+                    "subject": header_value(msg, "Subject"),
+                    "priority": row["Priority"],
+                    "summary": row["Summary"],
+                })
+            if summary_store is not None:
+                state["run_id"] = summary_store.add_run(records, user=opts.get("user", "me"))
+            if digest_store is not None:
+                # Keeps the daily digest rollups current; nothing is recomputed at send time.
+                digest_store.add(opts.get("user", "me"), records)
+            if search_index is not None:
+                snippets = [messages[i].get("snippet", "") if i < len(messages) else "" for i in range(len(records))]
+                search_index.add(opts.get("user", "me"), records, snippets)
+
+        if opts.get("sheet"):
+            rows = [[row["Summary"], row["Priority"]] for row in data_to_save]
+            try:
+                sheet = opts["sheet"]()
+            except Exception as e:
+                # Counted like a failed write; the summaries are already saved locally.
+                state["sheets_report"] = {"written": 0, "failed": len(rows), "requests": 0, "retries": 0,
+                                          "errors": [f"{type(e).__name__}: {e}"]}
+            else:
+                state["sheets_report"] = append_rows_chunked(
+                    sheet, rows, chunk_size=config.SHEETS_CHUNK_SIZE, max_retries=config.SHEETS_MAX_RETRIES,
+                    limiter=limiter_for("sheets"),
+                )
+        # Only advance the sync point once this run's summaries are saved.
+        store = opts.get("sync_store") or sync_store
+        if store and state.get("history_id"):
+            store.set(opts.get("user", "me"), state["history_id"])
+        return state
+
+    graph = StateGraph(EmailState)
+    graph.add_node("FetchEmails", _instrumented("FetchEmails", fetch_emails_node))
+    graph.add_node("ExtractBodies", _instrumented("ExtractBodies", extract_bodies_node))
+    graph.add_node("Triage", _instrumented("Triage", triage_node))
+    graph.add_node("OptimizeEmails", _instrumented("OptimizeEmails", optimize_emails_node))
+    graph.add_node("SaveToSheets", _instrumented("SaveToSheets", save_to_sheets_node, final=True))
+    graph.add_edge(START, "FetchEmails")
+    graph.add_edge("FetchEmails", "ExtractBodies")
+    graph.add_edge("ExtractBodies", "Triage")
+    graph.add_edge("Triage", "OptimizeEmails")
+    graph.add_edge("OptimizeEmails", "SaveToSheets")
+    graph.add_edge("SaveToSheets", END)
+    return graph.compile()
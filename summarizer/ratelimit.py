@@ -0,0 +1,299 @@
+import asyncio
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from summarizer import config, metrics
+
+# ===============================
+# 🚦 Rate Limits
+# ===============================
+# Every outbound API call draws from a token bucket sized to that API's
+# published quota (Gmail quota units per user per second, Gemini requests
+# and tokens per minute, Sheets writes per minute), so bursts wait a few
+# milliseconds locally instead of coming back as 429s. Buckets hand out
+# reservations (the balance may go negative), which keeps waiters in
+# arrival order without a polling loop. Gemini calls also pass an AIMD
+# gate: concurrency creeps up by one per window of successful calls and
+# halves on a 429 or when latency climbs past a target, the same way TCP
+# finds the bandwidth of a link. Throttled calls are retried with
+# full-jitter backoff. All state sits behind threading locks and the async
+# paths only await plain sleeps, so a limiter can be shared across threads
+# and across the event loops that asyncio.run creates for each node.
+GMAIL_UNITS = {"list": 5, "get": 5, "history": 2, "profile": 1, "send": 100}
+
+
+def is_throttled(error):
+    """True for 429 / RESOURCE_EXHAUSTED errors from any of the Google clients."""
+    for value in (
+        getattr(error, "code", None),
+        getattr(error, "status_code", None),
+        getattr(getattr(error, "resp", None), "status", None),
+        getattr(getattr(error, "response", None), "status_code", None),
+    ):
+        if value in (429, "429"):
+            return True
+    text = str(error)
+    return "RESOURCE_EXHAUSTED" in text or "rateLimitExceeded" in text
+
+
+class TokenBucket:
+    """`rate` tokens per second with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, cost=1.0):
+        """Takes `cost` tokens now and returns how long to wait before using them."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= cost
+            return max(0.0, -self._tokens / self.rate)
+
+    def set_rate(self, rate, capacity=None):
+        """Changes the refill rate from now on; tokens already earned are kept."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.rate = float(rate)
+            self.capacity = float(capacity if capacity is not None else rate)
+            self._tokens = min(self.capacity, self._tokens)
+
+
+class AIMDController:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit.
+
+    on_success() grows the limit by about one per `limit` successful
+    calls; on_throttle() (and, with target_latency set, a slow response)
+    multiplies it by `decrease`, at most once per `cooldown` seconds so a
+    burst of 429s from the same overload only counts once.
+    """
+
+    def __init__(self, initial=8, minimum=1, maximum=64, target_latency=None, decrease=0.5, cooldown=1.0, clock=time.monotonic):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._clock = clock
+        self._limit = float(max(minimum, min(maximum, initial)))
+        self._in_flight = 0
+        self._last_decrease = float("-inf")
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    def on_success(self, latency=None):
+        if self.target_latency and latency is not None and latency > self.target_latency:
+            self._back_off()
+            return
+        with self._lock:
+            self._limit = min(self.maximum, self._limit + 1.0 / self._limit)
+
+    def on_throttle(self):
+        self._back_off()
+
+    def set_maximum(self, maximum):
+        with self._lock:
+            self.maximum = max(self.minimum, maximum)
+            self._limit = min(self._limit, float(self.maximum))
+
+    def _back_off(self):
+        with self._lock:
+            now = self._clock()
+            if now - self._last_decrease >= self.cooldown:
+                self._limit = max(self.minimum, self._limit * self.decrease)
+                self._last_decrease = now
+
+    def _try_enter(self):
+        with self._lock:
+            if self._in_flight < int(self._limit):
+                self._in_flight += 1
+                return True
+            return False
+
+    async def aenter(self, poll=0.005):
+        while not self._try_enter():
+            await asyncio.sleep(poll)
+
+    def leave(self):
+        with self._lock:
+            self._in_flight -= 1
+
+
+class ApiLimiter:
+    """
+    One API's budget: named token buckets (e.g. requests, tokens, units),
+    an optional AIMD concurrency gate and retry policy for throttled calls.
+    stats counts calls, 429s, retries and seconds spent waiting locally.
+    """
+
+    def __init__(self, buckets, controller=None, max_retries=4, base_delay=1.0, max_delay=30.0, name="api"):
+        self.name = name
+        self.buckets = buckets
+        self.controller = controller
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = {"calls": 0, "throttled": 0, "retries": 0, "waited": 0.0}
+        self._lock = threading.Lock()
+        # What the budget was built with; set_share() scales from these.
+        self._full = {name: (bucket.rate, bucket.capacity) for name, bucket in buckets.items()}
+        self._full_concurrency = controller.maximum if controller else None
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _reserve(self, costs):
+        wait = 0.0
+        for name, cost in costs.items():
+            if cost and name in self.buckets:
+                wait = max(wait, self.buckets[name].reserve(cost))
+        if wait:
+            self._count("waited", wait)
+            metrics.record_wait(self.name, wait)
+        return wait
+
+    def set_share(self, share):
+        """Scales the buckets and the concurrency ceiling to share (0-1] of the full budget."""
+        for name, (rate, capacity) in self._full.items():
+            self.buckets[name].set_rate(rate * share, max(1.0, capacity * share))
+        if self.controller:
+            self.controller.set_maximum(max(1, int(self._full_concurrency * share)))
+
+    def backoff(self, attempt):
+        """Full-jitter delay before retry number `attempt` (0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def acquire(self, **costs):
+        """Blocks until the buckets can cover costs, e.g. acquire(units=5)."""
+        wait = self._reserve(costs)
+        if wait:
+            time.sleep(wait)
+
+    async def aacquire(self, **costs):
+        wait = self._reserve(costs)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def call(self, fn, **costs):
+        """Runs fn() within budget, retrying throttled calls with backoff."""
+        for attempt in range(self.max_retries + 1):
+            self.acquire(**costs)
+            self._count("calls")
+            try:
+                return fn()
+            except Exception as e:
+                if not is_throttled(e):
+                    raise
+                self._count("throttled")
+                if self.controller:
+                    self.controller.on_throttle()
+                if attempt == self.max_retries:
+                    raise
+                self._count("retries")
+                metrics.record_retry(self.name)
+                time.sleep(self.backoff(attempt))
+
+    async def acall(self, fn, **costs):
+        """Async call(): awaits fn() inside the AIMD gate, if there is one."""
+        for attempt in range(self.max_retries + 1):
+            await self.aacquire(**costs)
+            if self.controller:
+                await self.controller.aenter()
+            self._count("calls")
+            started = time.monotonic()
+            try:
+                result = await fn()
+            except Exception as e:
+                if not is_throttled(e):
+                    raise
+                self._count("throttled")
+                if self.controller:
+                    self.controller.on_throttle()
+                if attempt == self.max_retries:
+                    raise
+                self._count("retries")
+                metrics.record_retry(self.name)
+            else:
+                if self.controller:
+                    self.controller.on_success(time.monotonic() - started)
+                return result
+            finally:
+                if self.controller:
+                    self.controller.leave()
+            await asyncio.sleep(self.backoff(attempt))
+
+
+def gmail_limiter():
+    return ApiLimiter(
+        {"units": TokenBucket(config.GMAIL_UNITS_PER_SECOND)},
+        max_retries=config.RATE_LIMIT_MAX_RETRIES, base_delay=config.RATE_LIMIT_BASE_DELAY, name="gmail",
+    )
+
+
+def gemini_limiter(share=1.0):
+    """
+    Gemini budget; share < 1 gives a slice of the project quota (and of
+    the concurrency ceiling) to one of several concurrent jobs. The slice
+    can be changed later with ApiLimiter.set_share().
+    """
+    rpm, tpm = config.GEMINI_RPM * share, config.GEMINI_TPM * share
+    return ApiLimiter(
+        {
+            # Per-minute quotas, refilled continuously with a one-second burst.
+            "requests": TokenBucket(rpm / 60, capacity=max(1, rpm / 60)),
+            "tokens": TokenBucket(tpm / 60, capacity=max(1, tpm / 60)),
+        },
+        controller=AIMDController(
+            initial=min(config.SUMMARY_CONCURRENCY, max(1, int(config.GEMINI_MAX_CONCURRENCY * share))),
+            maximum=max(1, int(config.GEMINI_MAX_CONCURRENCY * share)),
+            target_latency=config.GEMINI_TARGET_LATENCY or None,
+        ),
+        max_retries=config.RATE_LIMIT_MAX_RETRIES, base_delay=config.RATE_LIMIT_BASE_DELAY, name="gemini",
+    )
+
+
+def sheets_limiter():
+    return ApiLimiter(
+        {"requests": TokenBucket(config.SHEETS_WRITES_PER_MINUTE / 60, capacity=max(1, config.SHEETS_WRITES_PER_MINUTE / 10))},
+        max_retries=config.RATE_LIMIT_MAX_RETRIES, base_delay=config.RATE_LIMIT_BASE_DELAY, name="sheets",
+    )
+
+
+_FACTORIES = {"gmail": gmail_limiter, "gemini": gemini_limiter, "sheets": sheets_limiter}
+_limiters = OrderedDict()
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(api, key=None):
+    """
+    The process-wide limiter for an API ("gmail", "gemini" or "sheets").
+    Gmail quotas are per user, so pass the user as key; Gemini and Sheets
+    quotas are per project and shared by everyone. Like the client
+    registry, at most CLIENT_CACHE_MAX_ENTRIES per-user limiters are kept,
+    least recently used dropped first; the shared ones are never dropped.
+    """
+    with _limiters_lock:
+        if (api, key) in _limiters:
+            _limiters.move_to_end((api, key))
+            return _limiters[(api, key)]
+        limiter = _limiters[(api, key)] = _FACTORIES[api]()
+        if key is not None:
+            keyed = [k for k in _limiters if k[1] is not None]
+            for stale in keyed[:max(0, len(keyed) - config.CLIENT_CACHE_MAX_ENTRIES)]:
+                del _limiters[stale]
+        return limiter
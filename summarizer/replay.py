@@ -0,0 +1,319 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.parse
+from email.parser import BytesParser
+from email.policy import HTTP
+
+# ===============================
+# 📼 Record / Replay
+# ===============================
+# Captures what the pipeline gets back from Gmail and Gemini into a
+# cassette file and plays it back offline, so runs can be benchmarked and
+# compared without network access, credentials or quota.
+# - Gmail is recorded below googleapiclient, at the HTTP layer. Every call
+#   is keyed by method, path and sorted query, and calls inside a batch
+#   request are stored one by one. A replay can therefore use a different
+#   batch size than the recording.
+# - Gemini is recorded per prompt (sha256) as summarizer.summarize built
+#   it, whichever form summarizer.context_cache sent it in, so a recording
+#   made with any PROMPT_CACHE mode replays in any other. Plain answers
+#   keep their text and usage metadata; structured answers keep their dict.
+# The cassette is JSON lines, appended as calls complete: a recording
+# survives a crash, and recording never rewrites the file. A key answered
+# several times (e.g. a list call repeated across runs) replays its
+# answers in order, then repeats the last one. Each replayed call waits
+# `latency` seconds, or its recorded duration when latency is None.
+# Calls that are not in the cassette raise ReplayMiss.
+
+
+class ReplayMiss(KeyError):
+    """A replayed call that was never recorded."""
+
+
+class Cassette:
+    """Recorded Gmail HTTP responses and Gemini answers, backed by a JSON-lines file."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._entries = {}
+        self._played = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault((entry["kind"], entry["key"]), []).append(entry)
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._entries.values())
+
+    def record(self, kind, key, **entry):
+        entry = {"kind": kind, "key": key, **entry}
+        with self._lock:
+            self._entries.setdefault((kind, key), []).append(entry)
+            if self.path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def play(self, kind, key):
+        with self._lock:
+            entries = self._entries.get((kind, key))
+            if not entries:
+                raise ReplayMiss(f"{kind} call not in cassette {self.path or '(memory)'}: {key[:200]}")
+            n = self._played.get((kind, key), 0)
+            self._played[(kind, key)] = n + 1
+            return entries[min(n, len(entries) - 1)]
+
+    def rewind(self):
+        """Replays every key from its first answer again."""
+        with self._lock:
+            self._played.clear()
+
+
+def _wait(entry, latency):
+    seconds = entry.get("seconds", 0.0) if latency is None else latency
+    if seconds > 0:
+        time.sleep(seconds)
+
+
+# ---------- Gmail (HTTP layer) ----------
+def request_key(method, uri):
+    """"GET /gmail/v1/users/me/messages?maxResults=5" for any host and query order."""
+    parsed = urllib.parse.urlsplit(uri)
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)))
+    return f"{method} {parsed.path}" + (f"?{query}" if query else "")
+
+
+def is_batch(uri):
+    path = urllib.parse.urlsplit(uri).path
+    return path == "/batch" or path.startswith("/batch/")
+
+
+def _parse_multipart(content_type, body):
+    raw = b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body
+    return BytesParser(policy=HTTP).parsebytes(raw).iter_parts()
+
+
+def batch_requests(content_type, body):
+    """(Content-ID, key) of every call in a batch request body."""
+    calls = []
+    for part in _parse_multipart(content_type, body):
+        request_line = part.get_payload(decode=True).decode("utf-8").split("\n", 1)[0].strip()
+        method, target, _ = request_line.split(" ", 2)
+        calls.append((part["Content-ID"], request_key(method, target)))
+    return calls
+
+
+def batch_responses(content_type, body):
+    """{Content-ID of the request: (status, body)} from a batch response."""
+    responses = {}
+    for part in _parse_multipart(content_type, body):
+        inner = part.get_payload(decode=True).decode("utf-8")
+        head, _, content = inner.replace("\r\n", "\n").partition("\n\n")
+        status = int(head.split("\n", 1)[0].split()[1])
+        content_id = part["Content-ID"].strip()
+        responses[content_id.replace("<response-", "<", 1)] = (status, content.strip())
+    return responses
+
+
+def _response(status, content_type="application/json; charset=UTF-8"):
+    import httplib2
+
+    return httplib2.Response({"status": str(status), "content-type": content_type})
+
+
+class RecordingHttp:
+    """Wraps an httplib2-compatible Http (e.g. AuthorizedHttp) and records every response."""
+
+    def __init__(self, http, cassette):
+        self.http = http
+        self.cassette = cassette
+
+    def __getattr__(self, name):
+        # googleapiclient reads credentials, timeout etc. from the Http.
+        return getattr(self.http, name)
+
+    def request(self, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        started = time.perf_counter()
+        response, content = self.http.request(uri, method, body, headers, *args, **kwargs)
+        seconds = time.perf_counter() - started
+        if is_batch(uri) and response.status == 200:
+            request_type = {k.lower(): v for k, v in (headers or {}).items()}["content-type"]
+            body = body.encode("utf-8") if isinstance(body, str) else body
+            calls = batch_requests(request_type, body)
+            answers = batch_responses(response["content-type"], content)
+            for content_id, key in calls:
+                if content_id in answers:
+                    status, text = answers[content_id]
+                    self.cassette.record("gmail", key, status=status, body=text, seconds=seconds / len(calls))
+        else:
+            self.cassette.record(
+                "gmail", request_key(method, uri), status=response.status,
+                body=content.decode("utf-8") if isinstance(content, bytes) else content, seconds=seconds,
+            )
+        return response, content
+
+
+class ReplayHttp:
+    """An httplib2-compatible Http that answers from a cassette; never touches the network."""
+
+    BOUNDARY = "batch_replay_boundary"
+
+    def __init__(self, cassette, latency=None):
+        self.cassette = cassette
+        self.latency = latency
+        self.requests = 0
+
+    def request(self, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        self.requests += 1
+        if not is_batch(uri):
+            entry = self.cassette.play("gmail", request_key(method, uri))
+            _wait(entry, self.latency)
+            return _response(entry["status"]), entry["body"].encode("utf-8")
+        request_type = {k.lower(): v for k, v in (headers or {}).items()}["content-type"]
+        body = body.encode("utf-8") if isinstance(body, str) else body
+        parts, seconds = [], 0.0
+        for content_id, key in batch_requests(request_type, body):
+            entry = self.cassette.play("gmail", key)
+            seconds += entry.get("seconds", 0.0)
+            parts.append(
+                f"--{self.BOUNDARY}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id.strip()[1:-1]}>\r\n\r\n"
+                f"HTTP/1.1 {entry['status']} {'OK' if entry['status'] < 300 else 'Error'}\r\n"
+                "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{entry['body']}\r\n"
+            )
+        parts.append(f"--{self.BOUNDARY}--\r\n")
+        # A replayed batch takes as long as its calls took when recorded.
+        _wait({"seconds": seconds}, self.latency)
+        return _response(200, f"multipart/mixed; boundary={self.BOUNDARY}"), "".join(parts).encode("utf-8")
+
+
+def gmail_service(http):
+    """A Gmail service over http (a RecordingHttp or ReplayHttp); no discovery fetch."""
+    from googleapiclient.discovery import build
+
+    return build("gmail", "v1", http=http, static_discovery=True)
+
+
+# ---------- Gemini ----------
+def logical_prompt(prompt, cached_content=None):
+    """
+    The single prompt string behind a request: chat messages are joined
+    with the blank line summarizer.summarize puts between instruction and
+    email, and a cached_content name is replaced by its instruction.
+    """
+    if isinstance(prompt, str):
+        return prompt
+    parts = [str(getattr(m, "content", m)) for m in prompt]
+    if cached_content:
+        from summarizer.context_cache import cached_instruction
+
+        parts.insert(0, cached_instruction(cached_content) or cached_content)
+    return "\n\n".join(parts)
+
+
+def prompt_key(prompt, cached_content=None):
+    return hashlib.sha256(logical_prompt(prompt, cached_content).encode("utf-8")).hexdigest()
+
+
+def _message_entry(response):
+    if isinstance(response, dict):
+        return {"record": response}
+    from summarizer.summarize import response_text
+
+    return {"content": response_text(response), "usage": getattr(response, "usage_metadata", None) or None}
+
+
+def _message(entry):
+    if "record" in entry:
+        return dict(entry["record"])
+    from langchain_core.messages import AIMessage
+
+    if entry.get("usage"):
+        return AIMessage(content=entry["content"], usage_metadata=entry["usage"])
+    return AIMessage(content=entry["content"])
+
+
+class RecordingModel:
+    """Wraps a chat model (invoke / ainvoke / with_structured_output) and records every answer."""
+
+    def __init__(self, model, cassette, kind="gemini"):
+        self.model = model
+        self.cassette = cassette
+        self.kind = kind
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def _record(self, prompt, kwargs, response, started):
+        key = prompt_key(prompt, kwargs.get("cached_content"))
+        self.cassette.record(self.kind, key, seconds=time.perf_counter() - started, **_message_entry(response))
+        return response
+
+    def invoke(self, prompt, **kwargs):
+        started = time.perf_counter()
+        return self._record(prompt, kwargs, self.model.invoke(prompt, **kwargs), started)
+
+    async def ainvoke(self, prompt, **kwargs):
+        started = time.perf_counter()
+        return self._record(prompt, kwargs, await self.model.ainvoke(prompt, **kwargs), started)
+
+    def with_structured_output(self, schema, **kwargs):
+        return RecordingModel(self.model.with_structured_output(schema, **kwargs), self.cassette, f"{self.kind}-structured")
+
+
+class ReplayModel:
+    """Answers prompts from a cassette, waiting `latency` seconds (None = as recorded)."""
+
+    def __init__(self, cassette, latency=None, kind="gemini"):
+        self.cassette = cassette
+        self.latency = latency
+        self.kind = kind
+        self.calls = 0
+
+    def _play(self, prompt, kwargs):
+        self.calls += 1
+        return self.cassette.play(self.kind, prompt_key(prompt, kwargs.get("cached_content")))
+
+    def invoke(self, prompt, **kwargs):
+        entry = self._play(prompt, kwargs)
+        _wait(entry, self.latency)
+        return _message(entry)
+
+    async def ainvoke(self, prompt, **kwargs):
+        import asyncio
+
+        entry = self._play(prompt, kwargs)
+        seconds = entry.get("seconds", 0.0) if self.latency is None else self.latency
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+        return _message(entry)
+
+    def with_structured_output(self, schema, **kwargs):
+        return ReplayModel(self.cassette, self.latency, f"{self.kind}-structured")
+
+
+# ---------- configuration ----------
+_cassettes = {}
+_cassettes_lock = threading.Lock()
+
+
+def cassette_for(path):
+    """The process-wide cassette for path, so recorders and players share one file."""
+    with _cassettes_lock:
+        if path not in _cassettes:
+            _cassettes[path] = Cassette(path)
+        return _cassettes[path]
+
+
+def latency_from_config():
+    from summarizer import config
+
+    return float(config.REPLAY_LATENCY) if config.REPLAY_LATENCY != "" else None
@@ -0,0 +1,249 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from summarizer import config
+
+# ===============================
+# 🗓️ Scheduled Daily Digests
+# ===============================
+# Digests are built from rollups that are kept up to date as summaries are
+# saved, so nothing is fetched or summarized at send time. The pipeline
+# feeds DigestStore.add() from SaveToSheets. Each email is counted once
+# per user (by message id) into its local day:
+# - per-priority counts;
+# - per-sender counts, indexed by count, so the top senders are an index
+#   scan;
+# - the High-priority items themselves.
+# Rendering a day reads a handful of rows however much mail arrived.
+# Each user has a schedule: recipients, a local send time and a time zone.
+# The digest for day D is due at the send time on D + 1. The scheduler
+# remembers the last day it sent, so after downtime it catches up on every
+# missed day, up to DIGEST_MAX_CATCHUP days back.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS schedules (
+    user TEXT PRIMARY KEY,
+    recipients TEXT NOT NULL,
+    send_at TEXT NOT NULL DEFAULT '07:00',
+    tz TEXT NOT NULL DEFAULT 'UTC',
+    token_path TEXT,
+    last_day TEXT,
+    enabled INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS rollup_seen (user TEXT NOT NULL, message_id TEXT NOT NULL, PRIMARY KEY (user, message_id));
+CREATE TABLE IF NOT EXISTS rollup_priority (
+    user TEXT NOT NULL, day TEXT NOT NULL, priority TEXT NOT NULL, count INTEGER NOT NULL,
+    PRIMARY KEY (user, day, priority)
+);
+CREATE TABLE IF NOT EXISTS rollup_sender (
+    user TEXT NOT NULL, day TEXT NOT NULL, sender TEXT NOT NULL, count INTEGER NOT NULL,
+    PRIMARY KEY (user, day, sender)
+);
+CREATE INDEX IF NOT EXISTS idx_rollup_sender_top ON rollup_sender(user, day, count);
+CREATE TABLE IF NOT EXISTS rollup_high (
+    user TEXT NOT NULL, day TEXT NOT NULL, ts REAL NOT NULL, sender TEXT, subject TEXT, summary TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_rollup_high ON rollup_high(user, day, ts);
+"""
+
+
+def parse_send_at(value):
+    hour, minute = (int(part) for part in value.split(":"))
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"expected HH:MM, got {value!r}")
+    return hour, minute
+
+
+def due_days(schedule, now, max_catchup=7):
+    """
+    Days (oldest first) whose digest is due at epoch `now` and not yet
+    sent. A new schedule starts with the latest due day only.
+    """
+    local = datetime.fromtimestamp(now, ZoneInfo(schedule["tz"]))
+    latest = local.date() - timedelta(days=1 if (local.hour, local.minute) >= parse_send_at(schedule["send_at"]) else 2)
+    start = date.fromisoformat(schedule["last_day"]) + timedelta(days=1) if schedule.get("last_day") else latest
+    start = max(start, latest - timedelta(days=max_catchup - 1))
+    return [start + timedelta(days=i) for i in range((latest - start).days + 1)]
+
+
+class DigestStore:
+    """Per-user digest schedules and the daily rollups they are rendered from."""
+
+    def __init__(self, path=".cache/digests.sqlite3"):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        # Workers in several processes save runs into the same file.
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    # ---------- schedules ----------
+    def set_schedule(self, user, recipients, send_at="07:00", tz="UTC", token_path=None):
+        parse_send_at(send_at)
+        ZoneInfo(tz)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO schedules (user, recipients, send_at, tz, token_path) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(user) DO UPDATE SET recipients = excluded.recipients, send_at = excluded.send_at, "
+                "tz = excluded.tz, token_path = excluded.token_path, enabled = 1",
+                (user, json.dumps(list(recipients)), send_at, tz, token_path),
+            )
+
+    def schedules(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM schedules WHERE enabled = 1 ORDER BY user").fetchall()
+        return [{**dict(r), "recipients": json.loads(r["recipients"])} for r in rows]
+
+    def mark_sent(self, user, day):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE schedules SET last_day = ? WHERE user = ?", (day.isoformat(), user))
+
+    def _zone(self, user):
+        # Read on every add: schedule-digest changes it from another process.
+        row = self._conn.execute("SELECT tz FROM schedules WHERE user = ?", (user,)).fetchone()
+        return ZoneInfo(row["tz"] if row else "UTC")
+
+    # ---------- rollups ----------
+    def add(self, user, records, now=None):
+        """
+        Folds saved summary records (see SummaryStore) into the user's daily
+        rollups. Records whose message_id was already counted are skipped.
+        Returns the number of records counted.
+        """
+        now = time.time() if now is None else now
+        priorities, senders, high = {}, {}, []
+        with self._lock, self._conn:
+            zone = self._zone(user)
+            for record in records:
+                message_id = record.get("message_id")
+                if message_id and not self._conn.execute(
+                    "INSERT OR IGNORE INTO rollup_seen (user, message_id) VALUES (?, ?)", (user, message_id)
+                ).rowcount:
+                    continue
+                ts = record.get("ts") or now
+                day = datetime.fromtimestamp(ts, zone).date().isoformat()
+                priority = record.get("priority") or "Unknown"
+                priorities[(day, priority)] = priorities.get((day, priority), 0) + 1
+                sender = record.get("sender") or ""
+                if sender:
+                    senders[(day, sender)] = senders.get((day, sender), 0) + 1
+                if priority == "High":
+                    high.append((user, day, ts, sender, record.get("subject", ""), record.get("summary", "")))
+            upsert = "DO UPDATE SET count = count + excluded.count"
+            self._conn.executemany(
+                f"INSERT INTO rollup_priority (user, day, priority, count) VALUES (?, ?, ?, ?) ON CONFLICT(user, day, priority) {upsert}",
+                [(user, day, priority, n) for (day, priority), n in priorities.items()],
+            )
+            self._conn.executemany(
+                f"INSERT INTO rollup_sender (user, day, sender, count) VALUES (?, ?, ?, ?) ON CONFLICT(user, day, sender) {upsert}",
+                [(user, day, sender, n) for (day, sender), n in senders.items()],
+            )
+            self._conn.executemany("INSERT INTO rollup_high VALUES (?, ?, ?, ?, ?, ?)", high)
+        return sum(priorities.values())
+
+    def rollup(self, user, day, top_senders=5, max_high=20):
+        """{"day", "total", "priorities", "top_senders", "high"} for one local day."""
+        day = day.isoformat() if isinstance(day, date) else day
+        with self._lock:
+            priorities = dict(self._conn.execute(
+                "SELECT priority, count FROM rollup_priority WHERE user = ? AND day = ?", (user, day),
+            ).fetchall())
+            senders = self._conn.execute(
+                "SELECT sender, count FROM rollup_sender WHERE user = ? AND day = ? ORDER BY count DESC LIMIT ?",
+                (user, day, top_senders),
+            ).fetchall()
+            high = self._conn.execute(
+                "SELECT ts, sender, subject, summary FROM rollup_high WHERE user = ? AND day = ? ORDER BY ts DESC LIMIT ?",
+                (user, day, max_high),
+            ).fetchall()
+        return {
+            "day": day,
+            "total": sum(priorities.values()),
+            "priorities": priorities,
+            "top_senders": [tuple(row) for row in senders],
+            "high": [dict(row) for row in high],
+        }
+
+    def close(self):
+        self._conn.close()
+
+
+def render_rollup(rollup) -> str:
+    """Digest text for one day's rollup (the $digest of the email template)."""
+    counts = rollup["priorities"]
+    lines = [
+        f"📬 Daily digest for {rollup['day']}: {rollup['total']} emails",
+        " · ".join(f"{label}: {counts.get(name, 0)}" for name, label in (
+            ("High", "🔴 High"), ("Medium", "🟠 Medium"), ("Low", "🟢 Low"), ("Unknown", "⚪ Unknown"),
+        )),
+        "",
+    ]
+    if rollup["top_senders"]:
+        lines.append("👤 Top senders:")
+        lines.extend(f"  {sender} ({count})" for sender, count in rollup["top_senders"])
+        lines.append("")
+    if rollup["high"]:
+        more = counts.get("High", 0) - len(rollup["high"])
+        lines.append("🔥 High priority:")
+        for i, item in enumerate(rollup["high"], start=1):
+            subject = f" — {item['subject']}" if item["subject"] else ""
+            lines.append(f"{i}. {item['sender'] or 'Unknown sender'}{subject}")
+            lines.append(f"   {item['summary']}")
+        if more > 0:
+            lines.append(f"…and {more} more")
+    return "\n".join(lines)
+
+
+def run_due(store, now=None, send=None, max_catchup=None):
+    """
+    Sends every due digest and returns one result dict per (user, day).
+    send(schedule, rollup, text) delivers a digest and returns a
+    summarizer.digest report; days with no mail are marked done unsent.
+    A day stays due (and is retried next tick) until one recipient got it.
+    """
+    now = time.time() if now is None else now
+    send = send or send_with_gmail
+    results = []
+    for schedule in store.schedules():
+        for day in due_days(schedule, now, max_catchup or config.DIGEST_MAX_CATCHUP):
+            rollup = store.rollup(schedule["user"], day, config.DIGEST_TOP_SENDERS, config.DIGEST_MAX_HIGH)
+            result = {"user": schedule["user"], "day": rollup["day"], "emails": rollup["total"], "sent": 0, "failed": 0}
+            if rollup["total"]:
+                try:
+                    report = send(schedule, rollup, render_rollup(rollup))
+                    result.update(sent=report["sent"], failed=report["failed"])
+                except Exception as e:
+                    result.update(failed=len(schedule["recipients"]), error=f"{type(e).__name__}: {e}")
+            results.append(result)
+            if not rollup["total"] or result["sent"]:
+                store.mark_sent(schedule["user"], day)
+            else:
+                # Keep later days queued behind this one.
+                break
+    return results
+
+
+def send_with_gmail(schedule, rollup, text):
+    from summarizer.clients import GMAIL_SEND, gmail_service
+    from summarizer.digest import send_digest
+    from summarizer.ratelimit import limiter_for
+
+    service = gmail_service(token_path=schedule["token_path"] or "token.json", scopes=GMAIL_SEND)
+    return send_digest(
+        service, schedule["recipients"], rollup["high"], digest=text, count=rollup["total"],
+        subject=f"📧 Your daily email digest — {rollup['day']}",
+        batch_size=config.DIGEST_BATCH_SIZE, limiter=limiter_for("gmail", schedule["user"]),
+    )
+
+
+def digests_from_config():
+    """The digest store configured in .env, or None when disabled."""
+    if not config.DIGEST_STORE_PATH:
+        return None
+    return DigestStore(config.DIGEST_STORE_PATH)
@@ -0,0 +1,332 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from summarizer import config
+from summarizer.triage import tokens
+
+# ===============================
+# 🔎 Semantic Search
+# ===============================
+# Saved summaries (with the email's subject and snippet) are embedded once
+# and written to SQLite alongside their vectors, as SaveToSheets saves each
+# run. Each process keeps the vectors in memory and loads only rows added
+# since its last query, so runs saved by other workers show up too.
+# Embeddings come from either:
+# - HashingEmbedder: signed feature hashing of words. Deterministic and
+#   offline; it matches shared vocabulary, not meaning.
+# - a local sentence-transformers model (optional dependency), e.g.
+#   SEARCH_EMBEDDER=all-MiniLM-L6-v2.
+# Two indexes over the unit vectors, scored by inner product (cosine):
+# - FlatIndex: exact, one matrix-vector product;
+# - IVFIndex: k-means lists; a query scores the centroids and then only
+#   the members of the nprobe nearest lists.
+FLOAT = np.float32
+
+
+class HashingEmbedder:
+    """Deterministic bag-of-words embedding with no model download."""
+
+    def __init__(self, dim=512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def encode(self, texts):
+        rows, cols, signs = [], [], []
+        for i, text in enumerate(texts):
+            for word in tokens(text):
+                # crc32 rather than hash(): vectors must not change between processes.
+                h = zlib.crc32(word.encode("utf-8"))
+                rows.append(i)
+                cols.append(h % self.dim)
+                signs.append(1.0 if h & 0x80000000 else -1.0)
+        vectors = np.zeros((len(texts), self.dim), dtype=FLOAT)
+        np.add.at(vectors, (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)), np.asarray(signs, dtype=FLOAT))
+        return normalize(vectors)
+
+
+class LocalModelEmbedder:
+    """A sentence-transformers model run locally (pip install sentence-transformers)."""
+
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = model_name
+
+    def encode(self, texts):
+        return self.model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True).astype(FLOAT)
+
+
+def normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores, k):
+    """Positions of the k highest scores, best first."""
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class FlatIndex:
+    """Exact top-k by inner product over every vector."""
+
+    def __init__(self, dim):
+        self.dim = dim
+        self.size = 0
+        self._vectors = np.zeros((1024, dim), dtype=FLOAT)
+
+    @property
+    def vectors(self):
+        return self._vectors[:self.size]
+
+    def add(self, vectors):
+        vectors = np.asarray(vectors, dtype=FLOAT).reshape(-1, self.dim)
+        if self.size + len(vectors) > len(self._vectors):
+            grown = np.zeros((max(2 * len(self._vectors), self.size + len(vectors)), self.dim), dtype=FLOAT)
+            grown[:self.size] = self.vectors
+            self._vectors = grown
+        self._vectors[self.size:self.size + len(vectors)] = vectors
+        self.size += len(vectors)
+
+    def search(self, query, k=10, allowed=None):
+        """(ids, scores) of the k nearest vectors; allowed masks ids out when False."""
+        scores = self.vectors @ np.asarray(query, dtype=FLOAT)
+        if allowed is not None:
+            scores = np.where(allowed[:self.size], scores, -np.inf)
+        ids = _top_k(scores, k)
+        ids = ids[np.isfinite(scores[ids])]
+        return ids, scores[ids]
+
+
+class IVFIndex(FlatIndex):
+    """
+    Approximate top-k: vectors are grouped into nlist k-means lists and a
+    query only scores the members of its nprobe nearest lists. Searches
+    are exact until min_train vectors exist; the lists are retrained when
+    the index has grown retrain_factor times since the last training.
+    """
+
+    def __init__(self, dim, nlist=None, nprobe=16, min_train=32768, retrain_factor=4, seed=0):
+        super().__init__(dim)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train = min_train
+        self.retrain_factor = retrain_factor
+        self.seed = seed
+        self.centroids = None
+        self._trained_size = 0
+        self._assign = np.zeros(0, dtype=np.int32)
+        # Members of each list, sorted by list, up to self._sorted ids.
+        self._order = np.zeros(0, dtype=np.int64)
+        self._bounds = np.zeros(1, dtype=np.int64)
+        self._sorted = 0
+
+    def add(self, vectors):
+        start = self.size
+        super().add(vectors)
+        if self.centroids is None:
+            if self.size >= self.min_train:
+                self.train()
+        elif self.size >= self.retrain_factor * self._trained_size:
+            self.train()
+        else:
+            self._assign = np.concatenate([self._assign, self._nearest(self.vectors[start:])])
+
+    def _nearest(self, vectors, chunk=16384):
+        out = np.empty(len(vectors), dtype=np.int32)
+        for i in range(0, len(vectors), chunk):
+            out[i:i + chunk] = np.argmax(vectors[i:i + chunk] @ self.centroids.T, axis=1)
+        return out
+
+    def train(self, iterations=10, sample=65536):
+        """Spherical k-means on a sample of the vectors, then assigns them all."""
+        rng = np.random.default_rng(self.seed)
+        nlist = self.nlist or max(1, int(np.sqrt(self.size)))
+        data = self.vectors
+        if len(data) > sample:
+            data = data[rng.choice(len(data), sample, replace=False)]
+        self.centroids = data[rng.choice(len(data), min(nlist, len(data)), replace=False)].copy()
+        for _ in range(iterations):
+            assign = self._nearest(data)
+            order = np.argsort(assign, kind="stable")
+            used, starts = np.unique(assign[order], return_index=True)
+            # Lists left empty keep their old centroid.
+            self.centroids[used] = normalize(np.add.reduceat(data[order], starts, axis=0))
+        self._assign = self._nearest(self.vectors)
+        self._trained_size = self.size
+        self._sorted = 0
+
+    def _sort(self):
+        self._order = np.argsort(self._assign, kind="stable")
+        self._bounds = np.searchsorted(self._assign[self._order], np.arange(len(self.centroids) + 1))
+        self._sorted = self.size
+
+    def search(self, query, k=10, allowed=None):
+        if self.centroids is None:
+            return super().search(query, k, allowed)
+        # Re-sort the lists once a tenth of the ids arrived since the last sort.
+        if (self.size - self._sorted) * 10 > self.size:
+            self._sort()
+        query = np.asarray(query, dtype=FLOAT)
+        probe = _top_k(self.centroids @ query, min(self.nprobe, len(self.centroids)))
+        members = [self._order[self._bounds[p]:self._bounds[p + 1]] for p in probe]
+        # Ids added since the last sort, in the probed lists.
+        tail = np.arange(self._sorted, self.size)
+        members.append(tail[np.isin(self._assign[self._sorted:], probe)])
+        candidates = np.concatenate(members)
+        if allowed is not None:
+            candidates = candidates[allowed[candidates]]
+        scores = self.vectors[candidates] @ query
+        top = _top_k(scores, k)
+        return candidates[top], scores[top]
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user TEXT NOT NULL,
+    message_id TEXT,
+    ts REAL NOT NULL,
+    sender TEXT NOT NULL DEFAULT '',
+    subject TEXT NOT NULL DEFAULT '',
+    priority TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    snippet TEXT NOT NULL DEFAULT '',
+    vector BLOB NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_entries_message ON entries(user, message_id);
+"""
+
+RESULT_COLUMNS = ["user", "message_id", "ts", "sender", "subject", "priority", "summary", "snippet"]
+
+
+class SearchIndex:
+    """
+    Searchable saved summaries. Records are SummaryStore records (see
+    summarizer.store); a record whose (user, message_id) is already
+    indexed is skipped.
+    """
+
+    def __init__(self, path=".cache/search.sqlite3", embedder=None, kind="flat", nprobe=16):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.embedder = embedder or HashingEmbedder()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        with self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('embedder', ?)", (self.embedder.name,))
+        stored = self._conn.execute("SELECT value FROM meta WHERE key = 'embedder'").fetchone()["value"]
+        if stored != self.embedder.name:
+            raise ValueError(f"{path} holds {stored} vectors; use another SEARCH_INDEX_PATH for {self.embedder.name}")
+        dim = self.embedder.dim
+        self.index = IVFIndex(dim, nprobe=nprobe) if kind == "ivf" else FlatIndex(dim)
+        self._rowids = np.zeros(0, dtype=np.int64)
+        self._users, self._user_codes = {}, np.zeros(0, dtype=np.int32)
+        self._loaded = 0
+
+    @staticmethod
+    def text(record, snippet=""):
+        return "\n".join(part for part in (record.get("subject"), record.get("summary"), snippet) if part)
+
+    def add(self, user, records, snippets=None):
+        """Embeds and stores records (snippets parallel to them); returns how many were new."""
+        snippets = snippets or [""] * len(records)
+        vectors = self.embedder.encode([self.text(r, s) for r, s in zip(records, snippets)])
+        now = time.time()
+        rows = [
+            (user, r.get("message_id"), r.get("ts") or now, r.get("sender") or "", r.get("subject") or "",
+             r.get("priority", "Unknown"), r.get("summary", ""), s or "", v.tobytes())
+            for r, s, v in zip(records, snippets, vectors)
+        ]
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO entries (user, message_id, ts, sender, subject, priority, summary, snippet, vector) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows,
+            )
+            return self._conn.total_changes - before
+
+    def import_store(self, summary_store, batch_size=1000):
+        """Indexes every summary already saved in a SummaryStore; returns how many were new."""
+        added, batch, user = 0, [], None
+        for record in summary_store.all_records():
+            # Legacy backups have no message ids; the store's row id keeps re-imports idempotent.
+            record["message_id"] = record["message_id"] or f"summary-{record['id']}"
+            if batch and (record["user"] != user or len(batch) >= batch_size):
+                added += self.add(user, batch)
+                batch = []
+            user = record["user"]
+            batch.append(record)
+        if batch:
+            added += self.add(user, batch)
+        return added
+
+    def _refresh(self):
+        """Loads rows written since the last query, by this or any other process."""
+        rows = self._conn.execute(
+            "SELECT id, user, vector FROM entries WHERE id > ? ORDER BY id", (self._loaded,),
+        ).fetchall()
+        if not rows:
+            return
+        self.index.add(np.frombuffer(b"".join(r["vector"] for r in rows), dtype=FLOAT).reshape(len(rows), -1))
+        codes = [self._users.setdefault(r["user"], len(self._users)) for r in rows]
+        self._rowids = np.concatenate([self._rowids, [r["id"] for r in rows]])
+        self._user_codes = np.concatenate([self._user_codes, np.asarray(codes, dtype=np.int32)])
+        self._loaded = rows[-1]["id"]
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return self.index.size
+
+    def search(self, query, k=10, user=None):
+        """Top-k saved summaries for a free-text query, best first, each with its cosine "score"."""
+        vector = self.embedder.encode([query])[0]
+        with self._lock:
+            self._refresh()
+            allowed = None
+            if user is not None:
+                if user not in self._users:
+                    return []
+                allowed = self._user_codes == self._users[user]
+            ids, scores = self.index.search(vector, k, allowed)
+            if not len(ids):
+                return []
+            rowids = self._rowids[ids].tolist()
+            rows = self._conn.execute(
+                f"SELECT id, {', '.join(RESULT_COLUMNS)} FROM entries WHERE id IN ({', '.join('?' * len(rowids))})", rowids,
+            ).fetchall()
+        by_id = {row["id"]: row for row in rows}
+        return [
+            {"score": round(float(score), 4), **{c: by_id[rowid][c] for c in RESULT_COLUMNS}}
+            for rowid, score in zip(rowids, scores)
+        ]
+
+    def close(self):
+        self._conn.close()
+
+
+def embedder_from_config():
+    if config.SEARCH_EMBEDDER in ("", "hashing"):
+        return HashingEmbedder(config.SEARCH_DIM)
+    return LocalModelEmbedder(config.SEARCH_EMBEDDER)
+
+
+def search_from_config():
+    """The search index configured in .env, or None when disabled."""
+    if not config.SEARCH_INDEX_PATH:
+        return None
+    return SearchIndex(config.SEARCH_INDEX_PATH, embedder_from_config(), kind=config.SEARCH_INDEX, nprobe=config.SEARCH_NPROBE)
@@ -0,0 +1,63 @@
+import random
+import time
+
+from summarizer import metrics
+
+# ===============================
+# 📊 Bulk Google Sheets Writes
+# ===============================
+# Sheets allows ~60 write requests per minute per user, so rows go out in
+# chunks through a single append_rows call each instead of append_row per
+# summary. 429s and 5xx responses are retried with exponential backoff.
+# gspread is imported on first write; importing it pulls in requests and
+# google-auth, which the Streamlit UI does not need at startup.
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def _status(error):
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def append_rows_chunked(sheet, rows, chunk_size=500, max_retries=5, base_delay=1.0, sleep=time.sleep, limiter=None):
+    """
+    Appends rows to a gspread worksheet with one append_rows request per
+    chunk_size rows.
+
+    Returns a report dict with rows written/failed, requests sent and
+    retries. A chunk that still fails after max_retries (or with a
+    non-retryable error) is counted as failed and the error is kept in
+    report["errors"]; later chunks are still attempted. Transport errors
+    (connection resets, timeouts, token refresh failures) fail their chunk
+    the same way instead of propagating. A limiter
+    (summarizer.ratelimit) spaces requests to the writes-per-minute budget.
+    """
+    from gspread.exceptions import APIError
+
+    report = {"written": 0, "failed": 0, "requests": 0, "retries": 0, "errors": []}
+    for start in range(0, len(rows), max(1, chunk_size)):
+        chunk = rows[start:start + chunk_size]
+        for attempt in range(max_retries + 1):
+            if limiter:
+                limiter.acquire(requests=1)
+            report["requests"] += 1
+            try:
+                with metrics.call("sheets", "append_rows") as call:
+                    call.sent = metrics.payload_size(chunk)
+                    sheet.append_rows(chunk, value_input_option="RAW")
+            except APIError as e:
+                if _status(e) in RETRYABLE_STATUS and attempt < max_retries:
+                    report["retries"] += 1
+                    metrics.record_retry("sheets")
+                    # Full jitter keeps concurrent writers from retrying in lockstep.
+                    sleep(random.uniform(0, base_delay * 2 ** attempt))
+                    continue
+                report["failed"] += len(chunk)
+                report["errors"].append(str(e))
+            except Exception as e:
+                report["failed"] += len(chunk)
+                report["errors"].append(f"{type(e).__name__}: {e}")
+            else:
+                report["written"] += len(chunk)
+            break
+    return report
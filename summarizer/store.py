@@ -0,0 +1,202 @@
+import glob
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# ===============================
+# 🗄️ Indexed Summary Store
+# ===============================
+# Append-only SQLite store for saved runs, replacing one JSON file per run
+# in backups/. The newest run is a primary-key lookup instead of a
+# listdir + getmtime over every file, and the sender/priority/time
+# indexes answer "summaries from X last week" without scanning.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    source TEXT UNIQUE
+);
+CREATE INDEX IF NOT EXISTS idx_runs_user ON runs(user, id);
+CREATE TABLE IF NOT EXISTS summaries (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    message_id TEXT,
+    thread_id TEXT,
+    ts REAL NOT NULL,
+    sender TEXT NOT NULL DEFAULT '',
+    subject TEXT NOT NULL DEFAULT '',
+    priority TEXT NOT NULL,
+    summary TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_summaries_run ON summaries(run_id);
+CREATE INDEX IF NOT EXISTS idx_summaries_sender_ts ON summaries(sender, ts);
+CREATE INDEX IF NOT EXISTS idx_summaries_priority_ts ON summaries(priority, ts);
+CREATE INDEX IF NOT EXISTS idx_summaries_ts ON summaries(ts);
+"""
+
+COLUMNS = ["message_id", "thread_id", "ts", "sender", "subject", "priority", "summary"]
+# page() sort keys; "position" is the order the run fetched the emails in.
+SORTS = {
+    "position": "rowid",
+    "ts": "ts",
+    "sender": "sender",
+    "subject": "subject",
+    "priority": "CASE priority WHEN 'High' THEN 0 WHEN 'Medium' THEN 1 WHEN 'Low' THEN 2 ELSE 3 END",
+}
+_BACKUP_NAME = re.compile(r"email_summaries_(\d{8}_\d{6})\.json$")
+
+
+class SummaryStore:
+    """
+    Saved summaries, one row per email, grouped into runs.
+
+    Records are dicts with message_id, thread_id, ts (epoch seconds of
+    the email), sender, subject, priority and summary; only priority and
+    summary are required.
+    """
+
+    def __init__(self, path="backups/summaries.sqlite3"):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        # Workers in several processes save runs into the same file.
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def add_run(self, records, user="me", created_at=None, source=None):
+        """Appends one run and returns its id."""
+        created_at = time.time() if created_at is None else created_at
+        with self._lock, self._conn:
+            run_id = self._conn.execute(
+                "INSERT INTO runs (user, created_at, source) VALUES (?, ?, ?)", (user, created_at, source)
+            ).lastrowid
+            self._conn.executemany(
+                f"INSERT INTO summaries (run_id, {', '.join(COLUMNS)}) VALUES (?, {', '.join('?' * len(COLUMNS))})",
+                [(run_id, *self._row(r, created_at)) for r in records],
+            )
+        return run_id
+
+    @staticmethod
+    def _row(record, default_ts):
+        return (
+            record.get("message_id"),
+            record.get("thread_id"),
+            record.get("ts") or default_ts,
+            record.get("sender", ""),
+            record.get("subject", ""),
+            record.get("priority", "Unknown"),
+            record.get("summary", ""),
+        )
+
+    def latest_run(self, user=None):
+        """Returns (run dict, records) for the newest run, or (None, [])."""
+        with self._lock:
+            if user is None:
+                run = self._conn.execute("SELECT * FROM runs ORDER BY id DESC LIMIT 1").fetchone()
+            else:
+                run = self._conn.execute("SELECT * FROM runs WHERE user = ? ORDER BY id DESC LIMIT 1", (user,)).fetchone()
+            if run is None:
+                return None, []
+            rows = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM summaries WHERE run_id = ? ORDER BY rowid", (run["id"],)
+            ).fetchall()
+        return dict(run), [dict(r) for r in rows]
+
+    def page(self, run_id, priorities=None, sender=None, sort="position", descending=False, offset=0, limit=50):
+        """
+        One page of a run's summaries and the number matching the filters:
+        (records, total). priorities is a list to keep (None = all); each
+        record also has its "position" in the run, starting at 1.
+        """
+        clauses, params = ["run_id = ?"], [run_id]
+        if priorities is not None:
+            clauses.append(f"priority IN ({', '.join('?' * len(priorities))})")
+            params.extend(priorities)
+        if sender:
+            clauses.append("sender = ?")
+            params.append(sender)
+        where = " AND ".join(clauses)
+        direction = "DESC" if descending else "ASC"
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM summaries WHERE {where}", params).fetchone()[0]
+            first = self._conn.execute("SELECT MIN(rowid) FROM summaries WHERE run_id = ?", (run_id,)).fetchone()[0] or 0
+            rows = self._conn.execute(
+                f"SELECT rowid - ? + 1 AS position, {', '.join(COLUMNS)} FROM summaries WHERE {where} "
+                f"ORDER BY {SORTS[sort]} {direction}, rowid {direction} LIMIT ? OFFSET ?",
+                [first, *params, limit, offset],
+            ).fetchall()
+        return [dict(r) for r in rows], total
+
+    def senders(self, run_id):
+        """(sender, count) pairs of a run, most frequent first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT sender, COUNT(*) FROM summaries WHERE run_id = ? AND sender != '' GROUP BY sender ORDER BY COUNT(*) DESC, sender",
+                (run_id,),
+            ).fetchall()
+        return [tuple(r) for r in rows]
+
+    def query(self, sender=None, priority=None, since=None, until=None, limit=100):
+        """
+        Summaries matching every given filter, newest email first. since
+        and until are epoch seconds; sender matches exactly.
+        """
+        clauses, params = [], []
+        for column, op, value in (("sender", "=", sender), ("priority", "=", priority), ("ts", ">=", since), ("ts", "<", until)):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT run_id, {', '.join(COLUMNS)} FROM summaries {where} ORDER BY ts DESC LIMIT ?",
+                [*params, limit],
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def all_records(self):
+        """Every saved summary with its row id and its run's user, oldest run first."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT summaries.rowid AS id, runs.user, {', '.join('summaries.' + c for c in COLUMNS)} FROM summaries "
+                "JOIN runs ON runs.id = summaries.run_id ORDER BY summaries.run_id, summaries.rowid"
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def import_backups(self, folder="backups", user="me"):
+        """
+        Imports legacy backups/email_summaries_<timestamp>.json files as
+        runs, oldest first. Files already imported are skipped, so it is
+        safe to re-run. Returns the number of runs added.
+        """
+        def created(path):
+            match = _BACKUP_NAME.search(os.path.basename(path))
+            if match:
+                return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").timestamp()
+            return os.path.getmtime(path)
+
+        with self._lock:
+            done = {row[0] for row in self._conn.execute("SELECT source FROM runs WHERE source IS NOT NULL")}
+        added = 0
+        for path in sorted(glob.glob(os.path.join(folder, "*.json")), key=created):
+            source = os.path.basename(path)
+            if source in done:
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                items = json.load(f)
+            records = [
+                {"summary": item.get("Summary", ""), "priority": item.get("Priority", "Unknown")}
+                for item in items if isinstance(item, dict)
+            ]
+            self.add_run(records, user=user, created_at=created(path), source=source)
+            added += 1
+        return added
+
+    def close(self):
+        self._conn.close()
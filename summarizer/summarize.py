@@ -0,0 +1,341 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+
+from summarizer import metrics
+from summarizer.ratelimit import is_throttled
+
+log = logging.getLogger(__name__)
+
+# ===============================
+# 🧠 Gemini Summarization
+# ===============================
+SYSTEM_PROMPT = """
+You are an intelligent assistant that summarizes email content clearly.
+1. Read the email carefully.
+2. Write a short 1–2 line summary.
+3. Assign a priority: High, Medium, or Low.
+Format:
+Summary: <summary>
+Priority: <priority>
+"""
+
+
+PACKED_SYSTEM_PROMPT = """
+You are an intelligent assistant that summarizes email content clearly.
+You will receive several emails, each wrapped in <email id="..."> tags.
+For every email:
+1. Read the email carefully.
+2. Write a short 1–2 line summary.
+3. Assign a priority: High, Medium, or Low.
+Reply with only a JSON array, one object per email, keeping the given ids:
+[{"id": "<id>", "summary": "<summary>", "priority": "<priority>"}]
+"""
+
+THREAD_SYSTEM_PROMPT = """
+You are an intelligent assistant that keeps running summaries of email threads.
+1. Read the previous thread summary (if any) and the new messages.
+2. Write an updated 1–2 line summary of the whole thread.
+3. Assign a priority for the thread: High, Medium, or Low.
+Format:
+Summary: <summary>
+Priority: <priority>
+"""
+
+# Changes whenever a prompt changes, invalidating cached summaries.
+PROMPT_VERSION = hashlib.sha256((SYSTEM_PROMPT + PACKED_SYSTEM_PROMPT + THREAD_SYSTEM_PROMPT).encode("utf-8")).hexdigest()[:12]
+
+
+def build_prompt(email: str) -> str:
+    return f"{SYSTEM_PROMPT}\n\nEmail:\n{email}"
+
+
+def build_packed_prompt(pack) -> str:
+    """pack is a list of (id, email) pairs."""
+    blocks = "\n".join(f'<email id="{email_id}">\n{email}\n</email>' for email_id, email in pack)
+    return f"{PACKED_SYSTEM_PROMPT}\n\n{blocks}"
+
+
+def build_thread_prompt(previous_summary: str, new_messages: str) -> str:
+    return f"{THREAD_SYSTEM_PROMPT}\n\nPrevious summary:\n{previous_summary or 'None'}\n\nNew messages:\n{new_messages}"
+
+
+def estimate_tokens(text: str) -> int:
+    # Gemini averages roughly 4 characters per token for English text.
+    return len(text) // 4 + 1
+
+
+def response_text(response) -> str:
+    """Extracts the plain text from a chat model (or structured output) response."""
+    if isinstance(response, dict) and "summary" in response:
+        return format_summary(str(response["summary"]).strip(), normalize_priority(response.get("priority", "")))
+    if hasattr(response, "content"):
+        content_attr = response.content
+        if isinstance(content_attr, list) and len(content_attr) > 0:
+            return getattr(content_attr[0], "text", str(content_attr[0]))
+        return str(content_attr)
+    return str(response)
+
+
+def _usage(prompt, response):
+    """(prompt, completion, cached prompt) tokens from usage metadata, else estimated."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage.get("input_tokens"):
+        cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+        return usage["input_tokens"], usage.get("output_tokens", 0), cached
+    return estimate_tokens(prompt), estimate_tokens(response_text(response)), 0
+
+
+async def _ainvoke(model, prompt, timeout, limiter=None, context_cache=None):
+    """
+    One Gemini call, bounded by timeout and, if given, an ApiLimiter.
+    A context_cache (summarizer.context_cache) turns the prompt into a
+    request that reuses the cached instruction. A call Gemini refuses
+    with cached_content is logged and sent again without it.
+    """
+    async def invoke():
+        request, kwargs, sent = context_cache.request(prompt) if context_cache else (prompt, {}, prompt)
+        with metrics.call("gemini", "generate") as call:
+            call.sent = metrics.payload_size(sent)
+            try:
+                response = await asyncio.wait_for(model.ainvoke(request, **kwargs), timeout)
+            except Exception as error:
+                if "cached_content" not in kwargs or isinstance(error, asyncio.TimeoutError) or is_throttled(error):
+                    raise
+                log.warning("Gemini refused cached content %s, retrying without it: %s", kwargs["cached_content"], error)
+                context_cache.reject(kwargs["cached_content"])
+                request, kwargs, sent = context_cache.request(prompt)
+                call.sent += metrics.payload_size(sent)
+                response = await asyncio.wait_for(model.ainvoke(request, **kwargs), timeout)
+            call.received = metrics.payload_size(response_text(response))
+        metrics.record_tokens(*_usage(prompt, response))
+        return response
+
+    if limiter is None:
+        return await invoke()
+    return await limiter.acall(invoke, requests=1, tokens=estimate_tokens(prompt))
+
+
+async def asummarize_emails(model, emails, max_concurrency=8, timeout=60.0, on_result=None, build=build_prompt, limiter=None,
+                            context_cache=None):
+    """
+    Summarizes emails with at most max_concurrency Gemini calls in flight.
+    build turns one email into its prompt (build_prompt by default).
+    With a limiter (summarizer.ratelimit) calls also respect the Gemini
+    RPM/TPM budget and its adaptive concurrency, and 429s are retried.
+
+    Each call is bounded by `timeout` seconds; a call that times out or
+    fails yields an empty string so the output list always lines up
+    one-to-one with `emails`. on_result(index, text) is called as soon as
+    each email finishes, in completion order, for progressive rendering.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def summarize_one(index, email):
+        async with semaphore:
+            try:
+                response = await _ainvoke(model, build(email), timeout, limiter, context_cache)
+                text = response_text(response)
+            except Exception:
+                text = ""
+        if on_result:
+            on_result(index, text)
+        return text
+
+    return await asyncio.gather(*(summarize_one(i, email) for i, email in enumerate(emails)))
+
+
+def summarize_emails(model, emails, max_concurrency=8, timeout=60.0, on_result=None, limiter=None, context_cache=None):
+    """Synchronous wrapper around asummarize_emails for LangGraph nodes."""
+    return asyncio.run(asummarize_emails(
+        model, emails, max_concurrency, timeout, on_result, limiter=limiter, context_cache=context_cache,
+    ))
+
+
+# ===============================
+# 📦 Packed Mode (many emails per call)
+# ===============================
+def pack_emails(emails, max_prompt_tokens=8000):
+    """
+    Greedily groups emails into packs of (id, email) pairs whose packed
+    prompt stays within max_prompt_tokens. An email too large for any
+    pack is placed in a pack of its own.
+    """
+    overhead = estimate_tokens(PACKED_SYSTEM_PROMPT) + 4
+    packs, current, used = [], [], overhead
+    for index, email in enumerate(emails):
+        email_id = f"E{index}"
+        cost = estimate_tokens(email) + 8
+        if current and used + cost > max_prompt_tokens:
+            packs.append(current)
+            current, used = [], overhead
+        current.append((email_id, email))
+        used += cost
+    if current:
+        packs.append(current)
+    return packs
+
+
+_JSON_ARRAY = re.compile(r"\[.*\]", re.S)
+
+
+def parse_packed_response(text: str) -> dict:
+    """
+    Maps email id -> "Summary: ...\nPriority: ..." text for every entry
+    that parses; malformed entries are simply absent from the result.
+    """
+    match = _JSON_ARRAY.search(text)
+    if not match:
+        return {}
+    try:
+        entries = json.loads(match.group(0))
+    except ValueError:
+        return {}
+    parsed = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        email_id, summary, priority = entry.get("id"), entry.get("summary"), entry.get("priority")
+        if email_id and summary and priority:
+            parsed[str(email_id)] = f"Summary: {summary}\nPriority: {priority}"
+    return parsed
+
+
+async def asummarize_emails_packed(model, emails, max_prompt_tokens=8000, max_concurrency=8, timeout=60.0, on_result=None, limiter=None,
+                                   context_cache=None):
+    """
+    Summarizes emails several-per-call. Entries missing from (or
+    unparseable in) a packed response fall back to per-email calls.
+    on_result(index, text) fires per email as its pack (or fallback) lands.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    results = [None] * len(emails)
+
+    async def summarize_pack(pack):
+        async with semaphore:
+            try:
+                response = await _ainvoke(model, build_packed_prompt(pack), timeout, limiter, context_cache)
+            except Exception:
+                return
+        parsed = parse_packed_response(response_text(response))
+        for email_id, _ in pack:
+            if email_id in parsed:
+                index = int(email_id[1:])
+                results[index] = parsed[email_id]
+                if on_result:
+                    on_result(index, results[index])
+
+    await asyncio.gather(*(summarize_pack(pack) for pack in pack_emails(emails, max_prompt_tokens)))
+
+    missing = [i for i, text in enumerate(results) if text is None]
+    if missing:
+        retried = await asummarize_emails(
+            model, [emails[i] for i in missing], max_concurrency, timeout,
+            on_result=(lambda j, text: on_result(missing[j], text)) if on_result else None, limiter=limiter,
+            context_cache=context_cache,
+        )
+        for i, text in zip(missing, retried):
+            results[i] = text
+    return results
+
+
+def summarize_emails_packed(model, emails, max_prompt_tokens=8000, max_concurrency=8, timeout=60.0, on_result=None, limiter=None,
+                            context_cache=None):
+    """Synchronous wrapper around asummarize_emails_packed."""
+    return asyncio.run(asummarize_emails_packed(
+        model, emails, max_prompt_tokens, max_concurrency, timeout, on_result, limiter, context_cache,
+    ))
+
+
+def summarize(model, emails, mode="single", max_prompt_tokens=8000, max_concurrency=8, timeout=60.0, on_result=None, limiter=None,
+              context_cache=None):
+    """Dispatches to per-email ("single") or packed summarization."""
+    if mode == "packed":
+        return summarize_emails_packed(model, emails, max_prompt_tokens, max_concurrency, timeout, on_result, limiter, context_cache)
+    return summarize_emails(model, emails, max_concurrency, timeout, on_result, limiter, context_cache)
+
+
+# ===============================
+# 🧾 Structured Output & Parsing
+# ===============================
+# With SUMMARY_OUTPUT=json the model is bound to SUMMARY_SCHEMA (Gemini's
+# JSON mode with a response schema), so single and thread calls return
+# {"summary", "priority"} dicts; response_text() turns them into the
+# canonical "Summary: ...\nPriority: ..." text that the cache and the
+# thread store keep. Free-text answers (packed fallbacks, text mode, old
+# cache entries) go through parse_summaries(), which parses each answer
+# once, whatever its markdown, case and spacing, into a record that rides
+# along in the stream events and EmailState["records"].
+SUMMARY_SCHEMA = {
+    "title": "EmailSummary",
+    "description": "A short summary of an email and its priority.",
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string", "description": "1-2 line summary"},
+        "priority": {"type": "string", "enum": ["High", "Medium", "Low"]},
+    },
+    "required": ["summary", "priority"],
+}
+PRIORITIES = {"high": "High", "medium": "Medium", "low": "Low"}
+_CANONICAL = set(PRIORITIES.values())
+
+_FIELD = re.compile(r"^[ \t>*_#-]*(summary|priority)[ \t*_]*:[ \t*_]*([^\n]*)$", re.I | re.M)
+_MARKUP = " \t*_"
+
+
+def structured_model(model):
+    """model bound to SUMMARY_SCHEMA, or model itself if it has no structured mode."""
+    bind = getattr(model, "with_structured_output", None)
+    return bind(SUMMARY_SCHEMA) if bind else model
+
+
+def format_summary(summary, priority) -> str:
+    return f"Summary: {summary}\nPriority: {priority}"
+
+
+def normalize_priority(value) -> str:
+    words = str(value).strip().split()
+    if not words:
+        return "Unknown"
+    return PRIORITIES.get(words[0].strip("*_.,:;!").lower(), str(value).strip())
+
+
+def parse_summaries(texts):
+    """
+    Parses a batch of answers into {"summary", "priority"} records. The
+    canonical format_summary() text takes a split-only fast path, JSON
+    answers are read as JSON and everything else goes through _FIELD,
+    which tolerates markdown, case and spacing. A missing summary is ""
+    and a missing priority "Unknown"; the first occurrence of a field wins.
+    """
+    records = []
+    for text in texts:
+        text = text or ""
+        head, sep, priority = text.partition("\nPriority: ")
+        if sep and priority in _CANONICAL and head.startswith("Summary: ") and "\n" not in head:
+            records.append({"summary": head[9:].strip(), "priority": priority})
+            continue
+        if text.lstrip().startswith("{"):
+            try:
+                data = json.loads(text)
+                records.append({"summary": str(data.get("summary", "")).strip(), "priority": normalize_priority(data.get("priority", ""))})
+                continue
+            except (ValueError, AttributeError):
+                pass
+        summary, priority = None, None
+        for field, value in _FIELD.findall(text):
+            if field[0] in "sS":
+                if summary is None:
+                    summary = value.rstrip(_MARKUP)
+            elif priority is None:
+                priority = normalize_priority(value.rstrip(_MARKUP))
+        records.append({"summary": summary or "", "priority": priority or "Unknown"})
+    return records
+
+
+def parse_summary(text: str):
+    """Splits one "Summary: ...\nPriority: ..." answer into (summary, priority)."""
+    record = parse_summaries([text])[0]
+    return record["summary"], record["priority"]
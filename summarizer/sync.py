@@ -0,0 +1,112 @@
+import json
+import os
+import threading
+
+from googleapiclient.errors import HttpError
+
+from summarizer import metrics
+from summarizer.fetch import list_message_ids
+from summarizer.ratelimit import GMAIL_UNITS
+
+# ===============================
+# 🔄 Incremental Inbox Sync
+# ===============================
+class HistoryExpired(Exception):
+    """The stored startHistoryId is too old for users.history.list."""
+
+
+class SyncStateStore:
+    """Last synced Gmail historyId per user, kept in a small JSON file."""
+
+    def __init__(self, path=".cache/sync_state.json"):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def get(self, user):
+        with self._lock:
+            return self._load().get(user)
+
+    def set(self, user, history_id):
+        with self._lock:
+            data = self._load()
+            data[user] = str(history_id)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+def current_history_id(service, user_id="me", limiter=None):
+    if limiter:
+        limiter.acquire(units=GMAIL_UNITS["profile"])
+    with metrics.call("gmail", "getProfile"):
+        return service.users().getProfile(userId=user_id).execute()["historyId"]
+
+
+def added_message_ids(service, start_history_id, max_results=1000, label_id="INBOX", user_id="me", limiter=None):
+    """
+    Returns (ids newest first, historyId to commit) for messages added
+    since start_history_id (labelled label_id; any label when None). When
+    more than max_results were added, only the oldest history records
+    that fit are taken and the historyId returned is that of the last
+    one, so the rest come in the next sync instead of being skipped.
+    Raises HistoryExpired when Gmail answers 404.
+    """
+    ids, page_token, latest = {}, None, start_history_id
+    while True:
+        if limiter:
+            limiter.acquire(units=GMAIL_UNITS["history"])
+        try:
+            with metrics.call("gmail", "history.list") as call:
+                results = service.users().history().list(
+                    userId=user_id,
+                    startHistoryId=start_history_id,
+                    historyTypes=["messageAdded"],
+                    labelId=label_id,
+                    pageToken=page_token,
+                    maxResults=500,
+                ).execute()
+                call.received = metrics.payload_size(results)
+        except HttpError as e:
+            if e.status_code == 404:
+                raise HistoryExpired(start_history_id) from e
+            raise
+        for record in results.get("history", []):
+            added = [a["message"]["id"] for a in record.get("messagesAdded", []) if a["message"]["id"] not in ids]
+            if ids and len(ids) + len(added) > max_results:
+                return list(reversed(ids)), latest
+            ids.update(dict.fromkeys(added))
+            latest = record["id"]
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            return list(reversed(ids)), results.get("historyId", start_history_id)
+
+
+def sync_message_ids(service, store, user, max_results=5, max_delta=1000, user_id="me", limiter=None, label_id="INBOX"):
+    """
+    Returns (message ids to process, historyId to commit once they are saved).
+
+    With a stored historyId only the messages added since then are
+    listed (O(delta), at most max_delta per run); on first run or when the
+    id has expired it falls back to a full list of the newest max_results
+    messages. Both only see messages labelled label_id (all mail if None).
+    """
+    start = store.get(user)
+    if start:
+        try:
+            return added_message_ids(
+                service, start, max_results=max_delta, label_id=label_id, user_id=user_id, limiter=limiter,
+            )
+        except HistoryExpired:
+            pass
+    # Read the history id before listing so nothing added meanwhile is skipped.
+    history_id = current_history_id(service, user_id, limiter)
+    ids = list_message_ids(service, max_results=max_results, user_id=user_id, limiter=limiter, label_id=label_id)
+    return ids, history_id
@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from summarizer.fetch import header_value
+from summarizer.summarize import asummarize_emails, build_thread_prompt
+
+# ===============================
+# 🧵 Thread Summaries
+# ===============================
+# In thread mode the fetched messages are grouped by threadId and each
+# thread gets one running summary. Replies usually repeat the whole
+# conversation below the new text, so every sentence already seen earlier
+# in the thread (in this run or a previous one) is dropped before the
+# prompt is built. A thread seen before is updated from its stored
+# summary plus only the messages added since, instead of re-reading it.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    message_ids TEXT NOT NULL,
+    seen TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n+")
+_QUOTE_HEADER = re.compile(r"^on .{0,120}wrote:?$")
+MAX_SEEN = 5000
+
+
+def _sentences(text):
+    for raw in _SENTENCE.split(text):
+        normalized = " ".join(raw.lstrip("> ").split()).lower()
+        if normalized:
+            yield raw.strip(), normalized
+
+
+def _fingerprint(normalized):
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def new_content(text, seen):
+    """
+    Returns only the sentences of text not in `seen` (fingerprints in a
+    dict used as an ordered set, oldest first), adding the new ones to
+    it. Quote headers such as "On Mon, ... wrote:" are dropped too.
+    """
+    kept = []
+    for raw, normalized in _sentences(text):
+        key = _fingerprint(normalized)
+        if key in seen or _QUOTE_HEADER.match(normalized):
+            continue
+        seen[key] = None
+        kept.append(raw)
+    return " ".join(kept)
+
+
+def group_by_thread(messages):
+    """
+    Maps threadId -> message indexes, oldest message first, with threads
+    in the order they first appear in messages.
+    """
+    groups = {}
+    for index, msg in enumerate(messages):
+        groups.setdefault(msg.get("threadId") or msg.get("id") or str(index), []).append(index)
+    for indexes in groups.values():
+        indexes.sort(key=lambda i: int(messages[i].get("internalDate") or 0))
+    return groups
+
+
+class ThreadStore:
+    """Running thread summaries with the message ids and sentences they cover."""
+
+    def __init__(self, path=".cache/threads.sqlite3"):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        # Workers in several processes write into the same file.
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def get_many(self, thread_ids):
+        """Returns {thread_id: (summary, set of message ids, seen fingerprints oldest first)}."""
+        found = {}
+        with self._lock:
+            for start in range(0, len(thread_ids), 500):
+                chunk = thread_ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT thread_id, summary, message_ids, seen FROM threads WHERE thread_id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for thread_id, summary, message_ids, seen in rows:
+                    found[thread_id] = (summary, set(json.loads(message_ids)), dict.fromkeys(json.loads(seen)))
+        return found
+
+    def put_many(self, items):
+        """Stores (thread_id, summary, message_ids, seen) tuples, keeping the newest MAX_SEEN fingerprints."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO threads (thread_id, summary, message_ids, seen, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (thread_id, summary, json.dumps(sorted(ids)), json.dumps(list(seen)[-MAX_SEEN:]), now)
+                    for thread_id, summary, ids, seen in items
+                ],
+            )
+
+    def close(self):
+        self._conn.close()
+
+
+def thread_updates(messages, emails, store=None):
+    """
+    Plans one LLM call per thread with new content.
+
+    Returns (updates, unchanged): updates is a list of
+    (thread_id, previous_summary, new_text, message_ids, seen) for threads
+    that need a call; unchanged maps thread_id -> (summary, message_ids,
+    seen) for threads whose new messages, if any, add nothing unseen.
+    """
+    groups = group_by_thread(messages)
+    stored = store.get_many(list(groups)) if store else {}
+    updates, unchanged = [], {}
+    for thread_id, indexes in groups.items():
+        summary, known_ids, seen = stored.get(thread_id, ("", set(), {}))
+        blocks = []
+        for i in indexes:
+            if messages[i].get("id") in known_ids:
+                continue
+            text = new_content(emails[i], seen)
+            if text:
+                blocks.append(f"From: {header_value(messages[i], 'From') or 'unknown'}\n{text}")
+        ids = known_ids | {messages[i].get("id") for i in indexes}
+        if summary and not blocks:
+            unchanged[thread_id] = (summary, ids, seen)
+        else:
+            updates.append((thread_id, summary, "\n\n".join(blocks) or emails[indexes[-1]], ids, seen))
+    return updates, unchanged
+
+
+async def asummarize_threads(model, messages, emails, store=None, max_concurrency=8, timeout=60.0, on_result=None, limiter=None,
+                             context_cache=None):
+    """
+    Summarizes emails one thread at a time. Returns {thread_id: text};
+    on_result(thread_id, text) fires as each thread completes. Failed
+    calls keep the previous summary and are not stored.
+    """
+    updates, unchanged = thread_updates(messages, emails, store)
+    results = {thread_id: item[0] for thread_id, item in unchanged.items()}
+    if on_result:
+        for thread_id, text in results.items():
+            on_result(thread_id, text)
+
+    def emit(j, text):
+        thread_id, previous = updates[j][0], updates[j][1]
+        results[thread_id] = text or previous
+        if on_result:
+            on_result(thread_id, results[thread_id])
+
+    texts = await asummarize_emails(
+        model, list(range(len(updates))), max_concurrency, timeout, on_result=emit,
+        build=lambda j: build_thread_prompt(updates[j][1], updates[j][2]), limiter=limiter, context_cache=context_cache,
+    )
+    if store:
+        done = [(u[0], text, u[3], u[4]) for u, text in zip(updates, texts) if text]
+        # Replies that only repeated known text still count as covered.
+        done += [(thread_id, *item) for thread_id, item in unchanged.items()]
+        store.put_many(done)
+    return results
+
+
+def summarize_threads(model, messages, emails, store=None, max_concurrency=8, timeout=60.0, on_result=None, limiter=None,
+                      context_cache=None):
+    """Synchronous wrapper around asummarize_threads."""
+    return asyncio.run(asummarize_threads(
+        model, messages, emails, store, max_concurrency, timeout, on_result, limiter, context_cache,
+    ))
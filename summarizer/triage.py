@@ -0,0 +1,162 @@
+import re
+import zlib
+
+import numpy as np
+
+from summarizer.fetch import header_value
+
+# ===============================
+# 🏷️ Local Triage
+# ===============================
+# Receipts, newsletters and notifications make up most of an inbox and
+# always come back as Low priority, so they are recognized locally before
+# the LLM node: header rules (List-Unsubscribe, Precedence/Auto-Submitted,
+# noreply senders, Gmail category labels) and a hashed bag-of-words
+# logistic model are summed into one log-odds score per email, scored for
+# the whole batch at once with NumPy. Emails above the threshold get a
+# template "Low" summary and never reach Gemini. Words like "security",
+# "urgent" or "failed" pull the score down, so automated mail that needs
+# attention (sign-in alerts, broken builds) still goes to the model.
+FEATURE_DIM = 1 << 14
+BULK_LABELS = {"CATEGORY_PROMOTIONS", "CATEGORY_SOCIAL", "CATEGORY_UPDATES", "CATEGORY_FORUMS"}
+_AUTOMATED_SENDER = re.compile(r"(no-?reply|do-?not-?reply|notifications?|newsletters?|news|updates|mailer|marketing|info|hello|team)@", re.I)
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Log-odds added by each header rule.
+HEADER_WEIGHTS = {
+    "list_unsubscribe": 1.5,
+    "bulk_precedence": 1.5,
+    "auto_submitted": 1.0,
+    "automated_sender": 1.0,
+    "bulk_label": 1.5,
+    "important_label": -2.5,
+}
+
+# Starting weights for the text model; fit() refines them from labels.
+# Headers carry most of the signal. These are a few words common to bulk
+# and transactional mail everywhere, and words that mean someone has to act.
+LEXICON = {
+    "unsubscribe": 2.0, "newsletter": 1.5, "digest": 1.2, "subscribed": 1.0, "preferences": 1.0, "browser": 0.8,
+    "receipt": 1.2, "shipped": 1.0, "promotion": 1.0, "promo": 1.0, "discount": 1.0, "webinar": 1.0,
+    "automated": 1.0, "notification": 0.8, "notifications": 0.8,
+    "urgent": -2.5, "asap": -2.5, "security": -2.0, "password": -2.0, "suspicious": -2.5,
+    "failed": -2.0, "failure": -2.0, "overdue": -2.0, "deadline": -1.0, "required": -1.0,
+}
+DEFAULT_BIAS = -1.5
+
+
+def tokens(text):
+    return _TOKEN.findall(text.lower())
+
+
+def _bucket(token, dim=FEATURE_DIM):
+    # crc32 rather than hash(): buckets must not change between processes.
+    return zlib.crc32(token.encode("utf-8")) % dim
+
+
+def hash_features(texts, dim=FEATURE_DIM):
+    """
+    Sparse bag-of-words for a batch: (doc_ids, buckets), one entry per
+    token, ready for np.bincount.
+    """
+    doc_ids, buckets = [], []
+    for doc, text in enumerate(texts):
+        found = [_bucket(t, dim) for t in tokens(text)]
+        buckets.extend(found)
+        doc_ids.extend([doc] * len(found))
+    return np.asarray(doc_ids, dtype=np.int64), np.asarray(buckets, dtype=np.int64)
+
+
+def header_flags(message):
+    """Which header rules fire for a Gmail message (metadata or full)."""
+    labels = set(message.get("labelIds") or [])
+    precedence = header_value(message, "Precedence").lower()
+    auto = header_value(message, "Auto-Submitted").lower()
+    return {
+        "list_unsubscribe": bool(header_value(message, "List-Unsubscribe")),
+        "bulk_precedence": precedence in ("bulk", "list", "junk"),
+        "auto_submitted": bool(auto) and auto != "no",
+        "automated_sender": bool(_AUTOMATED_SENDER.search(header_value(message, "From"))),
+        "bulk_label": bool(labels & BULK_LABELS),
+        "important_label": bool(labels & {"IMPORTANT", "STARRED"}),
+    }
+
+
+class TriageModel:
+    """Hashed bag-of-words logistic model scored a whole batch at a time."""
+
+    def __init__(self, weights=None, bias=DEFAULT_BIAS, dim=FEATURE_DIM):
+        self.dim = dim
+        self.bias = bias
+        if weights is None:
+            weights = np.zeros(dim, dtype=np.float64)
+            for token, weight in LEXICON.items():
+                weights[_bucket(token, dim)] += weight
+        self.weights = np.asarray(weights, dtype=np.float64)
+
+    def text_logits(self, texts):
+        """Per-text log-odds (bias included), shape (len(texts),)."""
+        doc_ids, buckets = hash_features(texts, self.dim)
+        return self._logits(doc_ids, buckets, len(texts))
+
+    def _logits(self, doc_ids, buckets, n):
+        return self.bias + np.bincount(doc_ids, weights=self.weights[buckets], minlength=n)
+
+    def fit(self, texts, labels, epochs=200, lr=0.5, l2=1e-4):
+        """
+        Refines the weights with batch gradient descent on labelled texts
+        (label 1 = automated, 0 = needs a real summary). Returns self.
+        """
+        y = np.asarray(labels, dtype=np.float64)
+        doc_ids, buckets = hash_features(texts, self.dim)
+        n = max(1, len(y))
+        for _ in range(epochs):
+            p = 1.0 / (1.0 + np.exp(-self._logits(doc_ids, buckets, len(y))))
+            residual = p - y
+            grad = np.bincount(buckets, weights=residual[doc_ids], minlength=self.dim) / n
+            self.weights -= lr * (grad + l2 * self.weights)
+            self.bias -= lr * residual.mean()
+        return self
+
+    def save(self, path):
+        np.savez_compressed(path, weights=self.weights, bias=self.bias)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(weights=data["weights"], bias=float(data["bias"]), dim=len(data["weights"]))
+
+
+def triage_scores(messages, emails, model=None):
+    """Probability that each email is automated mail, shape (len(emails),)."""
+    model = model or TriageModel()
+    texts = [f"{header_value(m, 'Subject')} {e}" for m, e in zip(messages, emails)]
+    logits = model.text_logits(texts)
+    names = list(HEADER_WEIGHTS)
+    flags = np.array([[header_flags(m)[k] for k in names] for m in messages], dtype=np.float64).reshape(len(messages), len(names))
+    logits = logits + flags @ np.array([HEADER_WEIGHTS[k] for k in names])
+    return 1.0 / (1.0 + np.exp(-logits))
+
+
+def template_summary(message):
+    flags = header_flags(message)
+    kind = "newsletter" if flags["list_unsubscribe"] or "CATEGORY_PROMOTIONS" in (message.get("labelIds") or []) else "notification"
+    sender = header_value(message, "From") or "unknown sender"
+    subject = header_value(message, "Subject") or "(no subject)"
+    return f"Summary: Automated {kind} from {sender}: {subject}\nPriority: Low"
+
+
+def triage(messages, emails, threshold=0.9, model=None):
+    """
+    Returns {index: template summary} for the emails scored at or above
+    threshold, which can skip the LLM.
+    """
+    if not messages or threshold > 1:
+        return {}
+    scores = triage_scores(messages, emails, model)
+    return {int(i): template_summary(messages[i]) for i in np.flatnonzero(scores >= threshold)}
+
+
+def model_from_path(path):
+    """The fitted model saved at path, or the built-in lexicon model."""
+    return TriageModel.load(path) if path else TriageModel()
@@ -0,0 +1,18 @@
+import pytest
+
+from benchmarks.fake_gmail import FakeGmail
+from summarizer import config
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keeps run reports and metrics textfiles out of the working tree."""
+    monkeypatch.setattr(config, "METRICS_REPORT_PATH", str(tmp_path / "last_run.json"))
+    monkeypatch.setattr(config, "METRICS_PROMETHEUS_PATH", str(tmp_path / "metrics.prom"))
+    return tmp_path
+
+
+@pytest.fixture
+def fake_gmail():
+    with FakeGmail(n_messages=20) as fake:
+        yield fake
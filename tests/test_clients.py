@@ -0,0 +1,55 @@
+import threading
+from types import SimpleNamespace
+
+from summarizer import clients
+from summarizer.clients import ClientRegistry, ThreadClients
+
+
+def on_new_thread(fn):
+    """Runs fn on a thread of its own, as Streamlit runs each rerun, and returns its result."""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(fn()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_gmail_service_reused_across_reruns(monkeypatch):
+    monkeypatch.setattr(clients, "registry", ClientRegistry())
+    creds = SimpleNamespace(client_id="client", refresh_token="refresh", scopes=clients.GMAIL_READONLY)
+    built = []
+
+    def get():
+        return clients._get("gmail", creds, lambda: built.append(object()) or built[-1], per_thread=True)
+
+    first = on_new_thread(get)
+    second = on_new_thread(get)
+    assert first is second
+    assert len(built) == 1
+    assert len(clients.registry._items) == 1
+
+
+def test_concurrent_threads_get_their_own_client():
+    pool = ThreadClients(object)
+    barrier = threading.Barrier(3)
+    got = []
+
+    def take():
+        got.append(pool.get())
+        barrier.wait()
+
+    threads = [threading.Thread(target=take) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(client) for client in got}) == 3
+    assert on_new_thread(pool.get) in got
+    assert pool.builds == 3
+
+
+def test_users_do_not_share_clients(monkeypatch):
+    monkeypatch.setattr(clients, "registry", ClientRegistry())
+    alice = SimpleNamespace(client_id="client", refresh_token="alice", scopes=())
+    bob = SimpleNamespace(client_id="client", refresh_token="bob", scopes=())
+    assert clients._get("gmail", alice, object, per_thread=True) is not clients._get("gmail", bob, object, per_thread=True)
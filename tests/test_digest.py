@@ -0,0 +1,58 @@
+from datetime import datetime, timezone
+
+from summarizer.digest import send_digest
+from summarizer.ratelimit import ApiLimiter, TokenBucket
+from summarizer.scheduler import DigestStore, run_due
+
+SUMMARIES = [{"Summary": "Vendor contract needs sign-off before Friday.", "Priority": "High"}]
+
+
+def no_wait_limiter():
+    limiter = ApiLimiter({"units": TokenBucket(1e6, capacity=1e6)})
+    limiter.backoff = lambda attempt: 0.6
+    return limiter
+
+
+def test_rejected_recipient_fails_alone(fake_gmail):
+    fake_gmail.reject = {"bad@example.com"}
+    recipients = ["Ann <ann@example.com>", "bad@example.com", "bob@example.com", "ann@example.com"]
+    report = send_digest(fake_gmail.service(), recipients, SUMMARIES, batch_uri=fake_gmail.batch_uri)
+    assert report["sent"] == 3
+    assert report["failed"] == 1
+    assert [r["status"] for r in report["results"]] == ["sent", "failed", "sent", "sent"]
+    failed = report["results"][1]
+    assert failed["attempts"] == 1 and "Invalid To header" in failed["error"]
+    assert report["retries"] == 0
+    assert sorted(m["to"] for m in fake_gmail.sent) == ["Ann <ann@example.com>", "ann@example.com", "bob@example.com"]
+
+
+def test_throttled_recipients_are_retried(fake_gmail):
+    # 200 units of burst quota covers two sends; the third gets a 429.
+    fake_gmail.units_per_second = 200
+    fake_gmail._units = 200
+    recipients = ["a@example.com", "b@example.com", "c@example.com"]
+    report = send_digest(fake_gmail.service(), recipients, SUMMARIES, batch_uri=fake_gmail.batch_uri, limiter=no_wait_limiter())
+    assert report["sent"] == 3
+    assert report["retries"] == 1
+    assert [r["attempts"] for r in report["results"]] == [1, 1, 2]
+
+
+def test_failed_day_stays_due(tmp_path):
+    store = DigestStore(str(tmp_path / "digests.sqlite3"))
+    store.set_schedule("me", ["a@example.com", "b@example.com"], send_at="07:00")
+    day_ts = datetime(2026, 3, 2, 12, tzinfo=timezone.utc).timestamp()
+    store.add("me", [{"message_id": "m1", "ts": day_ts, "priority": "High", "summary": "Sign the contract."}])
+    now = datetime(2026, 3, 3, 8, tzinfo=timezone.utc).timestamp()
+
+    def refused(schedule, rollup, text):
+        return {"sent": 0, "failed": len(schedule["recipients"])}
+
+    assert run_due(store, now=now, send=refused) == [
+        {"user": "me", "day": "2026-03-02", "emails": 1, "sent": 0, "failed": 2},
+    ]
+
+    def partly(schedule, rollup, text):
+        return {"sent": 1, "failed": 1}
+
+    assert run_due(store, now=now, send=partly)[0]["sent"] == 1
+    assert run_due(store, now=now, send=partly) == []
@@ -0,0 +1,31 @@
+from summarizer.fetch import fetch_messages
+from summarizer.ratelimit import ApiLimiter, TokenBucket
+
+
+def test_batch_fetch_drops_deleted_messages(fake_gmail):
+    ids = ["m000003", "gone1", "m000001", "gone2", "m000002"]
+    messages = fetch_messages(fake_gmail.service(), ids, batch_size=2, batch_uri=fake_gmail.batch_uri)
+    assert [m["id"] for m in messages] == ["m000003", "m000001", "m000002"]
+
+
+def test_throttled_calls_are_retried(fake_gmail):
+    # 100 units of burst quota = 20 gets; the other 5 come back 429.
+    fake_gmail.units_per_second = 100
+    fake_gmail._units = 100
+    limiter = ApiLimiter({"units": TokenBucket(1e6)})
+    limiter.backoff = lambda attempt: 0.3
+    ids = [f"m{i:06d}" for i in range(20)] + [f"m{i:06d}" for i in range(20, 25)]
+    fake_gmail.add_messages(5)
+    messages = fetch_messages(fake_gmail.service(), ids, batch_size=50, batch_uri=fake_gmail.batch_uri, limiter=limiter)
+    assert [m["id"] for m in messages] == ids
+    assert fake_gmail.throttled == 5
+
+
+def test_throttled_calls_give_up_after_retries(fake_gmail):
+    fake_gmail.units_per_second = 10
+    fake_gmail._units = 10
+    limiter = ApiLimiter({"units": TokenBucket(1e6)})
+    limiter.backoff = lambda attempt: 0.0
+    ids = [f"m{i:06d}" for i in range(5)]
+    messages = fetch_messages(fake_gmail.service(), ids, batch_uri=fake_gmail.batch_uri, retries=1, limiter=limiter)
+    assert [m["id"] for m in messages] == ids[:2]
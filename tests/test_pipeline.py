@@ -0,0 +1,33 @@
+import requests
+
+import summarizer.pipeline as pipeline
+from benchmarks.fake_sheets import FakeWorksheet
+from benchmarks.stub_model import StubChatModel
+from summarizer import config
+from summarizer.pipeline import build_pipeline, run_config
+from summarizer.store import SummaryStore
+from summarizer.sync import SyncStateStore
+
+
+class DownWorksheet(FakeWorksheet):
+    def append_rows(self, values, value_input_option="RAW"):
+        raise requests.ConnectionError("Sheets unreachable")
+
+
+def test_sheets_outage_still_saves_the_run(fake_gmail, tmp_path, monkeypatch):
+    fetch = pipeline.fetch_messages
+    monkeypatch.setattr(pipeline, "fetch_messages", lambda *a, **k: fetch(*a, batch_uri=fake_gmail.batch_uri, **k))
+    monkeypatch.setattr(config, "GMAIL_SYNC_MODE", "incremental")
+    sync_store = SyncStateStore(str(tmp_path / "sync.json"))
+    summary_store = SummaryStore(":memory:")
+    graph = build_pipeline(StubChatModel(latency=0), sync_store=sync_store, summary_store=summary_store)
+
+    service = fake_gmail.service()
+    state = graph.invoke({}, run_config(gmail=lambda: service, sheet=DownWorksheet, max_results=5))
+
+    assert state["sheets_report"]["failed"] == 5
+    assert "Sheets unreachable" in state["sheets_report"]["errors"][0]
+    run, records = summary_store.latest_run("me")
+    assert run["id"] == state["run_id"]
+    assert len(records) == 5
+    assert sync_store.get("me") == str(fake_gmail.history_id)
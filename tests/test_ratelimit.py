@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from summarizer import config, ratelimit
+from summarizer.ratelimit import AIMDController, ApiLimiter, TokenBucket
+
+
+class Throttled(Exception):
+    code = 429
+
+
+def flaky(failures, result="ok"):
+    """A call that is throttled `failures` times, then returns result."""
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise Throttled("RESOURCE_EXHAUSTED")
+        return result
+
+    return fn, calls
+
+
+def limiter(**kwargs):
+    limiter = ApiLimiter({"requests": TokenBucket(1e6)}, **kwargs)
+    limiter.backoff = lambda attempt: 0.0
+    return limiter
+
+
+def test_call_retries_after_429():
+    fn, calls = flaky(2)
+    api = limiter(max_retries=4)
+    assert api.call(fn, requests=1) == "ok"
+    assert len(calls) == 3
+    assert api.stats["throttled"] == 2
+    assert api.stats["retries"] == 2
+
+
+def test_call_gives_up_after_max_retries():
+    fn, calls = flaky(10)
+    api = limiter(max_retries=2)
+    with pytest.raises(Throttled):
+        api.call(fn, requests=1)
+    assert len(calls) == 3
+
+
+def test_other_errors_are_not_retried():
+    api = limiter()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        api.call(fn)
+    assert len(calls) == 1
+
+
+def test_async_call_backs_off_concurrency_on_429():
+    fn, calls = flaky(1)
+
+    async def afn():
+        return fn()
+
+    controller = AIMDController(initial=8, cooldown=0)
+    api = limiter(controller=controller)
+    assert asyncio.run(api.acall(afn)) == "ok"
+    assert len(calls) == 2
+    assert controller.limit == 4
+
+
+def test_per_user_limiters_are_bounded(monkeypatch):
+    monkeypatch.setattr(ratelimit, "_limiters", type(ratelimit._limiters)())
+    monkeypatch.setattr(config, "CLIENT_CACHE_MAX_ENTRIES", 2)
+    shared = ratelimit.limiter_for("gemini")
+    first = ratelimit.limiter_for("gmail", "a")
+    for user in ("b", "c"):
+        ratelimit.limiter_for("gmail", user)
+    assert ratelimit.limiter_for("gemini") is shared
+    assert ratelimit.limiter_for("gmail", "a") is not first
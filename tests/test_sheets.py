@@ -0,0 +1,57 @@
+import json
+
+import pytest
+import requests
+from gspread.exceptions import APIError
+
+from benchmarks.fake_sheets import FakeWorksheet, _error_response
+from summarizer.sheets import append_rows_chunked
+
+ROWS = [[f"Summary {i}", "Low"] for i in range(10)]
+
+
+class FlakyWorksheet(FakeWorksheet):
+    """Fails the requests numbered in `failures` (1-based) with the given errors."""
+
+    def __init__(self, failures):
+        super().__init__(quota=0)
+        self.failures = failures
+
+    def append_rows(self, values, value_input_option="RAW"):
+        self.requests += 1
+        if self.requests in self.failures:
+            raise self.failures[self.requests]
+        self.rows.extend(list(row) for row in values)
+
+
+def bad_request():
+    response = requests.Response()
+    response.status_code = 400
+    response._content = json.dumps({"error": {"code": 400, "message": "Invalid range", "status": "INVALID_ARGUMENT"}}).encode()
+    return APIError(response)
+
+
+@pytest.mark.parametrize("error", [bad_request(), requests.ConnectionError("connection reset"), TimeoutError("timed out")])
+def test_failed_chunk_is_counted_and_later_chunks_written(error):
+    sheet = FlakyWorksheet({2: error})
+    report = append_rows_chunked(sheet, ROWS, chunk_size=4, sleep=sheet.sleep)
+    assert report["written"] == 6
+    assert report["failed"] == 4
+    assert report["requests"] == 3
+    assert len(report["errors"]) == 1
+    assert sheet.rows == ROWS[:4] + ROWS[8:]
+
+
+def test_throttled_chunk_is_retried():
+    sheet = FlakyWorksheet({2: APIError(_error_response(429, "Quota exceeded"))})
+    report = append_rows_chunked(sheet, ROWS, chunk_size=4, sleep=sheet.sleep)
+    assert report == {"written": 10, "failed": 0, "requests": 4, "retries": 1, "errors": []}
+    assert sheet.rows == ROWS
+
+
+def test_chunk_fails_once_retries_run_out():
+    sheet = FakeWorksheet(quota=1)
+    report = append_rows_chunked(sheet, ROWS, chunk_size=5, max_retries=2, sleep=lambda seconds: None)
+    assert report["written"] == 5
+    assert report["failed"] == 5
+    assert report["retries"] == 2
@@ -0,0 +1,39 @@
+from summarizer.sync import SyncStateStore, sync_message_ids
+
+
+def test_first_sync_lists_the_newest_messages(fake_gmail, tmp_path):
+    store = SyncStateStore(str(tmp_path / "sync.json"))
+    ids, history_id = sync_message_ids(fake_gmail.service(), store, "me", max_results=5)
+    assert ids == [f"m{i:06d}" for i in range(19, 14, -1)]
+    assert history_id == str(fake_gmail.history_id)
+
+
+def test_incremental_sync_returns_only_new_messages(fake_gmail, tmp_path):
+    store = SyncStateStore(str(tmp_path / "sync.json"))
+    store.set("me", fake_gmail.history_id)
+    fake_gmail.add_messages(3)
+    ids, history_id = sync_message_ids(fake_gmail.service(), store, "me", max_results=5)
+    assert ids == ["m000022", "m000021", "m000020"]
+    assert history_id == str(fake_gmail.history_id)
+
+
+def test_expired_history_id_falls_back_to_a_full_list(fake_gmail, tmp_path):
+    store = SyncStateStore(str(tmp_path / "sync.json"))
+    store.set("me", fake_gmail.history_id)
+    fake_gmail.add_messages(3)
+    fake_gmail.expire_history()
+    ids, history_id = sync_message_ids(fake_gmail.service(), store, "me", max_results=4)
+    assert ids == ["m000022", "m000021", "m000020", "m000019"]
+    assert history_id == str(fake_gmail.history_id)
+
+
+def test_delta_past_max_delta_is_picked_up_next_sync(fake_gmail, tmp_path):
+    store = SyncStateStore(str(tmp_path / "sync.json"))
+    store.set("me", fake_gmail.history_id)
+    fake_gmail.add_messages(5)
+    seen = []
+    for _ in range(3):
+        ids, history_id = sync_message_ids(fake_gmail.service(), store, "me", max_delta=2)
+        seen.extend(ids)
+        store.set("me", history_id)
+    assert sorted(seen) == [f"m{i:06d}" for i in range(20, 25)]